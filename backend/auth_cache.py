@@ -0,0 +1,111 @@
+"""Cache of authenticated requests for get_current_user.
+
+Every authenticated route decodes the JWT and loads the user document; the
+front end fires several such requests per page. Tokens already seen are kept
+in a bounded LRU with their user document for AUTH_CACHE_TTL_SECONDS (never
+past the token's own expiry), so a repeated token costs a dict lookup.
+Entries are dropped for a user whenever that user changes. Invalidation is
+per process: with several API processes, the TTL bounds how long another one
+may serve a stale user document.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', 60))
+
+
+class _Entry:
+    __slots__ = ('user', 'expires_at')
+
+    def __init__(self, user: dict, expires_at: float):
+        self.user = user
+        self.expires_at = expires_at
+
+
+class AuthCache:
+    def __init__(self, max_entries: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # token -> entry, least recently used first
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._hit_seconds = 0.0
+        self._miss_seconds = 0.0
+
+    def get(self, token: str) -> Optional[dict]:
+        """Copy of the cached user for `token`, or None"""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if time.time() >= entry.expires_at:
+            self._remove(token)
+            return None
+        self._entries.move_to_end(token)
+        return dict(entry.user)
+
+    def put(self, token: str, user: dict, token_expires_at: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        self._remove(token)
+        self._entries[token] = _Entry(dict(user), expires_at)
+        self._tokens_by_user.setdefault(user["id"], set()).add(token)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def invalidate(self, user_id: str):
+        """Forget every token of `user_id` (call after changing the user)"""
+        for token in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(token, None)
+        self._invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry.user["id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.user["id"]]
+
+    def observe(self, hit: bool, seconds: float):
+        """Record how long an authentication took, for stats()"""
+        if hit:
+            self._hits += 1
+            self._hit_seconds += seconds
+        else:
+            self._misses += 1
+            self._miss_seconds += seconds
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        avg_hit = self._hit_seconds / self._hits if self._hits else 0.0
+        avg_miss = self._miss_seconds / self._misses if self._misses else 0.0
+        return {
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "avg_hit_us": round(avg_hit * 1e6, 1),
+            "avg_miss_us": round(avg_miss * 1e6, 1),
+            # What the hits would have cost at the average miss time
+            "saved_ms": round(max(0.0, avg_miss - avg_hit) * self._hits * 1000, 1) if self._misses else 0.0,
+        }
+
+
+auth_cache = AuthCache()
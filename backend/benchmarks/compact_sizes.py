@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+PDF size per document with the logo as served vs. the compact (email) variant.
+
+Usage (from backend/):  python benchmarks/compact_sizes.py [--dpi 150]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from logo_cache import LOGO_COMPACT_DPI, compact_logo  # noqa: E402
+from pdf_renderer import generate_quote_pdf, generate_invoice_pdf  # noqa: E402
+from benchmarks.synthetic import COMPANY, make_quote, make_invoice, make_logo  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dpi", type=int, default=LOGO_COMPACT_DPI, help="target DPI of the compact logo")
+    args = parser.parse_args()
+
+    logos = {
+        "png-alpha 1200x750": make_logo(),
+        "png-opaque 1200x750": make_logo(opaque=True),
+        "png-alpha 3000x1875": make_logo(3000, 1875),
+    }
+    documents = [
+        ("quote 10 items", generate_quote_pdf, make_quote(10)),
+        ("quote 200 items", generate_quote_pdf, make_quote(200)),
+        ("invoice 10 items, 3 payments", generate_invoice_pdf, make_invoice(10, 3)),
+    ]
+
+    print(f"{'logo':<22} {'document':<30} {'full':>9} {'compact':>9} {'saved':>7}")
+    for logo_name, logo in logos.items():
+        compact = compact_logo(logo, args.dpi)
+        for doc_name, render, doc in documents:
+            full_size = len(render(doc, COMPANY, logo))
+            compact_size = len(render(doc, COMPANY, compact))
+            saved = (1 - compact_size / full_size) * 100
+            print(f"{logo_name:<22} {doc_name:<30} {full_size:>9} {compact_size:>9} {saved:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Latency of GET /api/dashboard/stats (one read of the user_stats counters)
+on a tenant seeded with --quotes quotes (spread over the four statuses) and
+--invoices invoices, half of them paid, compared with:
+- legacy: eight sequential count_documents plus the paid invoices loaded
+  into Python (to_list(1000)) to sum total_ttc, reproduced as `legacy_stats`;
+- aggregation: the tenant recounted by $group in the database, as the
+  user_stats repair does it.
+
+Past 1,000 paid invoices the legacy revenue is wrong; each revenue is
+printed next to the exact one.
+
+Needs a MongoDB: the run uses a throwaway database (DB_NAME, default
+devis_bench) that is dropped at the end.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/dashboard_stats.py [--quotes 50000] [--invoices 10000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import make_invoice, make_quote  # noqa: E402
+
+SEED_BATCH = 1000
+QUOTE_STATUSES = ["brouillon", "envoyé", "accepté", "refusé"]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def legacy_stats(db, user_id: str) -> dict:
+    """get_dashboard_stats before the aggregation"""
+    total_quotes = await db.quotes.count_documents({"user_id": user_id})
+    quotes_sent = await db.quotes.count_documents({"user_id": user_id, "status": "envoyé"})
+    quotes_accepted = await db.quotes.count_documents({"user_id": user_id, "status": "accepté"})
+    quotes_refused = await db.quotes.count_documents({"user_id": user_id, "status": "refusé"})
+    quotes_draft = await db.quotes.count_documents({"user_id": user_id, "status": "brouillon"})
+    total_invoices = await db.invoices.count_documents({"user_id": user_id})
+    paid_invoices = await db.invoices.find({"user_id": user_id, "status": "payée"}, {"_id": 0, "total_ttc": 1}).to_list(1000)
+    total_revenue = sum(inv.get('total_ttc', 0) for inv in paid_invoices)
+    total_clients = await db.clients.count_documents({"user_id": user_id})
+    total_services = await db.services.count_documents({"user_id": user_id})
+    return {"total_quotes": total_quotes, "quotes_sent": quotes_sent, "quotes_accepted": quotes_accepted,
+            "quotes_refused": quotes_refused, "quotes_draft": quotes_draft, "total_invoices": total_invoices,
+            "total_revenue": total_revenue, "total_clients": total_clients, "total_services": total_services}
+
+
+async def seed(db, user_id: str, quotes: int, invoices: int) -> float:
+    """Returns the exact revenue (sum of the paid invoices' total_ttc)"""
+    quote, invoice = make_quote(3), make_invoice(3)
+    revenue = 0.0
+    for start in range(0, quotes, SEED_BATCH):
+        batch = []
+        for n in range(start, min(start + SEED_BATCH, quotes)):
+            batch.append({**quote, "id": f"q{n}", "user_id": user_id, "quote_number": f"D-2026-{n + 1:03d}",
+                          "status": QUOTE_STATUSES[n % 4], "created_at": f"2026-01-01T00:00:00.{n:06d}+00:00"})
+        await db.quotes.insert_many(batch)
+    for start in range(0, invoices, SEED_BATCH):
+        batch = []
+        for n in range(start, min(start + SEED_BATCH, invoices)):
+            paid = n % 2 == 0
+            total_ttc = invoice["total_ttc"] + n % 100
+            revenue += total_ttc if paid else 0
+            batch.append({**invoice, "id": f"f{n}", "user_id": user_id, "quote_id": f"q{n}",
+                          "invoice_number": f"F-2026-{n + 1:03d}", "total_ttc": total_ttc,
+                          "status": "payée" if paid else "en attente",
+                          "created_at": f"2026-01-01T00:00:00.{n:06d}+00:00"})
+        await db.invoices.insert_many(batch)
+    return revenue
+
+
+async def bench(args):
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                     timeout=300) as http:
+            r = await http.post("/api/auth/register", json={
+                "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench", "name": "Bench",
+            })
+            r.raise_for_status()
+            user_id = r.json()["user"]["id"]
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            started = time.perf_counter()
+            revenue = await seed(server.db, user_id, args.quotes, args.invoices)
+            # Seeded behind the routes' back: count once, as the startup migration does
+            await server.user_stats.repair(report=False)
+            print(f"Seeded {args.quotes} quotes and {args.invoices} invoices in {time.perf_counter() - started:.1f}s; "
+                  f"exact revenue {revenue:,.2f}")
+
+            async def legacy():
+                return await legacy_stats(server.db, user_id)
+
+            async def aggregation():
+                stats = (await server.user_stats.actual([user_id]))[user_id]
+                return {"total_revenue": stats["revenue"]}
+
+            async def current():
+                r = await http.get("/api/dashboard/stats", headers=headers)
+                r.raise_for_status()
+                return r.json()
+
+            print(f"{'implementation':<16} {'p50 ms':>8} {'p95 ms':>8} {'revenue':>16}")
+            for label, run in (("legacy", legacy), ("aggregation", aggregation), ("user_stats", current)):
+                latencies = []
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    stats = await run()
+                    latencies.append(time.perf_counter() - started)
+                print(f"{label:<16} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                      f"{stats['total_revenue']:>16,.2f}")
+    finally:
+        await server.app.router.shutdown()
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=50000)
+    parser.add_argument("--invoices", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_NAME", "devis_bench")
+    os.environ.setdefault("PDF_PRERENDER_DELAY", "3600")
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
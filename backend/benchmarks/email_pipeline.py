@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Throughput of the full quote email path against the local SMTP sink:
+POST /api/quotes/{id}/send -> outbox worker -> PDF render -> pooled SMTP
+session -> delivered. Each request is followed until its outbox job is sent
+or failed, polling GET /api/outbox/{job_id} like the front end does.
+
+For every concurrency level it reports messages per second, the latency of
+the 202 answer and the end-to-end latency percentiles; then it replays the
+highest level with refused recipients (SMTPRecipientsRefused), temporary
+451 failures, and an SMTP password that stopped working (auth failures).
+
+Needs a MongoDB: the run uses a throwaway database (DB_NAME, default
+devis_bench) that is dropped at the end.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/email_pipeline.py \
+        [--messages 100] [--concurrency 1 4 16] [--latency 0.02] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.smtp_sink import SmtpSink, USERNAME, PASSWORD  # noqa: E402
+
+POLL_SECONDS = 0.05
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def configure(args, sink: SmtpSink, workdir: str):
+    """Environment read by server.py at import time"""
+    os.environ.update({
+        "SMTP_HOST": sink.host,
+        "SMTP_PORT": str(sink.port),
+        "SMTP_EMAIL": USERNAME,
+        "SMTP_PASSWORD": PASSWORD,
+        "SMTP_CA_FILE": str(sink.cert_path),
+        "SMTP_POOL_SIZE": str(args.workers),
+        "OUTBOX_WORKERS": str(args.workers),
+        "OUTBOX_BACKOFF_SECONDS": str(args.backoff),
+        "OUTBOX_MAX_ATTEMPTS": str(args.max_attempts),
+        # Idle workers look for due retries this often
+        "OUTBOX_POLL_SECONDS": str(args.backoff / 2),
+        "PDF_CACHE_DIR": os.path.join(workdir, "pdf"),
+        "LOGO_CACHE_DIR": os.path.join(workdir, "logos"),
+        "PDF_PRERENDER_DELAY": "3600",
+    })
+    os.environ.setdefault("DB_NAME", "devis_bench")
+
+
+class Pipeline:
+    def __init__(self, http, sink: SmtpSink):
+        self.http = http
+        self.sink = sink
+        self.headers = None
+        self.client_id = None
+
+    async def setup(self):
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        r = await self.http.post("/api/auth/register", json={"email": email, "password": "bench", "name": "Bench"})
+        r.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = await self.http.post("/api/clients", headers=self.headers, json={
+            "name": "Client Benchmark", "address": "1 rue du Test, 13001 Marseille",
+            "email": "client@example.com", "phone": "0600000000",
+        })
+        r.raise_for_status()
+        self.client_id = r.json()["id"]
+
+    async def create_quotes(self, count: int):
+        ids = []
+        for i in range(count):
+            r = await self.http.post("/api/quotes", headers=self.headers, json={
+                "client_id": self.client_id,
+                "expiration_date": "2030-01-01",
+                "items": [{"service_name": f"Prestation {i}-{n}", "quantity": 1 + n, "unit": "heure",
+                           "price_ht": 80.0 + n, "tva_rate": 20.0} for n in range(8)],
+            })
+            r.raise_for_status()
+            ids.append(r.json()["id"])
+        return ids
+
+    async def send_one(self, quote_id: str, result: dict):
+        started = time.perf_counter()
+        r = await self.http.post(f"/api/quotes/{quote_id}/send", headers=self.headers, json={})
+        result["accept"].append(time.perf_counter() - started)
+        if r.status_code != 202:
+            result["rejected"] += 1
+            return
+        job_id = r.json()["job_id"]
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            job = (await self.http.get(f"/api/outbox/{job_id}", headers=self.headers)).json()
+            if job["status"] in ("sent", "failed"):
+                break
+        result[job["status"]] += 1
+        result["attempts"] += job["attempts"]
+        result["end_to_end"].append(time.perf_counter() - started)
+
+    async def run(self, name: str, messages: int, concurrency: int):
+        quote_ids = await self.create_quotes(messages)
+        counters_before = dict(self.sink.counters)
+        result = {"accept": [], "end_to_end": [], "sent": 0, "failed": 0, "rejected": 0, "attempts": 0}
+        slots = asyncio.Semaphore(concurrency)
+
+        async def worker(quote_id):
+            async with slots:
+                await self.send_one(quote_id, result)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(q) for q in quote_ids])
+        elapsed = time.perf_counter() - started
+        sink_errors = {k: v - counters_before[k] for k, v in self.sink.counters.items() if v != counters_before[k]}
+        print(f"{name:<22} {concurrency:>4} {result['sent']:>5} {result['failed']:>6} "
+              f"{result['sent'] / elapsed:>7.1f} "
+              f"{percentile(result['accept'], 50) * 1000:>8.0f} {percentile(result['accept'], 95) * 1000:>8.0f} "
+              f"{percentile(result['end_to_end'], 50) * 1000:>8.0f} {percentile(result['end_to_end'], 95) * 1000:>8.0f} "
+              f"{percentile(result['end_to_end'], 99) * 1000:>8.0f} "
+              f"{result['attempts'] / max(1, messages):>8.2f}  {sink_errors or ''}")
+
+
+async def bench(args, sink: SmtpSink):
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                     timeout=120) as http:
+            pipeline = Pipeline(http, sink)
+            await pipeline.setup()
+            print(f"{args.messages} messages per run, {args.workers} outbox workers / SMTP sessions, "
+                  f"{args.latency * 1000:.0f} ms emulated SMTP RTT")
+            print(f"{'scenario':<22} {'conc':>4} {'sent':>5} {'failed':>6} {'msg/s':>7} "
+                  f"{'202 p50':>8} {'202 p95':>8} {'e2e p50':>8} {'e2e p95':>8} {'e2e p99':>8} {'attempts':>8}  sink errors")
+            for concurrency in args.concurrency:
+                await pipeline.run("nominal", args.messages, concurrency)
+            top = max(args.concurrency)
+
+            sink.refuse_rate = 0.2
+            await pipeline.run("20% refused", args.messages, top)
+            sink.refuse_rate = 0.0
+
+            sink.tempfail_rate = 0.2
+            await pipeline.run("20% tempfail (451)", args.messages, top)
+            sink.tempfail_rate = 0.0
+
+            # Credentials revoked while sessions are open: they get dropped and every reconnect fails
+            sink.password = "revoked"
+            sink.drop_sessions()
+            await pipeline.run("auth failure", max(1, args.messages // 10), top)
+            sink.password = PASSWORD
+
+        print(f"\nmetrics: outbox {server.outbox.stats()}\n         smtp {server.smtp_pool.stats()}")
+    finally:
+        await server.app.router.shutdown()
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.02, help="emulated round trip per SMTP reply (s)")
+    parser.add_argument("--workers", type=int, default=4, help="outbox workers and SMTP sessions")
+    parser.add_argument("--backoff", type=float, default=0.2, help="first outbox retry delay (s)")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    args = parser.parse_args()
+
+    with SmtpSink(latency=args.latency) as sink, tempfile.TemporaryDirectory(prefix="email-bench-") as workdir:
+        configure(args, sink, workdir)
+        asyncio.run(bench(args, sink))
+
+
+if __name__ == "__main__":
+    main()
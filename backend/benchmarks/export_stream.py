@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Time to first byte, throughput and peak Python memory of the streaming
+exports (GET /api/export/{quotes,invoices,payments}.{ndjson,csv}) on an
+account seeded with --invoices invoices (and as many quotes), each invoice
+carrying --payments payments. For contrast, the same documents are also
+loaded with to_list() as the list routes used to do.
+
+Peak memory is measured with tracemalloc around each request; it should
+stay flat as --invoices grows.
+
+Needs a MongoDB: the run uses a throwaway database (DB_NAME, default
+devis_bench) that is dropped at the end.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/export_stream.py [--invoices 100000] [--payments 3]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import make_invoice, make_quote  # noqa: E402
+
+SEED_BATCH = 1000
+
+
+async def seed(db, user_id: str, count: int, payments: int):
+    quote, invoice = make_quote(5), make_invoice(5, payments)
+    for start in range(0, count, SEED_BATCH):
+        quotes, invoices = [], []
+        for n in range(start, min(start + SEED_BATCH, count)):
+            created_at = f"2026-01-01T00:00:00.{n:06d}+00:00"
+            quotes.append({**quote, "id": f"q{n}", "user_id": user_id, "quote_number": f"D-2026-{n + 1:03d}",
+                           "status": "accepté", "created_at": created_at})
+            invoices.append({**invoice, "id": f"f{n}", "user_id": user_id, "quote_id": f"q{n}",
+                             "invoice_number": f"F-2026-{n + 1:03d}", "status": "en attente",
+                             "created_at": created_at,
+                             "payments": [{**p, "id": f"f{n}-{p['id']}"} for p in invoice["payments"]]})
+        await db.quotes.insert_many(quotes)
+        await db.invoices.insert_many(invoices)
+
+
+async def bench(args):
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                     timeout=None) as http:
+            r = await http.post("/api/auth/register", json={
+                "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench", "name": "Bench",
+            })
+            r.raise_for_status()
+            user_id = r.json()["user"]["id"]
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            started = time.perf_counter()
+            await seed(server.db, user_id, args.invoices, args.payments)
+            print(f"Seeded {args.invoices} quotes and invoices ({args.payments} payments each) "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            print(f"{'export':<16} {'rows':>8} {'MB':>8} {'ttfb ms':>8} {'total s':>8} {'MB/s':>7} {'peak MB':>8}")
+            for name in ("quotes", "invoices", "payments"):
+                for fmt in ("ndjson", "csv"):
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    ttfb, size, rows = None, 0, 0
+                    async with http.stream("GET", f"/api/export/{name}.{fmt}", headers=headers) as r:
+                        r.raise_for_status()
+                        async for chunk in r.aiter_raw():
+                            ttfb = ttfb or time.perf_counter() - started
+                            size += len(chunk)
+                            rows += chunk.count(b"\n")
+                    elapsed = time.perf_counter() - started
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    rows -= fmt == "csv"  # header line
+                    print(f"{name + '.' + fmt:<16} {rows:>8} {size / 1e6:>8.1f} {ttfb * 1000:>8.1f} "
+                          f"{elapsed:>8.2f} {size / 1e6 / elapsed:>7.1f} {peak / 1e6:>8.1f}")
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            docs = await server.db.invoices.find({"user_id": user_id}, {"_id": 0}).to_list(None)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{'to_list invoices':<16} {len(docs):>8} {'':>8} {elapsed * 1000:>8.1f} {elapsed:>8.2f} "
+                  f"{'':>7} {peak / 1e6:>8.1f}")
+    finally:
+        await server.app.router.shutdown()
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--payments", type=int, default=3, help="payments per invoice")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_NAME", "devis_bench")
+    os.environ.setdefault("PDF_PRERENDER_DELAY", "3600")
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
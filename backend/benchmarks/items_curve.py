@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Render-time curve of the quote PDF against the number of line items.
+
+Usage (from backend/):  python benchmarks/items_curve.py [10 100 1000 5000]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_renderer import generate_quote_pdf  # noqa: E402
+from benchmarks.synthetic import COMPANY, make_quote  # noqa: E402
+
+RUNS = 3
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 1000, 5000]
+    generate_quote_pdf(make_quote(10), COMPANY)  # warm-up: font metrics, imports
+    print(f"{'items':>7} {'best ms':>10} {'us/item':>9} {'bytes':>10}")
+    for n in sizes:
+        quote = make_quote(n, tva_rates=(0.0, 20.0))
+        best = float("inf")
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            pdf = generate_quote_pdf(quote, COMPANY)
+            best = min(best, time.perf_counter() - started)
+        print(f"{n:>7} {best * 1000:>10.1f} {best / n * 1e6:>9.0f} {len(pdf):>10}")
+
+
+if __name__ == "__main__":
+    main()
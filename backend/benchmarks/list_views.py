@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Payload size and latency of GET /api/quotes and /api/invoices in full view
+vs ?view=summary (and a two-field ?fields= list), on accounts whose quotes
+carry more and more line items.
+
+For each line-item count a fresh account gets --quotes quotes (a third of
+them converted to invoices); each view is then requested --runs times with
+one full page (?limit=200).
+
+Needs a MongoDB: the run uses a throwaway database (DB_NAME, default
+devis_bench) that is dropped at the end.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/list_views.py [--items 5 50 200] [--quotes 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+VIEWS = [("full", {}), ("summary", {"view": "summary"}), ("fields", {"fields": "quote_number,status"})]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def make_account(http, server, quotes: int, items: int) -> dict:
+    r = await http.post("/api/auth/register", json={
+        "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench", "name": "Bench",
+    })
+    r.raise_for_status()
+    user_id = r.json()["user"]["id"]
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    r = await http.post("/api/clients", headers=headers, json={
+        "name": "Client Benchmark", "address": "1 rue du Test", "email": "client@example.com", "phone": "0600000000",
+    })
+    r.raise_for_status()
+    body = {"client_id": r.json()["id"], "expiration_date": "2030-01-01",
+            "items": [{"service_name": f"Prestation {n} - tirage photo grand format", "quantity": 1 + n % 3,
+                       "unit": "heure", "price_ht": 80.0 + n, "tva_rate": 20.0} for n in range(items)]}
+    ids = []
+    for _ in range(quotes):
+        r = await http.post("/api/quotes", headers=headers, json=body)
+        r.raise_for_status()
+        ids.append(r.json()["id"])
+    for quote_id in ids[::3]:
+        (await http.post(f"/api/quotes/{quote_id}/convert-to-invoice", headers=headers)).raise_for_status()
+    # Invoices with a payment history, like real ones
+    invoices = await server.db.invoices.find({"user_id": user_id}, {"_id": 0, "id": 1}).to_list(None)
+    payment = {"amount": 10.0, "payment_date": "2026-01-15", "payment_method": "virement"}
+    for invoice in invoices:
+        for _ in range(3):
+            (await http.post(f"/api/invoices/{invoice['id']}/payment", headers=headers, json=payment)).raise_for_status()
+    return headers
+
+
+async def bench(args):
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                     timeout=300) as http:
+            print(f"{args.quotes} quotes per account, one page of 200, {args.runs} runs")
+            print(f"{'items':>5} {'route':<10} {'view':<8} {'docs':>5} {'bytes':>10} {'p50 ms':>8} {'p95 ms':>8} {'vs full':>8}")
+            for items in args.items:
+                headers = await make_account(http, server, args.quotes, items)
+                for route in ("quotes", "invoices"):
+                    full_bytes = None
+                    for view, params in VIEWS:
+                        if route == "invoices" and view == "fields":
+                            params = {"fields": "invoice_number,status"}
+                        latencies = []
+                        for _ in range(args.runs):
+                            started = time.perf_counter()
+                            r = await http.get(f"/api/{route}", headers=headers, params={"limit": 200, **params})
+                            r.raise_for_status()
+                            latencies.append(time.perf_counter() - started)
+                        size = len(r.content)
+                        full_bytes = full_bytes or size
+                        print(f"{items:>5} {route:<10} {view:<8} {len(r.json()):>5} {size:>10} "
+                              f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                              f"{size / full_bytes:>7.1%}")
+    finally:
+        await server.app.router.shutdown()
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[5, 50, 200], help="line items per quote")
+    parser.add_argument("--quotes", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_NAME", "devis_bench")
+    os.environ.setdefault("PDF_PRERENDER_DELAY", "3600")
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
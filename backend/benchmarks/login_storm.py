@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Login storm: latency of other endpoints while a burst of logins runs.
+
+A probe keeps calling GET /api/auth/me (auth only) and GET /api/clients
+(one MongoDB query) every 10 ms; the script records its latency alone,
+then during a burst of concurrent POST /api/auth/login. It runs the storm
+twice: with bcrypt on the event loop (how register/login used to hash) and
+with the password thread pool.
+
+Needs a MongoDB: the run uses a throwaway database (DB_NAME, default
+devis_bench) that is dropped at the end.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/login_storm.py \
+        [--logins 200] [--concurrency 50] [--rounds 12]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import Executor, Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PROBE_INTERVAL = 0.01
+
+
+class InlineExecutor(Executor):
+    """Runs the call in the caller's thread: bcrypt blocks the event loop again"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def probe(http, headers, stop: asyncio.Event, latencies: list):
+    """Latency is counted from when the probe was due, so time spent waiting
+    for a blocked event loop shows up instead of silently delaying the probe"""
+    paths = ["/api/auth/me", "/api/clients"]
+    i = 0
+    due = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        r = await http.get(paths[i % len(paths)], headers=headers)
+        r.raise_for_status()
+        finished = time.perf_counter()
+        latencies.append(finished - due)
+        due = max(due + PROBE_INTERVAL, finished)
+        i += 1
+
+
+async def storm(http, credentials: dict, logins: int, concurrency: int) -> float:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with slots:
+            r = await http.post("/api/auth/login", json=credentials)
+            r.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(logins)])
+    return logins / (time.perf_counter() - started)
+
+
+async def measure(http, headers, credentials: dict, args):
+    """(probe latencies alone, probe latencies during the storm, logins/s)"""
+    stop = asyncio.Event()
+    idle = []
+    task = asyncio.create_task(probe(http, headers, stop, idle))
+    await asyncio.sleep(1.0)
+    stop.set()
+    await task
+
+    stop = asyncio.Event()
+    busy = []
+    task = asyncio.create_task(probe(http, headers, stop, busy))
+    rate = await storm(http, credentials, args.logins, args.concurrency)
+    stop.set()
+    await task
+    return idle, busy, rate
+
+
+async def bench(args):
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                     timeout=300) as http:
+            credentials = {"email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password"}
+            r = await http.post("/api/auth/register", json={**credentials, "name": "Bench"})
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            print(f"{args.logins} logins, {args.concurrency} concurrent, bcrypt cost {server.BCRYPT_ROUNDS}, "
+                  f"{server.PASSWORD_HASH_WORKERS} hashing threads")
+            print(f"{'mode':<22} {'phase':<7} {'probes':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'logins/s':>9}")
+            pool = server.password_pool
+            for mode, executor in (("bcrypt on event loop", InlineExecutor()), ("password thread pool", pool)):
+                server.password_pool = executor
+                idle, busy, rate = await measure(http, headers, credentials, args)
+                for phase, latencies, logins in (("idle", idle, ""), ("storm", busy, f"{rate:.1f}")):
+                    print(f"{mode:<22} {phase:<7} {len(latencies):>6} {percentile(latencies, 50) * 1000:>8.1f} "
+                          f"{percentile(latencies, 95) * 1000:>8.1f} {max(latencies, default=0) * 1000:>8.1f} "
+                          f"{logins:>9}")
+            server.password_pool = pool
+    finally:
+        await server.app.router.shutdown()
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=2, help="password hashing threads")
+    args = parser.parse_args()
+
+    # Read by server.py at import time
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ.setdefault("DB_NAME", "devis_bench")
+    os.environ.setdefault("PDF_PRERENDER_DELAY", "3600")
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Concurrency check for document numbers: creates --quotes quotes in parallel
+through POST /api/quotes, then converts --invoices of them to invoices in
+parallel, and fails unless every quote number is unique and the invoice
+numbers are exactly F-<year>-001 .. F-<year>-<n> (unique and gap-free).
+
+Needs a MongoDB: the run uses a throwaway database (DB_NAME, default
+devis_bench) that is dropped at the end.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/numbering_race.py [--quotes 1000] [--invoices 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def bench(args) -> bool:
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                     timeout=300) as http:
+            r = await http.post("/api/auth/register", json={
+                "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench", "name": "Bench",
+            })
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            r = await http.post("/api/clients", headers=headers, json={
+                "name": "Client Benchmark", "address": "1 rue du Test", "email": "client@example.com", "phone": "0600000000",
+            })
+            r.raise_for_status()
+            quote = {"client_id": r.json()["id"], "expiration_date": "2030-01-01",
+                     "items": [{"service_name": "Prestation", "quantity": 1, "unit": "heure", "price_ht": 80.0, "tva_rate": 20.0}]}
+
+            async def create():
+                r = await http.post("/api/quotes", headers=headers, json=quote)
+                r.raise_for_status()
+                return r.json()
+
+            started = time.perf_counter()
+            quotes = await asyncio.gather(*[create() for _ in range(args.quotes)])
+            elapsed = time.perf_counter() - started
+            numbers = Counter(q["quote_number"] for q in quotes)
+            duplicates = {n: c for n, c in numbers.items() if c > 1}
+            print(f"{len(quotes)} quotes created in parallel in {elapsed:.2f}s: "
+                  f"{len(numbers)} distinct numbers, {len(duplicates)} duplicated")
+
+            async def convert(quote_id):
+                r = await http.post(f"/api/quotes/{quote_id}/convert-to-invoice", headers=headers)
+                r.raise_for_status()
+                return r.json()["invoice_number"]
+
+            invoice_numbers = await asyncio.gather(*[convert(q["id"]) for q in quotes[:args.invoices]])
+            year = datetime.now(timezone.utc).year
+            expected = {f"F-{year}-{n:03d}" for n in range(1, args.invoices + 1)}
+            gap_free = sorted(invoice_numbers) == sorted(expected)
+            print(f"{len(invoice_numbers)} invoices converted in parallel: "
+                  f"{'unique and gap-free' if gap_free else 'NOT gap-free'} "
+                  f"(transactions {'on' if server.counters.transactions else 'off'})")
+            return not duplicates and gap_free
+    finally:
+        await server.app.router.shutdown()
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--invoices", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_NAME", "devis_bench")
+    os.environ.setdefault("PDF_PRERENDER_DELAY", "3600")
+    ok = asyncio.run(bench(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
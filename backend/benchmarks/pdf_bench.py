@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of quote and invoice PDF rendering.
+
+Calls generate_quote_pdf / generate_invoice_pdf directly on synthetic
+documents (no database, no network) and records, per scenario, the p50/p95
+wall time, the peak traced memory and the output size.
+
+Usage (from backend/):
+    python benchmarks/pdf_bench.py                          # print results
+    python benchmarks/pdf_bench.py --output baseline.json   # save a baseline
+    python benchmarks/pdf_bench.py --compare baseline.json  # diff against one
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_renderer import generate_quote_pdf, generate_invoice_pdf  # noqa: E402
+from benchmarks.synthetic import COMPANY, make_quote, make_invoice, make_logo  # noqa: E402
+
+ITEM_COUNTS = (1, 10, 50, 200, 1000)
+PAYMENT_COUNTS = (0, 3, 20)
+SINGLE_RATE = (20.0,)
+
+
+def scenarios(logo: bytes):
+    """(name, render function, document, logo) for every benchmarked case"""
+    for n_items in ITEM_COUNTS:
+        for with_logo in (False, True):
+            suffix = "logo" if with_logo else "nologo"
+            yield (f"quote/items={n_items}/{suffix}", generate_quote_pdf,
+                   make_quote(n_items), logo if with_logo else None)
+    yield ("quote/items=50/single-rate/nologo", generate_quote_pdf, make_quote(50, SINGLE_RATE), None)
+    for n_items in ITEM_COUNTS:
+        for n_payments in PAYMENT_COUNTS:
+            yield (f"invoice/items={n_items}/payments={n_payments}/logo", generate_invoice_pdf,
+                   make_invoice(n_items, n_payments), logo)
+    yield ("invoice/items=10/payments=3/nologo", generate_invoice_pdf, make_invoice(10, 3), None)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(render, doc, logo, runs: int) -> dict:
+    render(doc, COMPANY, logo)  # warm-up
+
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        pdf = render(doc, COMPANY, logo)
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    render(doc, COMPANY, logo)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(times, 50) * 1000, 2),
+        "p95_ms": round(percentile(times, 95) * 1000, 2),
+        "mean_ms": round(statistics.mean(times) * 1000, 2),
+        "peak_kb": round(peak / 1024, 1),
+        "bytes": len(pdf),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def runs_for(name: str, base_runs: int) -> int:
+    # Keep the big documents affordable while still getting a p95
+    return max(5, base_runs // 4) if "items=1000" in name else base_runs
+
+
+def compare(results: dict, baseline: dict):
+    print(f"\n{'scenario':<44} {'p50 ms':>17} {'peak KB':>19} {'bytes':>19}")
+    for name, cur in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<44} {'(new)':>17}")
+            continue
+        cols = []
+        for field in ("p50_ms", "peak_kb", "bytes"):
+            delta = (cur[field] - old[field]) / old[field] * 100 if old[field] else 0.0
+            cols.append(f"{cur[field]:>10} {delta:>+6.1f}%")
+        print(f"{name:<44} {cols[0]:>17} {cols[1]:>19} {cols[2]:>19}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="timed renders per scenario")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to diff the results against")
+    parser.add_argument("--filter", default="", help="only run scenarios containing this text")
+    args = parser.parse_args()
+
+    logo = make_logo()
+    results = {}
+    print(f"{'scenario':<44} {'p50 ms':>8} {'p95 ms':>8} {'peak KB':>9} {'bytes':>9}")
+    for name, render, doc, doc_logo in scenarios(logo):
+        if args.filter not in name:
+            continue
+        results[name] = measure(render, doc, doc_logo, runs_for(name, args.runs))
+        r = results[name]
+        print(f"{name:<44} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['peak_kb']:>9} {r['bytes']:>9}")
+
+    if args.output:
+        report = {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "scenarios": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+        print(f"\nSaved {len(results)} scenarios to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(f"\nCompared with {args.compare} (revision {baseline.get('revision', '?')})")
+        compare(results, baseline["scenarios"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Latency of GET /api/search on a tenant seeded with --documents quotes, as
+many invoices and a tenth as many clients, for each kind of query: client
+name prefix, email prefix, exact quote / invoice number, line-item word and
+a term matching nothing. Each query is run --runs times; the run fails if a
+p95 exceeds --target-ms.
+
+Needs a MongoDB: the run uses a throwaway database (DB_NAME, default
+devis_bench) that is dropped at the end.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/search_latency.py [--documents 100000] [--target-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import make_invoice, make_quote  # noqa: E402
+
+SEED_BATCH = 1000
+FIRST_NAMES = ["Élodie", "Jérôme", "Anaïs", "François", "Chloé", "Hélène", "Noël", "Loïc", "Maëlle", "Cédric"]
+LAST_NAMES = ["Dupont", "Lefèvre", "Moreau", "Girard", "Bézier", "Fauré", "Brûlé", "Castel", "Mercier", "Roché"]
+SERVICES = ["Reportage photo mariage", "Tirage grand format", "Montage vidéo", "Séance portrait", "Drone aérien",
+            "Album photo", "Retouche studio", "Captation concert", "Shooting produit", "Livraison clé USB"]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def seed(server, user_id: str, count: int):
+    from search import client_search_terms
+
+    clients = []
+    for n in range(max(1, count // 10)):
+        name = f"{FIRST_NAMES[n % 10]} {LAST_NAMES[n // 10 % 10]} {n}"
+        email = f"client{n}@example.com"
+        clients.append({"id": f"c{n}", "user_id": user_id, "name": name, "email": email, "address": "x", "phone": "0",
+                        "search_terms": client_search_terms(name, email),
+                        "created_at": f"2026-01-01T00:00:00.{n:06d}+00:00"})
+    for start in range(0, len(clients), SEED_BATCH):
+        await server.db.clients.insert_many(clients[start:start + SEED_BATCH])
+
+    quote, invoice = make_quote(3), make_invoice(3, 1)
+    for start in range(0, count, SEED_BATCH):
+        quotes, invoices = [], []
+        for n in range(start, min(start + SEED_BATCH, count)):
+            client = clients[n % len(clients)]
+            items = [{**item, "service_name": f"{SERVICES[(n + i) % 10]} {n}"} for i, item in enumerate(quote["items"])]
+            common = {"user_id": user_id, "client_id": client["id"], "client_name": client["name"], "items": items,
+                      "created_at": f"2026-01-01T00:00:00.{n:06d}+00:00"}
+            quotes.append({**quote, **common, "id": f"q{n}", "quote_number": f"D-2026-{n + 1:03d}", "status": "envoyé"})
+            invoices.append({**invoice, **common, "id": f"f{n}", "quote_id": f"q{n}",
+                             "invoice_number": f"F-2026-{n + 1:03d}", "status": "en attente"})
+        await server.db.quotes.insert_many(quotes)
+        await server.db.invoices.insert_many(invoices)
+
+
+async def bench(args) -> bool:
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                     timeout=300) as http:
+            r = await http.post("/api/auth/register", json={
+                "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench", "name": "Bench",
+            })
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            started = time.perf_counter()
+            await seed(server, r.json()["user"]["id"], args.documents)
+            print(f"Seeded {args.documents} quotes, {args.documents} invoices and {max(1, args.documents // 10)} clients "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            middle = args.documents // 2
+            queries = [
+                ("name prefix", "elod"),
+                ("name word", "lefev"),
+                ("email prefix", f"client{middle // 10}@"),
+                ("quote number", f"D-2026-{middle:03d}"),
+                ("invoice number", f"f-2026-{middle:03d}"),
+                ("line item", "drone"),
+                ("no match", "introuvable"),
+            ]
+            ok = True
+            print(f"{'query':<16} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}")
+            for label, q in queries:
+                latencies = []
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    r = await http.get("/api/search", headers=headers, params={"q": q})
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                p95 = percentile(latencies, 95) * 1000
+                ok &= p95 <= args.target_ms
+                print(f"{label:<16} {len(r.json()):>5} {percentile(latencies, 50) * 1000:>8.1f} {p95:>8.1f}"
+                      f"{'' if p95 <= args.target_ms else '  over target'}")
+            return ok
+    finally:
+        await server.app.router.shutdown()
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000, help="quotes (and invoices) in the tenant")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--target-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_NAME", "devis_bench")
+    os.environ.setdefault("PDF_PRERENDER_DELAY", "3600")
+    ok = asyncio.run(bench(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
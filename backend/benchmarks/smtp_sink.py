@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Local SMTP stand-in: implicit TLS (like IONOS on port 465), AUTH PLAIN/LOGIN,
+NOOP, RSET, and messages kept in memory instead of being delivered.
+
+Latency and failures can be injected to see how the email path behaves
+against a slow or flaky provider:
+  latency / jitter   delay before every reply (emulated round trip); the
+                     greeting waits two round trips (TCP + TLS)
+  refuse_rate        share of recipients refused with 550 (SMTPRecipientsRefused)
+  refuse_recipients  addresses always refused
+  tempfail_rate      share of messages rejected with 451 after DATA
+  drop_rate          share of messages after which the connection is dropped
+  password           a client using another password gets 535 (auth failure)
+
+In code (benchmarks):
+    with SmtpSink(latency=0.02) as sink:
+        smtplib.SMTP_SSL(sink.host, sink.port, context=sink.client_context())
+
+Standalone, to point the API at it (SMTP_HOST=127.0.0.1 SMTP_PORT=2465
+SMTP_EMAIL=bench@localhost SMTP_PASSWORD=bench SMTP_CA_FILE=<printed path>):
+    python benchmarks/smtp_sink.py --port 2465 --latency 0.05 --refuse-rate 0.1
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import random
+import ssl
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+USERNAME = "bench@localhost"
+PASSWORD = "bench"
+
+
+def make_certificate(directory: Path) -> Tuple[Path, Path]:
+    """Self-signed certificate for localhost / 127.0.0.1"""
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = directory / "sink.crt", directory / "sink.key"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+class SmtpSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 username: str = USERNAME, password: str = PASSWORD, refuse_rate: float = 0.0,
+                 refuse_recipients: Optional[Set[str]] = None, tempfail_rate: float = 0.0, drop_rate: float = 0.0):
+        self.host = host
+        self.port = port
+        # Read on every command, so they can be changed while the sink runs
+        self.latency = latency
+        self.jitter = jitter
+        self.username = username
+        self.password = password
+        self.refuse_rate = refuse_rate
+        self.refuse_recipients = refuse_recipients or set()
+        self.tempfail_rate = tempfail_rate
+        self.drop_rate = drop_rate
+        self.messages: List[Tuple[str, List[str], bytes]] = []
+        self.connections = 0
+        self.counters = {"auth_failed": 0, "refused": 0, "tempfailed": 0, "dropped": 0}
+        self._tmp = tempfile.TemporaryDirectory(prefix="smtp-sink-")
+        self.cert_path, key_path = make_certificate(Path(self._tmp.name))
+        self._server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self._server_context.load_cert_chain(self.cert_path, key_path)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._sessions: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def client_context(self) -> ssl.SSLContext:
+        """Client TLS context trusting the sink's certificate"""
+        return ssl.create_default_context(cafile=str(self.cert_path))
+
+    # ----- lifecycle -----
+
+    def start(self) -> "SmtpSink":
+        started = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(started),), name="smtp-sink", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    async def _serve(self, started: threading.Event):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_server(self._handle, self.host, self.port, ssl=self._server_context, backlog=512)
+        self.port = server.sockets[0].getsockname()[1]
+        started.set()
+        await self._stopped.wait()
+        server.close()
+        self._drop_sessions()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+
+    def _drop_sessions(self):
+        # Abort without TLS close_notify, like a provider timing sessions out
+        for writer in list(self._sessions.values()):
+            writer.transport.abort()
+
+    def drop_sessions(self):
+        """Drop every open client session (thread-safe)"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._drop_sessions)
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            self._thread.join()
+            self._loop = None
+        self._tmp.cleanup()
+
+    def __enter__(self) -> "SmtpSink":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ----- protocol -----
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._sessions[task] = writer
+
+        async def reply(line: str):
+            delay = self._delay()
+            if delay:
+                await asyncio.sleep(delay)
+            writer.write(line.encode("ascii") + b"\r\n")
+            await writer.drain()
+
+        sender, recipients, authenticated = None, [], False
+        try:
+            await asyncio.sleep(self._delay())
+            await reply("220 sink ESMTP ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, arg = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+                command = command.upper()
+                if command in ("EHLO", "HELO"):
+                    await reply("250-sink\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 52428800")
+                elif command == "AUTH":
+                    authenticated = await self._auth(arg, reader, reply)
+                elif command == "NOOP":
+                    await reply("250 OK")
+                elif command == "RSET":
+                    sender, recipients = None, []
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                elif not authenticated:
+                    await reply("530 Authentication required")
+                elif command == "MAIL":
+                    sender, recipients = arg, []
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    address = arg.partition(":")[2].strip("<> ")
+                    if address in self.refuse_recipients or random.random() < self.refuse_rate:
+                        self.counters["refused"] += 1
+                        await reply("550 5.1.1 Recipient address rejected: user unknown")
+                    else:
+                        recipients.append(address)
+                        await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    if random.random() < self.drop_rate:
+                        self.counters["dropped"] += 1
+                        writer.transport.abort()
+                        break
+                    if random.random() < self.tempfail_rate:
+                        self.counters["tempfailed"] += 1
+                        await reply("451 4.3.0 Temporary failure, try again later")
+                    else:
+                        self.messages.append((sender, recipients, data))
+                        await reply("250 OK queued")
+                    sender, recipients = None, []
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+            self._sessions.pop(task, None)
+
+    async def _auth(self, arg: str, reader: asyncio.StreamReader, reply) -> bool:
+        mechanism, _, initial = arg.partition(" ")
+        if mechanism.upper() == "PLAIN":
+            if not initial:
+                await reply("334 ")
+                initial = (await reader.readline()).decode().strip()
+            _, username, password = base64.b64decode(initial).decode().split("\0")
+        elif mechanism.upper() == "LOGIN":
+            await reply("334 VXNlcm5hbWU6")
+            username = base64.b64decode(await reader.readline()).decode()
+            await reply("334 UGFzc3dvcmQ6")
+            password = base64.b64decode(await reader.readline()).decode()
+        else:
+            await reply("504 Unrecognized authentication type")
+            return False
+        if (username, password) != (self.username, self.password):
+            self.counters["auth_failed"] += 1
+            await reply("535 Authentication credentials invalid")
+            return False
+        await reply("235 Authentication successful")
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2465)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--refuse-rate", type=float, default=0.0)
+    parser.add_argument("--tempfail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.host, args.port, latency=args.latency, jitter=args.jitter, refuse_rate=args.refuse_rate,
+                    tempfail_rate=args.tempfail_rate, drop_rate=args.drop_rate).start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port} (login {USERNAME} / {PASSWORD})")
+    print(f"SMTP_CA_FILE={sink.cert_path}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f"\n{len(sink.messages)} message(s) received, {sink.connections} connection(s), {sink.counters}")
+    finally:
+        sink.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+SMTP throughput: one connection per message (TLS handshake + AUTH every
+time, the previous send_quote_email behaviour) vs the SmtpPool sessions.
+
+Runs against the local SMTP sink; --latency emulates the round trip to the
+provider. Messages carry a PDF-sized attachment.
+
+Usage (from backend/):  python benchmarks/smtp_throughput.py [--messages 200] [--latency 0.02]
+"""
+import argparse
+import smtplib
+import ssl
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smtp_pool import SmtpPool  # noqa: E402
+from benchmarks.smtp_sink import SmtpSink, USERNAME, PASSWORD  # noqa: E402
+
+
+def make_message(attachment_size: int) -> str:
+    msg = MIMEMultipart()
+    msg['From'] = USERNAME
+    msg['To'] = "client@example.com"
+    msg['Subject'] = "Devis D-2026-001 - CREATIVINDUSTRY"
+    msg.attach(MIMEText("<p>Veuillez trouver ci-joint notre devis.</p>", 'html'))
+    attachment = MIMEApplication(b"%PDF-1.4 " + b"x" * attachment_size, _subtype='pdf')
+    attachment.add_header('Content-Disposition', 'attachment', filename="Devis-D-2026-001.pdf")
+    msg.attach(attachment)
+    return msg.as_string()
+
+
+def run(send, messages: int, concurrency: int) -> float:
+    started = time.perf_counter()
+    if concurrency == 1:
+        for _ in range(messages):
+            send()
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            for future in [executor.submit(send) for _ in range(messages)]:
+                future.result()
+    return messages / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="emulated round trip per SMTP reply (s)")
+    parser.add_argument("--attachment-kb", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    message = make_message(args.attachment_kb * 1024)
+    with SmtpSink(latency=args.latency) as sink:
+        def per_message():
+            # What send_quote_email did for every email
+            context = ssl.create_default_context()
+            context.load_verify_locations(sink.cert_path)
+            with smtplib.SMTP_SSL(sink.host, sink.port, context=context, timeout=30) as smtp:
+                smtp.login(USERNAME, PASSWORD)
+                smtp.sendmail(USERNAME, "client@example.com", message)
+
+        print(f"{args.messages} messages, {args.attachment_kb} KB attachment, {args.latency * 1000:.0f} ms emulated RTT")
+        print(f"{'mode':<22} {'concurrency':>11} {'msg/s':>9}")
+        for concurrency in args.concurrency:
+            rate = run(per_message, args.messages, concurrency)
+            print(f"{'connection per mail':<22} {concurrency:>11} {rate:>9.1f}")
+
+            pool = SmtpPool(sink.host, sink.port, USERNAME, PASSWORD, size=concurrency,
+                            context=sink.client_context())
+            rate = run(lambda: pool.send(USERNAME, "client@example.com", message), args.messages, concurrency)
+            stats = pool.stats()
+            pool.close()
+            print(f"{'pooled sessions':<22} {concurrency:>11} {rate:>9.1f}   "
+                  f"({stats['connects']} connects, {stats['reuses']} reuses)")
+
+
+if __name__ == "__main__":
+    main()
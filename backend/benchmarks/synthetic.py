@@ -0,0 +1,96 @@
+"""Synthetic quotes, invoices and company settings for the offline benchmarks."""
+from io import BytesIO
+
+TVA_RATES = (0.0, 5.5, 10.0, 20.0)
+
+COMPANY = {
+    "name": "CREATIVINDUSTRY",
+    "address": "15 RUE AUGER, 13004 MARSEILLE 4 - France",
+    "email": "CONTACT@CREATIVINDUSTRY.COM",
+    "phone": "06 68 89 69 96",
+    "bank_name": "QONTO",
+    "iban": "FR7616958000010827407974101",
+    "bic": "QNTOFRP1XXX",
+}
+
+
+def make_items(n_items: int, tva_rates=TVA_RATES) -> list:
+    items = []
+    for i in range(n_items):
+        name = f"Prestation photo {i}"
+        if i % 10 == 0:
+            name += " avec un libellé suffisamment long pour passer à la ligne"
+        items.append({
+            "service_name": name,
+            "quantity": 1 + i % 3,
+            "unit": "heure",
+            "price_ht": 50.0 + i % 7,
+            "tva_rate": tva_rates[i % len(tva_rates)],
+        })
+    return items
+
+
+def _totals(items: list, discount: float = 0.0) -> dict:
+    total_ht_before_discount = sum(i["quantity"] * i["price_ht"] for i in items)
+    total_ht = total_ht_before_discount - discount
+    total_tva = sum(i["quantity"] * i["price_ht"] * i["tva_rate"] / 100 for i in items)
+    return {
+        "total_ht_before_discount": total_ht_before_discount,
+        "discount": discount,
+        "total_ht": total_ht,
+        "total_tva": total_tva,
+        "total_ttc": total_ht + total_tva,
+    }
+
+
+def make_quote(n_items: int, tva_rates=TVA_RATES) -> dict:
+    items = make_items(n_items, tva_rates)
+    return {
+        "id": "bench-quote",
+        "quote_number": "D-2026-001",
+        "client_name": "Client Test",
+        "client_address": "1 rue de la Paix, 75002 Paris",
+        "client_email": "client@example.com",
+        "client_phone": "06 00 00 00 00",
+        "emission_date": "2026-01-15",
+        "expiration_date": "2026-02-15",
+        "event_date": "2026-06-20",
+        "items": items,
+        **_totals(items, discount=10.0 if n_items else 0.0),
+    }
+
+
+def make_invoice(n_items: int, n_payments: int = 0, tva_rates=TVA_RATES) -> dict:
+    invoice = make_quote(n_items, tva_rates)
+    invoice.pop("expiration_date")
+    invoice.pop("event_date")
+    payments = [
+        {"id": f"p{i}", "amount": 100.0, "payment_date": f"2026-01-{1 + i % 28:02d}",
+         "payment_method": "virement", "notes": "Acompte" if i % 2 else None}
+        for i in range(n_payments)
+    ]
+    paid = sum(p["amount"] for p in payments)
+    invoice.update({
+        "id": "bench-invoice",
+        "invoice_number": "F-2026-001",
+        "quote_id": "bench-quote-0000",
+        "due_date": "2026-02-15",
+        "payments": payments,
+        "acompte": paid,
+        "reste_a_payer": max(invoice["total_ttc"] - paid, 0),
+    })
+    return invoice
+
+
+def make_logo(width: int = 1200, height: int = 750, opaque: bool = False) -> bytes:
+    """A PNG logo at the kind of resolution a CDN typically serves"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB" if opaque else "RGBA", (width, height), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, width, 12):
+        draw.line([(i, 0), (width - i, height)], fill=(30, 58, 95, 255), width=3)
+    draw.ellipse([width // 4, height // 4, 3 * width // 4, 3 * height // 4], fill=(217, 119, 6, 200))
+    buffer = BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
@@ -0,0 +1,111 @@
+"""Per-user, per-year sequences for quote and invoice numbers.
+
+Each (user_id, kind, year) has one document in the `counters` collection;
+taking a number is a single find_one_and_update with $inc, atomic under any
+concurrency, and the sequence restarts with the year printed in the number
+(D-2026-001, F-2026-001...).
+
+Invoices must be numbered without gaps: when the MongoDB deployment
+supports transactions (replica set or sharded cluster), the invoice is
+inserted in the same transaction as the increment, so a failed insert gives
+its number back. On a standalone server a failed insert leaves a gap and a
+warning is logged at startup.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+QUOTE = "quote"
+INVOICE = "invoice"
+
+# kind -> (collection, number field, prefix)
+NUMBERED = {
+    QUOTE: ("quotes", "quote_number", "D"),
+    INVOICE: ("invoices", "invoice_number", "F"),
+}
+
+MIGRATION_ID = "counters_seeded_v1"
+
+
+def format_number(kind: str, year: int, seq: int) -> str:
+    return f"{NUMBERED[kind][2]}-{year}-{seq:03d}"
+
+
+class Counters:
+    def __init__(self):
+        self.db = None
+        self.collection = None
+        self.transactions = False
+
+    async def start(self, db):
+        self.db = db
+        self.collection = db.counters
+        await self.collection.create_index(
+            [("user_id", ASCENDING), ("kind", ASCENDING), ("year", ASCENDING)], unique=True
+        )
+        self.transactions = await self._supports_transactions()
+        if not self.transactions:
+            logger.warning("MongoDB without transactions: an invoice insert that fails leaves a gap in the numbering")
+        await self.seed()
+
+    async def _supports_transactions(self) -> bool:
+        try:
+            hello = await self.db.client.admin.command("hello")
+        except Exception:
+            return False
+        return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+    async def next_value(self, user_id: str, kind: str, year: Optional[int] = None, session=None) -> str:
+        """Take the next number of `kind` for `user_id` (one round trip)"""
+        year = year or datetime.now(timezone.utc).year
+        query = {"user_id": user_id, "kind": kind, "year": year}
+        for attempt in range(2):
+            try:
+                counter = await self.collection.find_one_and_update(
+                    query,
+                    {"$inc": {"seq": 1}},
+                    upsert=True,
+                    projection={"_id": 0, "seq": 1},
+                    return_document=ReturnDocument.AFTER,
+                    session=session,
+                )
+                return format_number(kind, year, counter["seq"])
+            except DuplicateKeyError:
+                # Two first numbers of the year upserted at once: the loser retries on the existing document
+                if attempt:
+                    raise
+
+    async def seed(self):
+        """Migration: start every sequence after the highest number already
+        issued (idempotent, $max never lowers a counter)"""
+        if await self.db.migrations.find_one({"_id": MIGRATION_ID}):
+            return
+        highest = {}
+        for kind, (collection, field, _) in NUMBERED.items():
+            # One pass over (user_id, number) only; numbers not shaped X-YYYY-NNN are ignored
+            async for doc in self.db[collection].find({}, {"_id": 0, "user_id": 1, field: 1}):
+                parts = str(doc.get(field) or "").split("-")
+                if len(parts) != 3 or not (parts[1].isdigit() and parts[2].isdigit()):
+                    continue
+                key = (doc.get("user_id"), kind, int(parts[1]))
+                highest[key] = max(highest.get(key, 0), int(parts[2]))
+        requests = [
+            UpdateOne({"user_id": user_id, "kind": kind, "year": year}, {"$max": {"seq": seq}}, upsert=True)
+            for (user_id, kind, year), seq in highest.items()
+        ]
+        if requests:
+            await self.collection.bulk_write(requests, ordered=False)
+        await self.db.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"applied_at": datetime.now(timezone.utc).isoformat(), "counters": len(requests)}},
+            upsert=True,
+        )
+        logger.info(f"Seeded {len(requests)} document number counter(s) from existing quotes and invoices")
+
+
+counters = Counters()
@@ -0,0 +1,172 @@
+"""Streaming NDJSON / CSV exports of quotes, invoices and payments.
+
+Rows are produced while the Motor cursor is iterated (EXPORT_CURSOR_BATCH_SIZE
+documents per round trip) and sent in chunks of about EXPORT_CHUNK_BYTES, the
+first row straight away: memory stays bounded by one cursor batch whatever
+the size of the export. Payments live inside their invoice; they are
+unwound by the aggregation so each payment is one row.
+
+CSV exports are opened in spreadsheets: a text cell starting with =, +, -,
+@, a tab or a carriage return is prefixed with ' so it is shown as text and
+never evaluated as a formula.
+"""
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+EXPORT_CURSOR_BATCH_SIZE = int(os.environ.get('EXPORT_CURSOR_BATCH_SIZE', 1000))
+EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', 64 * 1024))
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# CSV columns (NDJSON rows carry the whole document; items stay nested there)
+QUOTE_COLUMNS = [
+    "id", "quote_number", "status", "client_id", "client_name", "client_email", "emission_date",
+    "expiration_date", "event_date", "total_ht_before_discount", "discount", "total_ht", "total_tva",
+    "total_ttc", "items_count", "created_at", "sent_at", "opened_at", "open_count",
+]
+INVOICE_COLUMNS = [
+    "id", "invoice_number", "quote_id", "status", "client_id", "client_name", "client_email", "emission_date",
+    "due_date", "total_ht_before_discount", "discount", "total_ht", "total_tva", "total_ttc", "acompte",
+    "reste_a_payer", "items_count", "payments_count", "created_at",
+]
+PAYMENT_COLUMNS = [
+    "id", "invoice_id", "invoice_number", "client_id", "client_name", "payment_date", "amount",
+    "payment_method", "notes", "created_at",
+]
+
+# First characters a spreadsheet reads as the start of a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Oldest first, on the (user_id, created_at, id) index: no in-memory sort
+EXPORT_SORT = {"created_at": 1, "id": 1}
+
+
+def _document_pipeline(query: dict) -> List[dict]:
+    return [
+        {"$match": query},
+        {"$sort": EXPORT_SORT},
+        {"$project": {"_id": 0, "user_id": 0}},
+    ]
+
+
+def _payments_pipeline(query: dict, payment_dates: dict) -> List[dict]:
+    pipeline = [{"$match": query}, {"$sort": EXPORT_SORT}, {"$unwind": "$payments"}]
+    if payment_dates:
+        pipeline.append({"$match": {"payments.payment_date": payment_dates}})
+    pipeline.append({"$project": {
+        "_id": 0,
+        "id": "$payments.id",
+        "invoice_id": "$id",
+        "invoice_number": "$invoice_number",
+        "client_id": "$client_id",
+        "client_name": "$client_name",
+        "payment_date": "$payments.payment_date",
+        "amount": "$payments.amount",
+        "payment_method": "$payments.payment_method",
+        "notes": "$payments.notes",
+        "created_at": "$payments.created_at",
+    }})
+    return pipeline
+
+
+def _with_counts(doc: dict) -> dict:
+    row = dict(doc)
+    row["items_count"] = len(doc.get("items") or [])
+    if "payments" in doc:
+        row["payments_count"] = len(doc.get("payments") or [])
+    return row
+
+
+# name -> (collection, CSV columns, CSV row builder)
+EXPORTS: Dict[str, tuple] = {
+    "quotes": ("quotes", QUOTE_COLUMNS, _with_counts),
+    "invoices": ("invoices", INVOICE_COLUMNS, _with_counts),
+    "payments": ("invoices", PAYMENT_COLUMNS, dict),
+}
+
+
+def export_pipeline(name: str, user_id: str, date_filter: dict, status: Optional[str] = None) -> List[dict]:
+    """Aggregation for an export; `date_filter` ($gte/$lte on YYYY-MM-DD)
+    applies to emission_date, or to payment_date for payments, whose
+    `status` is the one of their invoice"""
+    query = {"user_id": user_id}
+    if status:
+        query["status"] = status
+    if name == "payments":
+        query["payments"] = {"$elemMatch": {"payment_date": date_filter}} if date_filter else {"$ne": []}
+        return _payments_pipeline(query, date_filter)
+    if date_filter:
+        query["emission_date"] = date_filter
+    return _document_pipeline(query)
+
+
+async def _chunked(rows: AsyncIterator[str], header: Optional[str] = None) -> AsyncIterator[bytes]:
+    buffer: List[str] = [header] if header else []
+    size = len(header or "")
+    first = True
+    async for row in rows:
+        buffer.append(row)
+        size += len(row)
+        # The first row goes out at once so the download starts immediately
+        if first or size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size, first = [], 0, False
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+async def _documents(cursor) -> AsyncIterator[dict]:
+    try:
+        async for doc in cursor:
+            yield doc
+    finally:
+        # Client gone mid-export: free the server-side cursor now
+        await cursor.close()
+
+
+async def ndjson_stream(cursor) -> AsyncIterator[bytes]:
+    async def rows():
+        async for doc in _documents(cursor):
+            yield json.dumps(doc, ensure_ascii=False, default=str, separators=(',', ':')) + "\n"
+    async for chunk in _chunked(rows()):
+        yield chunk
+
+
+def csv_cell(value):
+    """Text cells that would be read as a formula get a leading quote; numbers stay as they are"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def csv_stream(cursor, columns: List[str], to_row: Callable[[dict], dict]) -> AsyncIterator[bytes]:
+    line = io.StringIO()
+    writer = csv.DictWriter(line, fieldnames=columns, extrasaction="ignore", lineterminator="\r\n")
+
+    def render(row: Optional[dict]) -> str:
+        line.seek(0)
+        line.truncate()
+        if row is None:
+            writer.writeheader()
+        else:
+            writer.writerow({k: csv_cell(v) for k, v in row.items()})
+        return line.getvalue()
+
+    async def rows():
+        async for doc in _documents(cursor):
+            yield render(to_row(doc))
+    async for chunk in _chunked(rows(), header=render(None)):
+        yield chunk
+
+
+def export_stream(db, name: str, fmt: str, user_id: str, date_filter: dict,
+                  status: Optional[str] = None) -> AsyncIterator[bytes]:
+    collection, columns, to_row = EXPORTS[name]
+    pipeline = export_pipeline(name, user_id, date_filter, status)
+    cursor = db[collection].aggregate(pipeline, batchSize=EXPORT_CURSOR_BATCH_SIZE)
+    if fmt == "csv":
+        return csv_stream(cursor, columns, to_row)
+    return ndjson_stream(cursor)
@@ -0,0 +1,235 @@
+"""Indexes used by the API's queries, created idempotently at startup.
+
+Every route filters on `id` or `user_id` (plus `status` for the status
+filters and counts) and lists sort on `created_at`; without these indexes
+each of them is a collection scan. Indexes owned by a single module
+(outbox, open tracking, counters, user stats) are created by that module.
+
+Run as a script to create the indexes, or with --check to explain() the
+queries the routes run and fail if any of them still scans a collection
+(after the API has started once, so the module-owned indexes exist too):
+
+    MONGO_URL=... DB_NAME=... python indexes.py [--check]
+"""
+import asyncio
+import logging
+import os
+import sys
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _unique_id() -> IndexModel:
+    return IndexModel([("id", ASCENDING)], name="id_unique", unique=True)
+
+
+# Lists are paged newest first on (created_at, id); `id` makes the key unique
+_PAGE_KEY = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+def _user_created_at() -> IndexModel:
+    return IndexModel([("user_id", ASCENDING)] + _PAGE_KEY, name="user_created_at_id")
+
+
+def _user_status() -> IndexModel:
+    # Also serves (user_id, status) counts
+    return IndexModel([("user_id", ASCENDING), ("status", ASCENDING)] + _PAGE_KEY, name="user_status_created_at_id")
+
+
+def _user_client() -> IndexModel:
+    return IndexModel([("user_id", ASCENDING), ("client_id", ASCENDING)] + _PAGE_KEY, name="user_client_created_at_id")
+
+
+def _user_number(field: str) -> IndexModel:
+    return IndexModel([("user_id", ASCENDING), (field, ASCENDING)], name=f"user_{field}")
+
+
+def _user_items_text() -> IndexModel:
+    # GET /search on line items; the user_id prefix keeps each search inside one tenant
+    return IndexModel([("user_id", ASCENDING), ("items.service_name", TEXT)], name="user_items_text",
+                      default_language="french")
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _unique_id(),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "company_settings": [
+        _unique_id(),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "clients": [
+        _unique_id(),
+        _user_created_at(),
+        # GET /search: anchored regex on the folded name words / email
+        IndexModel([("user_id", ASCENDING), ("search_terms", ASCENDING)], name="user_search_terms"),
+    ],
+    "services": [_unique_id(), _user_created_at()],
+    "quotes": [
+        _unique_id(),
+        _user_created_at(),
+        _user_status(),
+        _user_client(),
+        _user_number("quote_number"),
+        _user_items_text(),
+    ],
+    "invoices": [
+        _unique_id(),
+        _user_created_at(),
+        _user_status(),
+        _user_client(),
+        _user_number("invoice_number"),
+        _user_items_text(),
+        # One invoice per quote; invoices created without a quote are not constrained
+        IndexModel([("quote_id", ASCENDING)], name="quote_id_unique", unique=True,
+                   partialFilterExpression={"quote_id": {"$exists": True}}),
+        # Payment reminders: unpaid invoices by due date
+        IndexModel([("user_id", ASCENDING), ("due_date", ASCENDING)], name="overdue_invoices",
+                   partialFilterExpression={"reste_a_payer": {"$gt": 0}}),
+        # Reminder scheduler: users with overdue invoices, across all users (covered distinct)
+        IndexModel([("due_date", ASCENDING), ("user_id", ASCENDING)], name="overdue_invoices_by_due_date",
+                   partialFilterExpression={"reste_a_payer": {"$gt": 0}}),
+    ],
+    "reminder_campaigns": [
+        _unique_id(),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # One running campaign per user, across API processes
+        IndexModel([("user_id", ASCENDING)], name="user_running_campaign", unique=True,
+                   partialFilterExpression={"status": "en cours"}),
+    ],
+}
+
+# Superseded by a wider index above; dropped when found
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    collection: ["user_created_at", "user_status"] for collection in ("clients", "services", "quotes", "invoices")
+}
+
+# (route, collection, command) for --check; values are placeholders, the plan
+# does not depend on them
+_X = "x"
+CHECKED_QUERIES: List[Tuple[str, str, dict]] = [
+    ("get_current_user", "users", {"find": "users", "filter": {"id": _X}, "limit": 1}),
+    ("register / login", "users", {"find": "users", "filter": {"email": _X}, "limit": 1}),
+    ("company settings", "company_settings", {"find": "company_settings", "filter": {"user_id": _X}, "limit": 1}),
+    ("GET /clients", "clients", {"find": "clients", "filter": {"user_id": _X}, "sort": {"created_at": -1, "id": -1}}),
+    ("GET/PUT/DELETE /clients/{id}", "clients", {"find": "clients", "filter": {"id": _X, "user_id": _X}, "limit": 1}),
+    ("GET /services", "services", {"find": "services", "filter": {"user_id": _X}, "sort": {"created_at": -1, "id": -1}}),
+    ("GET/PUT/DELETE /services/{id}", "services", {"find": "services", "filter": {"id": _X, "user_id": _X}, "limit": 1}),
+    ("GET /quotes", "quotes", {"find": "quotes", "filter": {"user_id": _X}, "sort": {"created_at": -1, "id": -1}}),
+    ("GET /quotes?after=", "quotes", {"find": "quotes", "filter": {"user_id": _X, "$or": [
+        {"created_at": {"$lt": _X}}, {"created_at": _X, "id": {"$lt": _X}}]}, "sort": {"created_at": -1, "id": -1}}),
+    ("GET /quotes?status=", "quotes", {"find": "quotes", "filter": {"user_id": _X, "status": _X},
+                                       "sort": {"created_at": -1, "id": -1}}),
+    ("GET /quotes?client_id=", "quotes", {"find": "quotes", "filter": {"user_id": _X, "client_id": _X},
+                                          "sort": {"created_at": -1, "id": -1}}),
+    ("GET/PUT/DELETE /quotes/{id}", "quotes", {"find": "quotes", "filter": {"id": _X, "user_id": _X}, "limit": 1}),
+    ("tracking pixel flush", "quotes", {"update": "quotes", "updates": [{"q": {"id": _X}, "u": {"$inc": {"open_count": 1}}}]}),
+    ("user_stats repair of one user", "quotes", {"aggregate": "quotes", "pipeline": [
+        {"$match": {"user_id": {"$in": [_X]}}},
+        {"$group": {"_id": {"user_id": "$user_id", "status": "$status"}, "count": {"$sum": 1}}}], "cursor": {}}),
+    ("GET /invoices", "invoices", {"find": "invoices", "filter": {"user_id": _X}, "sort": {"created_at": -1, "id": -1}}),
+    ("GET /invoices?status=", "invoices", {"find": "invoices", "filter": {"user_id": _X, "status": _X},
+                                           "sort": {"created_at": -1, "id": -1}}),
+    ("GET/PUT /invoices/{id}", "invoices", {"find": "invoices", "filter": {"id": _X, "user_id": _X}, "limit": 1}),
+    ("convert-to-invoice", "invoices", {"find": "invoices", "filter": {"quote_id": _X}, "limit": 1}),
+    ("user_stats repair of one user", "invoices", {"aggregate": "invoices", "pipeline": [
+        {"$match": {"user_id": {"$in": [_X]}}},
+        {"$group": {"_id": {"user_id": "$user_id", "status": "$status"}, "count": {"$sum": 1},
+                    "total_ttc": {"$sum": "$total_ttc"}}}], "cursor": {}}),
+    ("payment reminders", "invoices", {"find": "invoices", "filter": {
+        "user_id": _X, "due_date": {"$lt": _X}, "reste_a_payer": {"$gt": 0}, "status": {"$nin": [_X]}}}),
+    ("reminder scheduler", "invoices", {"distinct": "invoices", "key": "user_id", "query": {
+        "due_date": {"$lt": _X}, "reste_a_payer": {"$gt": 0}}}),
+    ("GET /search clients", "clients", {"find": "clients", "filter": {
+        "user_id": _X, "search_terms": {"$regex": "^x"}}, "limit": 10}),
+    ("GET /search quote number", "quotes", {"find": "quotes", "filter": {"user_id": _X, "quote_number": _X}}),
+    ("GET /search invoice number", "invoices", {"find": "invoices", "filter": {"user_id": _X, "invoice_number": _X}}),
+    ("GET /search quote items", "quotes", {"find": "quotes", "filter": {"user_id": _X, "$text": {"$search": _X}}}),
+    ("GET /search invoice items", "invoices", {"find": "invoices", "filter": {"user_id": _X, "$text": {"$search": _X}}}),
+    ("GET /outbox/{id}", "outbox", {"find": "outbox", "filter": {"id": _X, "user_id": _X}, "limit": 1}),
+    ("outbox claim", "outbox", {"find": "outbox", "filter": {
+        "status": {"$in": [_X]}, "next_attempt_at": {"$lte": _X}}, "sort": {"next_attempt_at": 1}, "limit": 1}),
+    ("GET /invoices/reminders/{id}", "reminder_campaigns",
+     {"find": "reminder_campaigns", "filter": {"id": _X, "user_id": _X}, "limit": 1}),
+    ("GET /quotes/{id}/opens", "quote_open_rollups", {"find": "quote_open_rollups", "filter": {
+        "quote_id": _X, "granularity": _X, "bucket": {"$gte": _X}}, "sort": {"bucket": 1}}),
+    ("GET /dashboard/stats", "user_stats", {"find": "user_stats", "filter": {"user_id": _X}, "limit": 1}),
+    ("document numbers", "counters", {"find": "counters", "filter": {"user_id": _X, "kind": _X, "year": 2026}, "limit": 1}),
+]
+
+
+async def ensure_indexes(db) -> List[str]:
+    """Create the declared indexes (no-op for those that exist). Returns the
+    collections whose indexes could not be built, e.g. unique keys with
+    duplicates in existing data; the API keeps running without them."""
+    failed = []
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            failed.append(collection)
+            logger.error(f"Could not create indexes on {collection}: {e}")
+            continue
+        existing = await db[collection].index_information()
+        for name in RETIRED_INDEXES.get(collection, []):
+            if name in existing:
+                await db[collection].drop_index(name)
+                logger.info(f"Dropped superseded index {collection}.{name}")
+    if not failed:
+        logger.info(f"Indexes ready on {len(INDEXES)} collections")
+    return failed
+
+
+def _stages(plan) -> List[str]:
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages += _stages(value)
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _stages(item)]
+    return []
+
+
+async def check_queries(db) -> List[Tuple[str, str, List[str]]]:
+    """(route, collection, stages) of every checked query whose winning plan
+    contains a COLLSCAN"""
+    scans = []
+    for route, collection, command in CHECKED_QUERIES:
+        explained = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        # Aggregations not pushed down to the query layer nest the plan under $cursor
+        planner = explained.get("queryPlanner") or explained["stages"][0]["$cursor"]["queryPlanner"]
+        stages = _stages(planner["winningPlan"])
+        if "COLLSCAN" in stages:
+            scans.append((route, collection, stages))
+    return scans
+
+
+async def _main(check: bool) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if not check:
+            return 1 if await ensure_indexes(db) else 0
+        scans = await check_queries(db)
+        for route, collection, stages in scans:
+            print(f"COLLSCAN  {route:<32} {collection:<20} {' > '.join(stages)}")
+        print(f"{len(CHECKED_QUERIES) - len(scans)}/{len(CHECKED_QUERIES)} queries use an index")
+        return 1 if scans else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    sys.exit(asyncio.run(_main("--check" in sys.argv[1:])))
@@ -0,0 +1,336 @@
+"""Process-wide cache for the company logos embedded in quote and invoice PDFs.
+
+Renders only ever read from memory: a logo that is not cached yet is fetched
+by a background thread and the current render goes out without it. Cached
+logos are mirrored on local disk so a restart does not hit the network, and
+are revalidated in the background with ETag / If-Modified-Since.
+
+Only http(s) URLs whose host resolves to public addresses are fetched
+(also after a redirect): a tenant's logo_url must not read local files or
+reach internal services. The host is resolved once per connection and the
+socket is opened to the very address that was checked, so a DNS answer that
+changes between the check and the connect (DNS rebinding) cannot slip an
+internal address through. No proxy is used, since the address checked must
+be the one the request goes to.
+
+Each logo also has a compact variant, downsampled once to the pixels its
+printed 40 mm box needs at LOGO_COMPACT_DPI, used for PDFs sent by email.
+"""
+import hashlib
+import http.client
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image as PILImage
+from reportlab.lib.utils import ImageReader
+
+from pdf_renderer import LOGO_WIDTH, LOGO_HEIGHT
+
+logger = logging.getLogger(__name__)
+
+# Logo used when a company has not configured its own logo_url
+DEFAULT_LOGO_URL = "https://customer-assets.emergentagent.com/job_df4bb327-88bd-4623-9022-ebd45334706b/artifacts/ml5zhjie_Nvo%20logo%20Creativindustry%20France.png"
+
+LOGO_CACHE_DIR = Path(os.environ.get('LOGO_CACHE_DIR', Path(__file__).parent / 'cache' / 'logos'))
+LOGO_REVALIDATE_SECONDS = int(os.environ.get('LOGO_REVALIDATE_SECONDS', 3600))
+LOGO_RETRY_SECONDS = int(os.environ.get('LOGO_RETRY_SECONDS', 300))
+LOGO_FETCH_TIMEOUT = 10
+LOGO_MAX_BYTES = 5 * 1024 * 1024
+LOGO_COMPACT_DPI = int(os.environ.get('LOGO_COMPACT_DPI', 150))
+LOGO_URL_SCHEMES = ("http", "https")
+
+
+def is_fetchable_url(url: Optional[str]) -> bool:
+    """http(s) URL with a host; anything else (file://, ftp://...) is never fetched"""
+    try:
+        parts = urlsplit(url or "")
+        return parts.scheme.lower() in LOGO_URL_SCHEMES and bool(parts.hostname)
+    except ValueError:
+        return False
+
+
+def _connect_public(address: Tuple[str, int], timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                    source_address=None) -> socket.socket:
+    """socket.create_connection() restricted to public addresses: `host` is
+    resolved once, every address is checked (no loopback, private,
+    link-local/metadata or reserved ranges) and the socket connects to one of
+    those checked addresses, never to a fresh resolution"""
+    host, port = address
+    candidates = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for *_, sockaddr in candidates:
+        ip = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if not ip.is_global:
+            raise ValueError(f"logo host {host} resolves to a non-public address ({ip})")
+    error = None
+    for family, type_, proto, _, sockaddr in candidates:
+        sock = socket.socket(family, type_, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error or OSError(f"logo host {host} did not resolve")
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    # Host header and SNI / certificate check still use the URL's hostname
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        # The target's address is checked when its connection opens
+        if not is_fetchable_url(newurl):
+            raise ValueError(f"logo redirect not allowed: {newurl}")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _PublicRedirectHandler
+)
+
+
+class LogoEntry:
+    """A decoded, validated logo and the validators needed to revalidate it."""
+    __slots__ = ('data', 'digest', 'compact', 'compact_digest', 'size', 'etag', 'last_modified', 'checked_at')
+
+    def __init__(self, data: bytes, size: Tuple[int, int], etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, checked_at: float = 0.0):
+        self.data = data
+        self.digest = hashlib.sha1(data).hexdigest()
+        self.compact = compact_logo(data)
+        self.compact_digest = hashlib.sha1(self.compact).hexdigest() if self.compact is not data else self.digest
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked_at = checked_at
+
+
+class LogoCache:
+    def __init__(self, cache_dir: Path = LOGO_CACHE_DIR, revalidate_after: int = LOGO_REVALIDATE_SECONDS,
+                 retry_after: int = LOGO_RETRY_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.revalidate_after = revalidate_after
+        self.retry_after = retry_after
+        self._entries: Dict[str, LogoEntry] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="logo-fetch")
+
+    # ----- hot path -----
+
+    def get(self, url: Optional[str]) -> Optional[bytes]:
+        """Return the cached logo bytes for `url`, never blocking on the network.
+
+        A miss or a stale entry schedules a background fetch; a miss returns None
+        so the caller renders without a logo.
+        """
+        entry = self.get_entry(url)
+        return entry.data if entry else None
+
+    def get_entry(self, url: Optional[str]) -> Optional[LogoEntry]:
+        if not is_fetchable_url(url):
+            return None
+        entry = self._entries.get(url)
+        if entry is None or time.time() - entry.checked_at > self.revalidate_after:
+            self._schedule(url)
+        return entry
+
+    def prefetch(self, url: Optional[str]):
+        """Warm the cache for `url` in the background, ignoring the failure backoff."""
+        if is_fetchable_url(url):
+            with self._lock:
+                self._failed_at.pop(url, None)
+            self._schedule(url)
+
+    # ----- background work -----
+
+    def _schedule(self, url: str):
+        with self._lock:
+            if url in self._pending:
+                return
+            failed_at = self._failed_at.get(url)
+            if failed_at is not None and time.time() - failed_at < self.retry_after:
+                return
+            self._pending.add(url)
+        try:
+            self._executor.submit(self._refresh, url)
+        except RuntimeError:
+            # Executor already shut down (application stopping)
+            with self._lock:
+                self._pending.discard(url)
+
+    def _refresh(self, url: str):
+        try:
+            entry = self._entries.get(url) or self._read_disk(url)
+            if entry is not None:
+                self._entries[url] = entry
+            if entry is None or time.time() - entry.checked_at > self.revalidate_after:
+                self._entries[url] = self._fetch(url, entry)
+            with self._lock:
+                self._failed_at.pop(url, None)
+        except Exception as e:
+            logger.warning(f"Logo fetch failed for {url}: {e}")
+            with self._lock:
+                self._failed_at[url] = time.time()
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def _fetch(self, url: str, previous: Optional[LogoEntry]) -> LogoEntry:
+        if not is_fetchable_url(url):
+            raise ValueError(f"logo URL not allowed: {url}")
+        request = urllib.request.Request(url, headers={"User-Agent": "DevisPro/1.0"})
+        if previous is not None:
+            if previous.etag:
+                request.add_header("If-None-Match", previous.etag)
+            if previous.last_modified:
+                request.add_header("If-Modified-Since", previous.last_modified)
+        try:
+            with _opener.open(request, timeout=LOGO_FETCH_TIMEOUT) as response:
+                data = response.read(LOGO_MAX_BYTES + 1)
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and previous is not None:
+                previous.checked_at = time.time()
+                self._write_disk(url, previous, data=None)
+                return previous
+            raise
+        if len(data) > LOGO_MAX_BYTES:
+            raise ValueError(f"logo larger than {LOGO_MAX_BYTES} bytes")
+        # Decode once here so a broken image never reaches a render
+        size = ImageReader(BytesIO(data)).getSize()
+        entry = LogoEntry(data, size, etag, last_modified, time.time())
+        self._write_disk(url, entry, data=data)
+        logger.info(f"Logo cached for {url} ({len(data)} bytes, {size[0]}x{size[1]})")
+        return entry
+
+    # ----- disk mirror -----
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.img", self.cache_dir / f"{key}.json"
+
+    def _read_disk(self, url: str) -> Optional[LogoEntry]:
+        data_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            data = data_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        return LogoEntry(data, tuple(meta['size']), meta.get('etag'), meta.get('last_modified'),
+                         meta.get('checked_at', 0.0))
+
+    def _write_disk(self, url: str, entry: LogoEntry, data: Optional[bytes]):
+        data_path, meta_path = self._paths(url)
+        meta = {
+            "url": url,
+            "size": list(entry.size),
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "checked_at": entry.checked_at,
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            if data is not None:
+                _atomic_write(data_path, data)
+            _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Could not persist logo {url}: {e}")
+
+    def load_from_disk(self):
+        """Load every logo mirrored on disk into memory (called once at startup)."""
+        if not self.cache_dir.is_dir():
+            return
+        for meta_path in self.cache_dir.glob("*.json"):
+            try:
+                url = json.loads(meta_path.read_text())['url']
+            except (OSError, ValueError, KeyError):
+                continue
+            entry = self._read_disk(url)
+            if entry is not None:
+                self._entries[url] = entry
+        logger.info(f"Loaded {len(self._entries)} cached logo(s) from {self.cache_dir}")
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _atomic_write(path: Path, data: bytes):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def compact_logo(data: bytes, dpi: int = LOGO_COMPACT_DPI) -> bytes:
+    """Downsample a logo to its printed size (LOGO_WIDTH x LOGO_HEIGHT box) at `dpi`.
+
+    ReportLab embeds images as raw pixels, so the PDF size follows the pixel
+    count, not the source file size. Returns `data` itself when the logo is
+    already small enough or cannot be decoded by PIL.
+    """
+    try:
+        with PILImage.open(BytesIO(data)) as img:
+            img.load()
+            max_width = LOGO_WIDTH / 72 * dpi
+            max_height = LOGO_HEIGHT / 72 * dpi
+            scale = min(max_width / img.width, max_height / img.height)
+            if scale >= 1:
+                return data
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+            resized = img.convert('RGBA' if has_alpha else 'RGB').resize(size, PILImage.LANCZOS)
+    except Exception as e:
+        logger.warning(f"Could not downsample logo: {e}")
+        return data
+    out = BytesIO()
+    if has_alpha:
+        resized.save(out, format='PNG', optimize=True)
+    else:
+        # Opaque logos stay JPEG: ReportLab embeds them as-is (DCTDecode)
+        resized.save(out, format='JPEG', quality=90, optimize=True)
+    return out.getvalue()
+
+
+def company_logo_url(company: dict) -> str:
+    return company.get('logo_url') or DEFAULT_LOGO_URL
+
+
+logo_cache = LogoCache()
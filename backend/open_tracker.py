@@ -0,0 +1,268 @@
+"""Write-coalescing recorder for tracking pixel hits.
+
+Mail clients and image scanners fetch the pixel of a single email many
+times; writing each hit to MongoDB turns a campaign into thousands of tiny
+updates on a public route. Hits are merged in memory per quote (count + most
+recent timestamp) and written as one unordered bulk_write every
+TRACKING_FLUSH_MS milliseconds, or as soon as TRACKING_FLUSH_EVENTS hits are
+waiting. On shutdown the flush in progress completes and the buffer is
+flushed once more.
+
+Each flush also stores the individual opens in a time-series collection
+(`quote_open_events`, expired after OPEN_EVENTS_RETENTION_DAYS) and folds
+them into hourly and daily rollup documents (`quote_open_rollups`), so the
+open history of a quote is read from a handful of pre-aggregated buckets
+however many raw events there are.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+TRACKING_FLUSH_MS = float(os.environ.get('TRACKING_FLUSH_MS', 1000))
+TRACKING_FLUSH_EVENTS = int(os.environ.get('TRACKING_FLUSH_EVENTS', 500))
+# Distinct quotes kept while the database is unreachable; later hits are dropped
+TRACKING_MAX_PENDING = int(os.environ.get('TRACKING_MAX_PENDING', 10000))
+OPEN_EVENTS_RETENTION_DAYS = int(os.environ.get('OPEN_EVENTS_RETENTION_DAYS', 90))
+# Hourly buckets are only useful for recent activity; daily buckets are kept
+OPEN_HOURLY_RETENTION_DAYS = int(os.environ.get('OPEN_HOURLY_RETENTION_DAYS', 30))
+
+HOUR = "hour"
+DAY = "day"
+
+# Image proxies fetch the pixel on behalf of the reader (Gmail, Yahoo...);
+# scanners and scripts fetch it without anybody reading the email
+_PROXY_MARKERS = ("googleimageproxy", "ggpht.com", "yahoomailproxy")
+_BOT_MARKERS = ("bot", "crawl", "spider", "scan", "python-", "curl/", "wget/", "go-http-client",
+                "java/", "okhttp", "barracuda", "mimecast", "proofpoint", "symantec")
+_MOBILE_MARKERS = ("iphone", "ipad", "android", "mobile")
+
+
+def user_agent_class(user_agent: Optional[str]) -> str:
+    """proxy, bot, mobile, desktop or unknown"""
+    if not user_agent:
+        return "unknown"
+    ua = user_agent.lower()
+    if any(marker in ua for marker in _PROXY_MARKERS):
+        return "proxy"
+    if any(marker in ua for marker in _BOT_MARKERS):
+        return "bot"
+    if any(marker in ua for marker in _MOBILE_MARKERS):
+        return "mobile"
+    if "mozilla/" in ua:
+        return "desktop"
+    return "unknown"
+
+
+def bucket_start(when: datetime, granularity: str) -> datetime:
+    when = when.replace(minute=0, second=0, microsecond=0)
+    return when.replace(hour=0) if granularity == DAY else when
+
+
+class _Pending:
+    __slots__ = ('count', 'last_at')
+
+    def __init__(self):
+        self.count = 0
+        self.last_at = ""
+
+
+class OpenTracker:
+    def __init__(self, flush_ms: float = TRACKING_FLUSH_MS, flush_events: int = TRACKING_FLUSH_EVENTS,
+                 max_pending: int = TRACKING_MAX_PENDING):
+        self.flush_interval = flush_ms / 1000
+        self.flush_events = flush_events
+        self.max_pending = max_pending
+        self.collection = None
+        self.events = None
+        self.rollups = None
+        self._pending: Dict[str, _Pending] = {}
+        # (quote_id, time, user-agent class) of every open waiting to be stored
+        self._raw: List[Tuple[str, datetime, str]] = []
+        self._events = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._recorded = 0
+        self._dropped = 0
+        self._flushes = 0
+        self._writes = 0
+        self._errors = 0
+        self._events_stored = 0
+
+    async def start(self, db):
+        self.collection = db.quotes
+        self.events = db.quote_open_events
+        self.rollups = db.quote_open_rollups
+        await self._create_events_collection(db)
+        await self.rollups.create_index(
+            [("quote_id", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)], unique=True
+        )
+        await self.rollups.create_index(
+            "bucket", name="hourly_rollup_ttl", expireAfterSeconds=OPEN_HOURLY_RETENTION_DAYS * 86400,
+            partialFilterExpression={"granularity": HOUR},
+        )
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._flusher())
+
+    async def _create_events_collection(self, db):
+        retention = OPEN_EVENTS_RETENTION_DAYS * 86400
+        try:
+            await db.create_collection(
+                "quote_open_events",
+                timeseries={"timeField": "ts", "metaField": "meta", "granularity": "hours"},
+                expireAfterSeconds=retention,
+            )
+        except CollectionInvalid:
+            pass  # already created
+        except OperationFailure as e:
+            # MongoDB < 5.0: plain collection, expired by a TTL index instead
+            logger.warning(f"Time-series collections unavailable ({e}), using a TTL index")
+            await self.events.create_index("ts", expireAfterSeconds=retention)
+
+    async def stop(self):
+        # Not cancelled: a flush in progress would lose the batch it took
+        # from the buffer. The flusher finishes it and exits, then the hits
+        # recorded meanwhile get a last flush.
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def record(self, quote_id: str, user_agent: Optional[str] = None, when: Optional[datetime] = None):
+        """Count one open of `quote_id` (no I/O)"""
+        entry = self._pending.get(quote_id)
+        if entry is None:
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return
+            entry = self._pending[quote_id] = _Pending()
+        when = when or datetime.now(timezone.utc)
+        if len(self._raw) < self.max_pending:
+            self._raw.append((quote_id, when, user_agent_class(user_agent)))
+        # Fixed-width timestamps so $max keeps the most recent one
+        opened_at = when.isoformat(timespec='microseconds')
+        entry.count += 1
+        if opened_at > entry.last_at:
+            entry.last_at = opened_at
+        self._events += 1
+        self._recorded += 1
+        if self._events >= self.flush_events and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _flusher(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping:
+                return
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending or self.collection is None:
+            return
+        batch, self._pending, self._events = self._pending, {}, 0
+        raw, self._raw = self._raw, []
+        requests: List[UpdateOne] = [
+            UpdateOne({"id": quote_id}, {"$inc": {"open_count": entry.count}, "$max": {"opened_at": entry.last_at}})
+            for quote_id, entry in batch.items()
+        ]
+        try:
+            await self.collection.bulk_write(requests, ordered=False)
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Open tracking flush failed ({len(requests)} quotes), keeping them for the next one: {e}")
+            self._merge_back(batch, raw)
+            return
+        self._flushes += 1
+        self._writes += len(requests)
+        logger.debug(f"Recorded opens for {len(requests)} quote(s)")
+        if self.events is not None and raw:
+            try:
+                await self._store_events(raw)
+            except Exception as e:
+                # Counters on the quotes are written; only the history of this batch is lost
+                self._errors += 1
+                logger.error(f"Open history flush failed ({len(raw)} events): {e}")
+
+    async def _store_events(self, raw: List[Tuple[str, datetime, str]]):
+        owners = {
+            doc["id"]: doc["user_id"]
+            async for doc in self.collection.find(
+                {"id": {"$in": list({quote_id for quote_id, _, _ in raw})}}, {"_id": 0, "id": 1, "user_id": 1}
+            )
+        }
+        # Pixel URLs of quotes that do not exist are not worth a history
+        raw = [event for event in raw if event[0] in owners]
+        if not raw:
+            return
+        await self.events.insert_many([
+            {"ts": when, "meta": {"quote_id": quote_id, "user_id": owners[quote_id], "user_agent": ua}}
+            for quote_id, when, ua in raw
+        ], ordered=False)
+
+        buckets: Dict[Tuple[str, str, datetime], dict] = {}
+        for quote_id, when, ua in raw:
+            for granularity in (HOUR, DAY):
+                key = (quote_id, granularity, bucket_start(when, granularity))
+                bucket = buckets.setdefault(key, {"count": 0, "by_user_agent": {}, "first_at": when, "last_at": when})
+                bucket["count"] += 1
+                bucket["by_user_agent"][ua] = bucket["by_user_agent"].get(ua, 0) + 1
+                bucket["first_at"] = min(bucket["first_at"], when)
+                bucket["last_at"] = max(bucket["last_at"], when)
+        await self.rollups.bulk_write([
+            UpdateOne(
+                {"quote_id": quote_id, "granularity": granularity, "bucket": start},
+                {
+                    "$inc": {"count": bucket["count"],
+                             **{f"by_user_agent.{ua}": n for ua, n in bucket["by_user_agent"].items()}},
+                    "$min": {"first_at": bucket["first_at"]},
+                    "$max": {"last_at": bucket["last_at"]},
+                    "$setOnInsert": {"user_id": owners[quote_id]},
+                },
+                upsert=True,
+            )
+            for (quote_id, granularity, start), bucket in buckets.items()
+        ], ordered=False)
+        self._events_stored += len(raw)
+
+    def _merge_back(self, batch: Dict[str, _Pending], raw: List[Tuple[str, datetime, str]]):
+        self._raw = (raw + self._raw)[:self.max_pending]
+        for quote_id, entry in batch.items():
+            current = self._pending.get(quote_id)
+            if current is None:
+                if len(self._pending) >= self.max_pending:
+                    self._dropped += entry.count
+                    continue
+                self._pending[quote_id] = entry
+            else:
+                current.count += entry.count
+                current.last_at = max(current.last_at, entry.last_at)
+            self._events += entry.count
+
+    def stats(self) -> dict:
+        return {
+            "pending_quotes": len(self._pending),
+            "pending_events": self._events,
+            "recorded": self._recorded,
+            "dropped": self._dropped,
+            "flushes": self._flushes,
+            "writes": self._writes,
+            "events_stored": self._events_stored,
+            "errors": self._errors,
+        }
+
+
+open_tracker = OpenTracker()
@@ -0,0 +1,188 @@
+"""Persistent outbox for outgoing emails.
+
+Routes only insert a job document in the `outbox` collection and return; a
+few asyncio workers claim due jobs, run the handler registered for their
+kind (render + SMTP send) and record the outcome. Failed attempts are
+retried with exponential backoff. A claimed job is leased until
+`next_attempt_at`, so a job held by a worker that died is picked up again
+once the lease expires.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_WORKERS = int(os.environ.get('OUTBOX_WORKERS', 2))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_BACKOFF_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_SECONDS', 30))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_MAX_SECONDS', 3600))
+OUTBOX_LEASE_SECONDS = float(os.environ.get('OUTBOX_LEASE_SECONDS', 300))
+OUTBOX_POLL_SECONDS = float(os.environ.get('OUTBOX_POLL_SECONDS', 5))
+
+# Job statuses
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. recipient refused)"""
+
+
+def _iso(dt: datetime) -> str:
+    # Fixed-width timestamps so string comparison in queries is chronological
+    return dt.isoformat(timespec='microseconds')
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def backoff_delay(attempts: int) -> float:
+    return min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+class Outbox:
+    def __init__(self, workers: int = OUTBOX_WORKERS, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.collection = None
+        self._handlers: Dict[str, Callable[[dict], Awaitable[None]]] = {}
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._sent = 0
+        self._retried = 0
+        self._failed = 0
+
+    def register(self, kind: str, handler: Callable[[dict], Awaitable[None]]):
+        self._handlers[kind] = handler
+
+    async def start(self, collection):
+        self.collection = collection
+        await collection.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        await collection.create_index("id", unique=True)
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Outbox started ({self.workers} workers)")
+
+    async def stop(self, timeout: float = 10.0):
+        """Let jobs being sent finish (up to `timeout`), then cancel the workers.
+        Jobs cut off here keep their lease and are retried after a restart."""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        self._tasks = []
+
+    async def enqueue(self, kind: str, user_id: str, payload: dict) -> dict:
+        now = _iso(_now())
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "user_id": user_id,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "last_error": None,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now,
+            "sent_at": None,
+        }
+        await self.collection.insert_one(job)
+        job.pop("_id", None)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def _claim(self) -> Optional[dict]:
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"status": {"$in": [PENDING, SENDING]}, "next_attempt_at": {"$lte": _iso(now)}},
+            {
+                "$set": {
+                    "status": SENDING,
+                    "next_attempt_at": _iso(now + timedelta(seconds=OUTBOX_LEASE_SECONDS)),
+                    "updated_at": _iso(now),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _worker(self, number: int):
+        while not self._stopping:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Outbox worker {number}: claim failed: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(job)
+            except Exception as e:
+                # Outcome not recorded (database error): the lease expiry retries the job
+                logger.error(f"Outbox worker {number}: job {job['id']} not recorded: {e}")
+
+    async def _process(self, job: dict):
+        handler = self._handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise PermanentError(f"Type de tâche inconnu: {job['kind']}")
+            await handler(job)
+        except Exception as e:
+            await self._record_failure(job, e)
+            return
+        now = _iso(_now())
+        await self.collection.update_one(
+            {"id": job["id"]},
+            {"$set": {"status": SENT, "sent_at": now, "updated_at": now, "last_error": None}}
+        )
+        self._sent += 1
+
+    async def _record_failure(self, job: dict, error: Exception):
+        now = _now()
+        update = {"last_error": str(error), "updated_at": _iso(now)}
+        if isinstance(error, PermanentError) or job["attempts"] >= self.max_attempts:
+            update["status"] = FAILED
+            self._failed += 1
+            logger.error(f"Outbox job {job['id']} failed after {job['attempts']} attempt(s): {error}")
+        else:
+            delay = backoff_delay(job["attempts"])
+            update["status"] = PENDING
+            update["next_attempt_at"] = _iso(now + timedelta(seconds=delay))
+            self._retried += 1
+            logger.warning(f"Outbox job {job['id']} attempt {job['attempts']} failed, retrying in {delay:.0f}s: {error}")
+        await self.collection.update_one({"id": job["id"]}, {"$set": update})
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": sum(1 for t in self._tasks if not t.done()),
+            "sent": self._sent,
+            "retried": self._retried,
+            "failed": self._failed,
+        }
+
+
+outbox = Outbox()
@@ -0,0 +1,152 @@
+"""Content-addressed store of rendered PDFs.
+
+A PDF is keyed by a hash of everything that ends up on the page: the quote or
+invoice document, the company settings and the logo. Any edit (quote update,
+payment, company settings, new logo) therefore yields a new key, and entries
+for old versions simply age out of the LRU.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = Path(os.environ.get('PDF_CACHE_DIR', Path(__file__).parent / 'cache' / 'pdf'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Bump when the PDF layout changes so previously rendered files are not served
+RENDER_VERSION = 3
+
+# Fields that change without changing the printed document (status is not printed either).
+# Adding one needs no RENDER_VERSION bump: the layout is unchanged, only documents
+# carrying the field get a new key and their old entries age out of the LRU.
+VOLATILE_FIELDS = {
+    "status", "sent_at", "send_count", "opened_at", "open_count",
+    # payment reminder campaigns
+    "last_reminder_at", "reminder_count",
+}
+
+
+def pdf_cache_key(kind: str, doc: dict, company: dict, logo_digest: Optional[str]) -> str:
+    payload = {
+        "version": RENDER_VERSION,
+        "kind": kind,
+        "doc": {k: v for k, v in doc.items() if k not in VOLATILE_FIELDS},
+        "company": company,
+        "logo": logo_digest,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, cache_dir: Path = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        # key -> size, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def load_index(self):
+        """Rebuild the LRU index from the files on disk (oldest access first)."""
+        if not self.cache_dir.is_dir():
+            return
+        files = []
+        for path in self.cache_dir.glob("*.pdf"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, path.stem, st.st_size))
+        with self._lock:
+            self._index.clear()
+            self._total_bytes = 0
+            for _, key, size in sorted(files):
+                self._index[key] = size
+                self._total_bytes += size
+        self._evict()
+        logger.info(f"PDF cache: {len(self._index)} file(s), {self._total_bytes} bytes in {self.cache_dir}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        with self._lock:
+            known = key in self._index
+        if known:
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                # Evicted by another worker process sharing the directory
+                self._forget(key)
+            else:
+                with self._lock:
+                    if key in self._index:
+                        self._index.move_to_end(key)
+                    self._hits += 1
+                return data
+        self._misses += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not store PDF {key}: {e}")
+            return
+        with self._lock:
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+        self._evict()
+
+    def _forget(self, key: str):
+        with self._lock:
+            size = self._index.pop(key, None)
+            if size is not None:
+                self._total_bytes -= size
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._index:
+                    return
+                key, size = self._index.popitem(last=False)
+                self._total_bytes -= size
+                self._evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+            "evictions": self._evictions,
+        }
+
+
+pdf_cache = PdfCache()
@@ -0,0 +1,80 @@
+"""Streaming ZIP archives of rendered PDFs for bulk exports.
+
+Documents are rendered a few at a time (in parallel through the render pool)
+and each finished PDF is written to the archive and flushed to the client
+straight away, so memory stays bounded by the render window rather than the
+number of documents in the export.
+"""
+import asyncio
+import io
+import re
+import time
+import zipfile
+from collections import deque
+from typing import AsyncIterator, Awaitable, Tuple
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable write target: zipfile falls back to data descriptors and
+    every chunk it writes is collected until the next drain()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def safe_filename(name: str) -> str:
+    return _UNSAFE_FILENAME_CHARS.sub("_", name).strip() or "document.pdf"
+
+
+async def zip_stream(entries: AsyncIterator[Tuple[str, Awaitable[bytes]]], concurrency: int) -> AsyncIterator[bytes]:
+    """Yield a ZIP archive chunk by chunk.
+
+    `entries` yields (filename, awaitable PDF bytes); up to `concurrency`
+    awaitables run at once and files are written in the order received.
+    """
+    sink = _ZipSink()
+    pending = deque()
+    used_names = set()
+    timestamp = time.localtime()[:6]
+
+    def add(zf: zipfile.ZipFile, filename: str, data: bytes):
+        filename = safe_filename(filename)
+        base, n = filename, 1
+        while filename in used_names:
+            n += 1
+            filename = base.replace(".pdf", f" ({n}).pdf")
+        used_names.add(filename)
+        # PDF streams are already deflated, storing them is as small and much faster
+        zf.writestr(zipfile.ZipInfo(filename, date_time=timestamp), data, compress_type=zipfile.ZIP_STORED)
+
+    try:
+        with zipfile.ZipFile(sink, mode="w") as zf:
+            async for filename, pdf in entries:
+                pending.append((filename, asyncio.ensure_future(pdf)))
+                if len(pending) >= concurrency:
+                    filename, task = pending.popleft()
+                    add(zf, filename, await task)
+                    yield sink.drain()
+            while pending:
+                filename, task = pending.popleft()
+                add(zf, filename, await task)
+                yield sink.drain()
+        # Central directory, written when the archive is closed
+        yield sink.drain()
+    finally:
+        for _, task in pending:
+            task.cancel()
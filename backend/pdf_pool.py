@@ -0,0 +1,153 @@
+"""Process pool that renders quote and invoice PDFs off the event loop.
+
+ReportLab layout is CPU-bound, so running it inside an `async def` route
+freezes every other request on the worker. Routes submit renders here and
+await the result; the number of renders waiting for a worker is bounded so
+a burst of downloads fails fast with 503 instead of piling up.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_RENDER_QUEUE_SIZE = int(os.environ.get('PDF_RENDER_QUEUE_SIZE', 32))
+
+# Number of recent renders kept for the latency percentiles
+STATS_WINDOW = 500
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+def _render(kind: str, doc: dict, company: dict, logo: Optional[bytes]):
+    """Runs in a worker process: returns the PDF bytes and the pure render time."""
+    from pdf_renderer import generate_quote_pdf, generate_invoice_pdf
+
+    started = time.perf_counter()
+    if kind == "quote":
+        pdf = generate_quote_pdf(doc, company, logo)
+    elif kind == "invoice":
+        pdf = generate_invoice_pdf(doc, company, logo)
+    else:
+        raise ValueError(f"Unknown document kind: {kind}")
+    return pdf, time.perf_counter() - started
+
+
+def _warmup():
+    import pdf_renderer  # noqa: F401 - builds styles and imports ReportLab once per worker
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class RenderPool:
+    def __init__(self, workers: int = PDF_RENDER_WORKERS, queue_size: int = PDF_RENDER_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slot_freed: Optional[asyncio.Condition] = None
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._render_times = deque(maxlen=STATS_WINDOW)
+        self._total_times = deque(maxlen=STATS_WINDOW)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the API process runs Motor and logo threads, forking it is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def start(self):
+        """Start the worker processes ahead of the first render."""
+        if self.workers > 0:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_warmup)
+            logger.info(f"PDF render pool started ({self.workers} workers, queue {self.queue_size})")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, kind: str, doc: dict, company: dict, logo: Optional[bytes] = None, wait: bool = False) -> bytes:
+        """Render in a worker. When the queue is full, raise RenderQueueFull,
+        or with `wait=True` (bulk jobs) wait for a free slot instead."""
+        capacity = max(self.workers, 1) + self.queue_size
+        if self._in_flight >= capacity:
+            if not wait:
+                self._rejected += 1
+                raise RenderQueueFull()
+            if self._slot_freed is None:
+                self._slot_freed = asyncio.Condition()
+            async with self._slot_freed:
+                await self._slot_freed.wait_for(lambda: self._in_flight < capacity)
+
+        self._in_flight += 1
+        self._submitted += 1
+        submitted_at = time.perf_counter()
+        try:
+            if self.workers > 0:
+                loop = asyncio.get_running_loop()
+                pdf, render_time = await loop.run_in_executor(self._get_executor(), _render, kind, doc, company, logo)
+            else:
+                pdf, render_time = await asyncio.to_thread(_render, kind, doc, company, logo)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault): start a fresh pool on the next render
+            self._failed += 1
+            logger.error("PDF render pool broken, restarting it")
+            self._executor = None
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            if self._slot_freed is not None:
+                async with self._slot_freed:
+                    self._slot_freed.notify()
+
+        self._completed += 1
+        self._render_times.append(render_time)
+        self._total_times.append(time.perf_counter() - submitted_at)
+        return pdf
+
+    def stats(self) -> dict:
+        running = min(self._in_flight, max(self.workers, 1))
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self._in_flight,
+            "queue_depth": self._in_flight - running,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "render_ms_p50": round(_percentile(self._render_times, 50) * 1000, 1),
+            "render_ms_p95": round(_percentile(self._render_times, 95) * 1000, 1),
+            "total_ms_p50": round(_percentile(self._total_times, 50) * 1000, 1),
+            "total_ms_p95": round(_percentile(self._total_times, 95) * 1000, 1),
+        }
+
+
+render_pool = RenderPool()
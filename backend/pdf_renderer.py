@@ -0,0 +1,452 @@
+"""Quote and invoice PDF layout.
+
+Both documents share one template: styles, colours and table styles are built
+once at import time, and each page section (header, document info + client
+box, items table, totals, bank box, conditions) has a single builder that the
+quote and invoice compose. This module has no database or web dependencies
+so the render pool workers only import ReportLab and this file.
+"""
+from datetime import datetime
+from io import BytesIO
+from typing import List, Optional
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, Flowable
+
+# ============ COLOURS & STYLES ============
+
+NAVY = colors.HexColor('#1e3a5f')
+GREEN = colors.HexColor('#059669')
+ORANGE = colors.HexColor('#d97706')
+LIGHT_GRAY = colors.HexColor('#f5f5f5')
+BORDER_GRAY = colors.HexColor('#cccccc')
+
+_styles = getSampleStyleSheet()
+NORMAL_STYLE = ParagraphStyle('Normal', parent=_styles['Normal'], fontSize=9, textColor=colors.black)
+SMALL_STYLE = ParagraphStyle('Small', parent=_styles['Normal'], fontSize=7, textColor=colors.HexColor('#666666'))
+SECTION_TITLE = ParagraphStyle('Section', parent=_styles['Heading2'], fontSize=10, textColor=NAVY, spaceBefore=10, spaceAfter=5, fontName='Helvetica-Bold')
+
+PAGE_MARGIN = 15*mm
+LOGO_WIDTH = 40*mm
+LOGO_HEIGHT = 25*mm
+
+HEADER_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOX', (-1, 0), (-1, 0), 0.5, BORDER_GRAY),
+    ('TOPPADDING', (-1, 0), (-1, 0), 8),
+    ('BOTTOMPADDING', (-1, 0), (-1, 0), 8),
+    ('LEFTPADDING', (-1, 0), (-1, 0), 8),
+    ('RIGHTPADDING', (-1, 0), (-1, 0), 8),
+])
+
+INFO_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOX', (1, 0), (1, 0), 0.5, BORDER_GRAY),
+    ('TOPPADDING', (1, 0), (1, 0), 8),
+    ('BOTTOMPADDING', (1, 0), (1, 0), 8),
+    ('LEFTPADDING', (1, 0), (1, 0), 8),
+    ('RIGHTPADDING', (1, 0), (1, 0), 8),
+])
+
+ITEMS_COL_WIDTHS = [60*mm, 25*mm, 35*mm, 25*mm, 35*mm]
+ITEMS_FONT_SIZE = 9
+ITEMS_PADDING = 6
+# Room for a service name on one line: column width minus the default 6pt side paddings
+ITEMS_NAME_WIDTH = ITEMS_COL_WIDTHS[0] - 12
+# Height of one text line in a row, so ReportLab does not have to measure rows
+ITEMS_LEADING = ITEMS_FONT_SIZE * 1.2
+
+ITEMS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), NAVY),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), ITEMS_FONT_SIZE),
+    ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
+    ('ALIGN', (4, 1), (4, -1), 'RIGHT'),
+    ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('TOPPADDING', (0, 0), (-1, -1), ITEMS_PADDING),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), ITEMS_PADDING),
+])
+
+TVA_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('BACKGROUND', (0, 0), (-1, 0), LIGHT_GRAY),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+RECAP_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('BACKGROUND', (0, -1), (-1, -1), NAVY),
+    ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+SIDE_BY_SIDE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+TOTALS_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('LINEBELOW', (0, 0), (-1, -2), 0.5, BORDER_GRAY),
+    ('BACKGROUND', (0, -1), (-1, -1), NAVY),
+    ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+PAYMENTS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), GREEN),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+    ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('TOPPADDING', (0, 0), (-1, -1), 5),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+])
+
+SOLDE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('LINEBELOW', (0, 0), (-1, 1), 0.5, BORDER_GRAY),
+    ('TEXTCOLOR', (0, 1), (-1, 1), GREEN),
+    ('BACKGROUND', (0, 2), (-1, 2), ORANGE),
+    ('TEXTCOLOR', (0, 2), (-1, 2), colors.white),
+    ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 2), (-1, 2), 12),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+BANK_STYLE = TableStyle([
+    ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
+    ('TOPPADDING', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ('LEFTPADDING', (0, 0), (-1, -1), 10),
+])
+
+QUOTE_CONDITIONS = """Pénalités de retard : trois fois le taux annuel d'intérêt légal en vigueur calculé depuis la date d'échéance jusqu'à complet paiement du prix.<br/>
+Indemnité forfaitaire pour frais de recouvrement en cas de retard de paiement : 40 €"""
+
+INVOICE_CONDITIONS = """Pénalités de retard : trois fois le taux annuel d'intérêt légal. Indemnité forfaitaire pour frais de recouvrement : 40 €"""
+
+QUOTE_SIGNATURE = """Date et signature précédées de la mention<br/>
+« Bon pour accord »"""
+
+MONTHS = ("janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre")
+
+# ============ FORMATTING ============
+
+_PRICE_SEPARATORS = str.maketrans({",": " ", ".": ","})
+
+def fmt_price(val) -> str:
+    return f"{val:,.2f}".translate(_PRICE_SEPARATORS) + " €"
+
+def fmt_date(date_str) -> str:
+    if not date_str:
+        return ""
+    try:
+        d = datetime.strptime(date_str, "%Y-%m-%d")
+        return f"{d.day} {MONTHS[d.month-1]} {d.year}"
+    except (TypeError, ValueError):
+        return date_str
+
+def fmt_tva(rate, zero_label: str) -> str:
+    return f"{rate}%" if rate > 0 else zero_label
+
+def _esc(value) -> str:
+    """Escape user-provided text for Paragraph markup"""
+    return escape(str(value)) if value is not None else ""
+
+# ============ SECTION BUILDERS ============
+
+def build_header(company: dict, logo: Optional[bytes]) -> Table:
+    """Logo on the left, issuer box on the right"""
+    company_box = f"""<font size="7" color="#888888">Émetteur ou Émettrice</font><br/>
+<b>{_esc(company.get('name', 'CREATIVINDUSTRY'))}</b><br/>
+{_esc(company.get('address', ''))}<br/>
+{_esc(company.get('email', ''))}<br/>
+{_esc(company.get('phone', ''))}"""
+
+    if logo:
+        # Keep aspect ratio - width 40mm, height auto-calculated
+        logo_img = Image(BytesIO(logo), width=LOGO_WIDTH, height=LOGO_HEIGHT, kind='proportional')
+        header_table = Table([[logo_img, '', Paragraph(company_box, NORMAL_STYLE)]], colWidths=[50*mm, 40*mm, 90*mm])
+    else:
+        header_table = Table([['', Paragraph(company_box, NORMAL_STYLE)]], colWidths=[90*mm, 90*mm])
+    header_table.setStyle(HEADER_STYLE)
+    return header_table
+
+def build_info_and_client(info_markup: str, doc: dict) -> Table:
+    """Document number/dates block next to the client box"""
+    client_box = f"""<font size="7" color="#888888">Client ou Cliente</font><br/>
+<b>{_esc(doc['client_name'])}</b><br/>
+{_esc(doc['client_address'])}<br/>
+{_esc(doc['client_email'])}<br/>
+{_esc(doc['client_phone'])}"""
+
+    info_table = Table([[Paragraph(info_markup, NORMAL_STYLE), Paragraph(client_box, NORMAL_STYLE)]], colWidths=[90*mm, 90*mm])
+    info_table.setStyle(INFO_STYLE)
+    return info_table
+
+class ItemsTable(Flowable):
+    """Line items table that splits across pages in time proportional to the
+    rows on each page.
+
+    A plain Table re-measures every remaining row each time it is split, which
+    makes documents with thousands of lines quadratic. Here row heights are
+    computed once up front and each page gets its own small Table (header row
+    included, with explicit row heights so nothing is measured again).
+    """
+
+    def __init__(self, header: list, rows: List[list], heights: List[float], start: int = 0, _remaining=None):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.heights = heights
+        self.start = start
+        if _remaining is None:
+            # _remaining[i] = total height of rows[i:]
+            _remaining = [0.0] * (len(heights) + 1)
+            for i in range(len(heights) - 1, -1, -1):
+                _remaining[i] = _remaining[i + 1] + heights[i]
+        self._remaining = _remaining
+        self.header_height = _text_height(header)
+
+    def _page_table(self, end: int) -> Table:
+        table = Table([self.header] + self.rows[self.start:end], colWidths=ITEMS_COL_WIDTHS,
+                      rowHeights=[self.header_height] + self.heights[self.start:end])
+        table.setStyle(ITEMS_STYLE)
+        return table
+
+    def wrap(self, availWidth, availHeight):
+        self.width = sum(ITEMS_COL_WIDTHS)
+        self.height = self.header_height + self._remaining[self.start]
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        room = availHeight - self.header_height
+        end = self.start
+        while end < len(self.rows) and self.heights[end] <= room:
+            room -= self.heights[end]
+            end += 1
+        if end == self.start:
+            return []
+        if end == len(self.rows):
+            return [self._page_table(end)]
+        return [self._page_table(end),
+                ItemsTable(self.header, self.rows, self.heights, end, self._remaining)]
+
+    def draw(self):
+        table = self._page_table(len(self.rows))
+        table.wrapOn(self.canv, self.width, self.height)
+        table.drawOn(self.canv, 0, 0)
+
+def _text_height(cells: list) -> float:
+    lines = max(cell.count("\n") + 1 for cell in cells)
+    return lines * ITEMS_LEADING + 2 * ITEMS_PADDING
+
+def _item_row(item: dict, zero_tva_label: str):
+    """Cells and height of one line item. The name is a plain bold string
+    (styled by ITEMS_STYLE) unless it needs wrapping."""
+    name = str(item['service_name'])
+    cells = [name, f"{item['quantity']} {item['unit']}", fmt_price(item['price_ht']),
+             fmt_tva(item['tva_rate'], zero_tva_label), fmt_price(item['quantity'] * item['price_ht'])]
+    height = _text_height(cells)
+    if "\n" in name or stringWidth(name, 'Helvetica-Bold', ITEMS_FONT_SIZE) > ITEMS_NAME_WIDTH:
+        cells[0] = Paragraph(f"<b>{_esc(name)}</b>", NORMAL_STYLE)
+        _, name_height = cells[0].wrap(ITEMS_NAME_WIDTH, 1e6)
+        height = max(_text_height(cells[1:]), name_height + 2 * ITEMS_PADDING)
+    return cells, height
+
+def build_items_table(items: List[dict], headers: List[str], zero_tva_label: str) -> ItemsTable:
+    """Line items, with the header row repeated on every page"""
+    rows, heights = [], []
+    for item in items:
+        cells, height = _item_row(item, zero_tva_label)
+        rows.append(cells)
+        heights.append(height)
+    return ItemsTable(headers, rows, heights)
+
+def build_tva_details(items: List[dict], zero_tva_label: str) -> Table:
+    """Per-rate TVA breakdown"""
+    tva_details = {}
+    for item in items:
+        rate = item['tva_rate']
+        base = item['quantity'] * item['price_ht']
+        vals = tva_details.setdefault(rate, {"base": 0, "amount": 0})
+        vals["base"] += base
+        vals["amount"] += base * (rate / 100)
+
+    rows = [['Taux', 'Montant TVA', 'Base HT']]
+    for rate, vals in tva_details.items():
+        rows.append([fmt_tva(rate, zero_tva_label), fmt_price(vals['amount']), fmt_price(vals['base'])])
+
+    tva_table = Table(rows, colWidths=[25*mm, 30*mm, 30*mm])
+    tva_table.setStyle(TVA_STYLE)
+    return tva_table
+
+def build_recap(doc: dict) -> Table:
+    """Totals with discount, last row highlighted"""
+    recap_table = Table([
+        ['Total HT avant remise', fmt_price(doc['total_ht_before_discount'])],
+        ['Remise', fmt_price(doc['discount'])],
+        ['Total HT', fmt_price(doc['total_ht'])],
+        ['Total TVA', fmt_price(doc['total_tva'])],
+        ['Total TTC', fmt_price(doc['total_ttc'])],
+    ], colWidths=[45*mm, 35*mm])
+    recap_table.setStyle(RECAP_STYLE)
+    return recap_table
+
+def build_totals(doc: dict) -> Table:
+    """Full-width HT / TVA / TTC totals, last row highlighted"""
+    totals_table = Table([
+        ['Total HT', fmt_price(doc['total_ht'])],
+        ['Total TVA', fmt_price(doc['total_tva'])],
+        ['Total TTC', fmt_price(doc['total_ttc'])],
+    ], colWidths=[100*mm, 80*mm])
+    totals_table.setStyle(TOTALS_STYLE)
+    return totals_table
+
+def build_payments(payments: List[dict]) -> Table:
+    rows = [['Date', 'Mode', 'Montant', 'Notes']]
+    for p in payments:
+        rows.append([
+            fmt_date(p.get('payment_date', '')),
+            p.get('payment_method', 'Virement').capitalize(),
+            fmt_price(p.get('amount', 0)),
+            p.get('notes', '-') or '-'
+        ])
+    payment_table = Table(rows, colWidths=[40*mm, 40*mm, 40*mm, 60*mm])
+    payment_table.setStyle(PAYMENTS_STYLE)
+    return payment_table
+
+def build_solde(total_ttc: float, acompte: float, reste: float) -> Table:
+    solde_table = Table([
+        ['Total facture:', fmt_price(total_ttc)],
+        ['Acompte(s) reçu(s):', fmt_price(acompte)],
+        ['RESTE À PAYER:', fmt_price(reste)],
+    ], colWidths=[100*mm, 80*mm])
+    solde_table.setStyle(SOLDE_STYLE)
+    return solde_table
+
+def build_bank_box(company: dict, title: Optional[str] = None) -> Table:
+    """Bank details box, optionally with a title inside the box"""
+    bank_info = f"""<b>Établissement</b>     {_esc(company.get('bank_name', 'QONTO'))}<br/>
+<b>IBAN</b>              {_esc(company.get('iban', ''))}<br/>
+<b>BIC</b>               {_esc(company.get('bic', ''))}"""
+    if title:
+        bank_info = f"<b>{title}</b><br/><br/>\n{bank_info}"
+
+    bank_table = Table([[Paragraph(bank_info, NORMAL_STYLE)]], colWidths=[180*mm])
+    bank_table.setStyle(BANK_STYLE)
+    return bank_table
+
+def build_conditions(text: str) -> Paragraph:
+    return Paragraph(text, SMALL_STYLE)
+
+def build_pdf(elements: list) -> bytes:
+    buffer = BytesIO()
+    # pageCompression set explicitly so a changed rl_config default cannot inflate attachments
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=PAGE_MARGIN, leftMargin=PAGE_MARGIN, topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN,
+                            pageCompression=1)
+    doc.build(elements)
+    return buffer.getvalue()
+
+# ============ DOCUMENTS ============
+
+def generate_quote_pdf(quote: dict, company: dict, logo: Optional[bytes] = None) -> bytes:
+    """Generate PDF matching the original CREATIVINDUSTRY format"""
+    devis_info = f"""<b><font size="12">Devis</font></b><br/><br/>
+<b>Numéro</b>          {quote['quote_number']}<br/>
+<b>Date d'émission</b>    {_esc(fmt_date(quote['emission_date']))}<br/>
+<b>Date d'expiration</b>  {_esc(fmt_date(quote['expiration_date']))}<br/>
+<b>Type de vente</b>      Prestations de services"""
+    if quote.get('event_date'):
+        devis_info += f"<br/><b>Date événement</b>    {_esc(fmt_date(quote['event_date']))}"
+
+    # TVA details + récapitulatif side by side
+    combined_table = Table([
+        [Paragraph("<b>Détails TVA</b>", SECTION_TITLE), Paragraph("<b>Récapitulatif</b>", SECTION_TITLE)],
+        [build_tva_details(quote['items'], "Aucune"), build_recap(quote)]
+    ], colWidths=[90*mm, 90*mm])
+    combined_table.setStyle(SIDE_BY_SIDE_STYLE)
+
+    return build_pdf([
+        build_header(company, logo),
+        Spacer(1, 8*mm),
+        build_info_and_client(devis_info, quote),
+        Spacer(1, 6*mm),
+        build_items_table(quote['items'], ['Produits', 'Qté', 'Prix u. HT', 'TVA (%)', 'Total HT'], "Aucune"),
+        Spacer(1, 6*mm),
+        combined_table,
+        Spacer(1, 8*mm),
+        build_bank_box(company, title="Paiement"),
+        Spacer(1, 6*mm),
+        build_conditions(QUOTE_CONDITIONS),
+        Spacer(1, 6*mm),
+        Paragraph(QUOTE_SIGNATURE, NORMAL_STYLE),
+    ])
+
+def generate_invoice_pdf(invoice: dict, company: dict, logo: Optional[bytes] = None) -> bytes:
+    """Generate PDF for invoice with acompte/payment details"""
+    invoice_info = f"""<b><font size="14" color="#1e3a5f">FACTURE</font></b><br/><br/>
+<b>Numéro</b>          {invoice['invoice_number']}<br/>
+<b>Date d'émission</b>    {_esc(fmt_date(invoice['emission_date']))}<br/>
+<b>Date d'échéance</b>    {_esc(fmt_date(invoice['due_date']))}<br/>
+<b>Devis d'origine</b>    {invoice.get('quote_id', '-')[:8]}..."""
+
+    elements = [
+        build_header(company, logo),
+        Spacer(1, 8*mm),
+        build_info_and_client(invoice_info, invoice),
+        Spacer(1, 6*mm),
+        build_items_table(invoice['items'], ['Désignation', 'Qté', 'Prix u. HT', 'TVA', 'Total HT'], "Exonéré"),
+        Spacer(1, 6*mm),
+        build_totals(invoice),
+        Spacer(1, 8*mm),
+    ]
+
+    # Acomptes / paiements
+    payments = invoice.get('payments', [])
+    acompte = invoice.get('acompte', 0)
+    reste = invoice.get('reste_a_payer', invoice['total_ttc'])
+    if payments or acompte > 0:
+        elements += [
+            Paragraph("<b>RÈGLEMENTS</b>", SECTION_TITLE),
+            build_payments(payments),
+            Spacer(1, 4*mm),
+        ]
+
+    elements += [
+        build_solde(invoice['total_ttc'], acompte, reste),
+        Spacer(1, 8*mm),
+        Paragraph("<b>COORDONNÉES BANCAIRES</b>", SECTION_TITLE),
+        build_bank_box(company),
+        Spacer(1, 6*mm),
+        build_conditions(INVOICE_CONDITIONS),
+    ]
+    return build_pdf(elements)
@@ -0,0 +1,127 @@
+"""Search across a user's clients, quotes and invoices (GET /api/search).
+
+- clients: prefix of their name (the whole name or any word of it) or of
+  their email, accent-folded and lowercased. The folded terms are stored in
+  `search_terms` when the client is written, so an anchored regex walks the
+  (user_id, search_terms) index instead of scanning;
+- quotes and invoices: exact document number, or full text on the line
+  items' service_name through the (user_id, items.service_name) text index.
+
+The five queries run concurrently and their hits are ranked together.
+"""
+import asyncio
+import logging
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import List
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MIGRATION_ID = "client_search_terms_v1"
+
+# Ranking: an exact number beats a name, which beats an email, which beats
+# a word inside a line item (scaled by Mongo's textScore, ~0.5-1.5)
+SCORE_NUMBER = 100.0
+SCORE_NAME = 80.0
+SCORE_NAME_WORD = 60.0
+SCORE_EMAIL = 50.0
+SCORE_ITEM = 20.0
+EXACT_BONUS = 10.0
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase without accents: 'Élodie' -> 'elodie'"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def client_search_terms(name: str, email: str) -> List[str]:
+    """Indexed terms of a client: full name, each word of it, email"""
+    full_name = " ".join(fold(name).split())
+    terms = [full_name] + _WORD.findall(full_name) + [fold(email)]
+    return list(dict.fromkeys(t for t in terms if t))
+
+
+def _client_hit(doc: dict, folded: str) -> dict:
+    name, email = fold(doc["name"]), fold(doc["email"])
+    if name.startswith(folded):
+        match, score = "name", SCORE_NAME + (EXACT_BONUS if name == folded else 0)
+    elif any(word.startswith(folded) for word in _WORD.findall(name)):
+        match, score = "name", SCORE_NAME_WORD
+    else:
+        match, score = "email", SCORE_EMAIL + (EXACT_BONUS if email == folded else 0)
+    return {"type": "client", "id": doc["id"], "label": doc["name"], "detail": doc["email"],
+            "match": match, "score": score, "created_at": doc.get("created_at")}
+
+
+def _document_hit(kind: str, doc: dict, number_field: str, match: str, score: float) -> dict:
+    return {"type": kind, "id": doc["id"], "label": doc[number_field],
+            "detail": f"{doc.get('client_name', '')} - {doc.get('total_ttc', 0):,.2f} € TTC",
+            "match": match, "score": round(score, 3), "created_at": doc.get("created_at"), "status": doc.get("status")}
+
+
+async def search(db, user_id: str, q: str, limit: int) -> List[dict]:
+    """Top `limit` hits for `q`, best first (ties: most recent first)"""
+    folded = " ".join(fold(q).split())
+    if not folded:
+        return []
+    number = q.strip().upper()
+    summary = {"_id": 0, "id": 1, "client_name": 1, "total_ttc": 1, "status": 1, "created_at": 1}
+
+    clients = db.clients.find(
+        {"user_id": user_id, "search_terms": {"$regex": "^" + re.escape(folded)}},
+        {"_id": 0, "id": 1, "name": 1, "email": 1, "created_at": 1},
+    ).limit(limit).to_list(limit)
+    quote_numbers = db.quotes.find({"user_id": user_id, "quote_number": number}, {**summary, "quote_number": 1}).to_list(limit)
+    invoice_numbers = db.invoices.find({"user_id": user_id, "invoice_number": number}, {**summary, "invoice_number": 1}).to_list(limit)
+
+    def by_item(collection, number_field):
+        score = {"score": {"$meta": "textScore"}}
+        return collection.find(
+            {"user_id": user_id, "$text": {"$search": q}}, {**summary, number_field: 1, **score}
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+
+    results = await asyncio.gather(
+        clients, quote_numbers, invoice_numbers,
+        by_item(db.quotes, "quote_number"), by_item(db.invoices, "invoice_number"),
+    )
+    client_docs, quote_docs, invoice_docs, quote_items, invoice_items = results
+
+    hits = {}
+    for hit in (
+        [_client_hit(doc, folded) for doc in client_docs]
+        + [_document_hit("quote", doc, "quote_number", "number", SCORE_NUMBER) for doc in quote_docs]
+        + [_document_hit("invoice", doc, "invoice_number", "number", SCORE_NUMBER) for doc in invoice_docs]
+        + [_document_hit("quote", doc, "quote_number", "item", SCORE_ITEM * doc["score"]) for doc in quote_items]
+        + [_document_hit("invoice", doc, "invoice_number", "item", SCORE_ITEM * doc["score"]) for doc in invoice_items]
+    ):
+        # A document found both by number and by item keeps its best hit
+        key = (hit["type"], hit["id"])
+        if key not in hits or hits[key]["score"] < hit["score"]:
+            hits[key] = hit
+    ranked = sorted(hits.values(), key=lambda h: h.get("created_at") or "", reverse=True)
+    ranked.sort(key=lambda h: h["score"], reverse=True)
+    return ranked[:limit]
+
+
+async def backfill_client_terms(db):
+    """Migration: search terms for clients written before they existed"""
+    if await db.migrations.find_one({"_id": SEARCH_MIGRATION_ID}):
+        return
+    requests = [
+        UpdateOne({"id": doc["id"]}, {"$set": {"search_terms": client_search_terms(doc["name"], doc["email"])}})
+        async for doc in db.clients.find({"search_terms": {"$exists": False}}, {"_id": 0, "id": 1, "name": 1, "email": 1})
+    ]
+    if requests:
+        await db.clients.bulk_write(requests, ordered=False)
+    await db.migrations.update_one(
+        {"_id": SEARCH_MIGRATION_ID},
+        {"$set": {"applied_at": datetime.now(timezone.utc).isoformat(), "clients": len(requests)}},
+        upsert=True,
+    )
+    logger.info(f"Indexed {len(requests)} existing client(s) for search")
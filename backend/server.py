@@ -1,14 +1,22 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, status, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
+import base64
+import hmac
+import json
+import time
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, TypeAdapter
+from typing import Dict, List, Optional, Tuple, Type, Union
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
@@ -18,13 +26,19 @@ import ssl
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-from io import BytesIO
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
+from logo_cache import logo_cache, company_logo_url, is_fetchable_url
+from pdf_pool import render_pool, RenderQueueFull
+from pdf_cache import pdf_cache, pdf_cache_key
+from pdf_export import zip_stream
+from data_export import EXPORTS, FORMATS, export_stream
+from outbox import outbox, PermanentError
+from smtp_pool import SmtpPool
+from open_tracker import open_tracker, HOUR, DAY
+from auth_cache import auth_cache
+from counters import counters, QUOTE, INVOICE
+from indexes import ensure_indexes
+from search import search, client_search_terms, backfill_client_terms
+from user_stats import user_stats, summary as stats_summary
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -44,6 +58,25 @@ SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.ionos.fr')
 SMTP_PORT = int(os.environ.get('SMTP_PORT', 465))
 SMTP_EMAIL = os.environ.get('SMTP_EMAIL', '')
 SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+# CA bundle for a server with a private certificate (e.g. the local benchmark SMTP sink)
+SMTP_CA_FILE = os.environ.get('SMTP_CA_FILE') or None
+smtp_pool = SmtpPool(SMTP_HOST, SMTP_PORT, SMTP_EMAIL, SMTP_PASSWORD, context=ssl.create_default_context(cafile=SMTP_CA_FILE))
+
+# Payment reminders: no new reminder to a client within the cooldown; the
+# scheduled campaign is disabled unless REMINDER_SCHEDULE_SECONDS is set
+REMINDER_COOLDOWN_DAYS = int(os.environ.get('REMINDER_COOLDOWN_DAYS', 7))
+REMINDER_SCHEDULE_SECONDS = int(os.environ.get('REMINDER_SCHEDULE_SECONDS', 0))
+REMINDER_CONCURRENCY = int(os.environ.get('REMINDER_CONCURRENCY', 8))
+# A campaign still "en cours" after this long was left by a crashed process
+REMINDER_CAMPAIGN_TIMEOUT_SECONDS = int(os.environ.get('REMINDER_CAMPAIGN_TIMEOUT_SECONDS', 3600))
+
+# Password hashing: bcrypt cost factor (stored hashes with another cost are
+# re-hashed on the next login) and threads doing it off the event loop
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+
+# Seconds to wait after a write before pre-rendering its PDF
+PDF_PRERENDER_DELAY = float(os.environ.get('PDF_PRERENDER_DELAY', 1.0))
 
 # Create the main app
 app = FastAPI(title="DevisPro API")
@@ -214,6 +247,37 @@ class InvoiceResponse(BaseModel):
     created_at: str
     payments: List[dict] = []
 
+# List views: what the quote and invoice tables show, without line items or payments
+class QuoteSummary(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    quote_number: str
+    client_id: str
+    client_name: str
+    emission_date: str
+    expiration_date: str
+    total_ttc: float
+    status: str
+    created_at: str
+    sent_at: Optional[str] = None
+    opened_at: Optional[str] = None
+    open_count: int = 0
+
+class InvoiceSummary(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    invoice_number: str
+    quote_id: str
+    client_id: str
+    client_name: str
+    emission_date: str
+    due_date: str
+    total_ttc: float
+    acompte: float = 0.0
+    reste_a_payer: float = 0.0
+    status: str
+    created_at: str
+
 class PaymentCreate(BaseModel):
     amount: float
     payment_date: str
@@ -232,14 +296,41 @@ class DashboardStats(BaseModel):
     total_clients: int
     total_services: int
 
+class SearchHit(BaseModel):
+    type: str  # client, quote or invoice
+    id: str
+    label: str
+    detail: str
+    match: str  # name, email, number or item
+    score: float
+    status: Optional[str] = None
+    created_at: Optional[str] = None
+
 # ============ AUTH HELPERS ============
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# bcrypt releases the GIL: a few threads absorb a login burst while the
+# event loop keeps serving other requests
+password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+def hash_password_blocking(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
 
-def verify_password(password: str, hashed: str) -> bool:
+def verify_password_blocking(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_pool, hash_password_blocking, password, BCRYPT_ROUNDS)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(password_pool, verify_password_blocking, password, hashed)
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True when the hash was made with another cost than BCRYPT_ROUNDS ($2b$<cost>$...)"""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
 def create_token(user_id: str) -> str:
     payload = {
         "user_id": user_id,
@@ -248,14 +339,22 @@ def create_token(user_id: str) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    started = time.perf_counter()
+    token = credentials.credentials
+    user = auth_cache.get(token)
+    if user is not None:
+        auth_cache.observe(True, time.perf_counter() - started)
+        return user
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Token invalide")
         user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
         if not user:
             raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+        auth_cache.put(token, user, payload.get("exp"))
+        auth_cache.observe(False, time.perf_counter() - started)
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expiré")
@@ -275,10 +374,14 @@ async def register(user: UserCreate):
         "id": user_id,
         "email": user.email,
         "name": user.name,
-        "password": hash_password(user.password),
+        "password": await hash_password(user.password),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.users.insert_one(user_doc)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Same email registered concurrently (unique index on users.email)
+        raise HTTPException(status_code=400, detail="Email déjà utilisé")
     
     # Create default company settings
     company_doc = CompanySettings(user_id=user_id).model_dump()
@@ -299,8 +402,15 @@ async def register(user: UserCreate):
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(user: UserLogin):
     db_user = await db.users.find_one({"email": user.email}, {"_id": 0})
-    if not db_user or not verify_password(user.password, db_user['password']):
+    if not db_user or not await verify_password(user.password, db_user['password']):
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
+    if password_needs_rehash(db_user['password']):
+        # Cost factor changed since the hash was made: upgrade it while we have the password
+        await db.users.update_one(
+            {"id": db_user['id'], "password": db_user['password']},
+            {"$set": {"password": await hash_password(user.password)}}
+        )
+        auth_cache.invalidate(db_user['id'])
     
     token = create_token(db_user['id'])
     return TokenResponse(
@@ -319,6 +429,13 @@ async def get_me(user: dict = Depends(get_current_user)):
 
 # ============ COMPANY SETTINGS ROUTES ============
 
+async def get_company_doc(user_id: str) -> dict:
+    """Company settings used on documents, defaults when not configured yet"""
+    company = await db.company_settings.find_one({"user_id": user_id}, {"_id": 0})
+    if not company:
+        company = CompanySettings(user_id=user_id).model_dump()
+    return company
+
 @api_router.get("/company", response_model=CompanySettings)
 async def get_company_settings(user: dict = Depends(get_current_user)):
     settings = await db.company_settings.find_one({"user_id": user['id']}, {"_id": 0})
@@ -332,14 +449,101 @@ async def get_company_settings(user: dict = Depends(get_current_user)):
 @api_router.put("/company", response_model=CompanySettings)
 async def update_company_settings(update: CompanySettingsUpdate, user: dict = Depends(get_current_user)):
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    if update_data.get('logo_url') and not is_fetchable_url(update_data['logo_url']):
+        raise HTTPException(status_code=400, detail="URL du logo invalide (http:// ou https:// attendu)")
     if update_data:
         await db.company_settings.update_one(
             {"user_id": user['id']},
             {"$set": update_data}
         )
+    if update_data.get('logo_url'):
+        # Warm the logo cache so the next PDF already has the new logo
+        logo_cache.prefetch(update_data['logo_url'])
     settings = await db.company_settings.find_one({"user_id": user['id']}, {"_id": 0})
     return CompanySettings(**settings)
 
+# ============ PAGINATION ============
+
+# Lists are read newest first in pages keyed on (created_at, id): the cursor
+# is the key of the last item returned, so inserts made while paging never
+# shift or repeat items, and every page is one index range scan.
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc.get('created_at'), doc['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(created_at, str) or not isinstance(doc_id, str):
+            raise ValueError(cursor)
+        return created_at, doc_id
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+async def paginate(collection, query: dict, response: Response, limit: int, after: Optional[str], all_items: bool,
+                   projection: Optional[dict] = None) -> List[dict]:
+    """One page of `query`, newest first; sets the next page's cursor header
+    when there is one. `all_items` returns the whole list (former behaviour)."""
+    sort = [("created_at", -1), ("id", -1)]
+    projection = projection or {"_id": 0}
+    if all_items:
+        return await collection.find(query, projection).sort(sort).to_list(None)
+    if after:
+        created_at, doc_id = decode_cursor(after)
+        query = {**query, "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": doc_id}},
+        ]}
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(docs[-1])
+    return docs
+
+# ?view=summary or ?fields=a,b,c on the quote and invoice lists: MongoDB only
+# sends those fields, and the page is validated and serialized in one pydantic
+# pass instead of model instances re-validated by FastAPI.
+_list_adapters: Dict[type, TypeAdapter] = {}
+
+def list_projection(full_model: Type[BaseModel], summary_model: Type[BaseModel], view: str,
+                    fields: Optional[str]) -> Tuple[dict, Optional[Type[BaseModel]]]:
+    """(Mongo projection, model to validate with; None for a field list)"""
+    if fields:
+        requested = {f.strip() for f in fields.split(',') if f.strip()}
+        unknown = requested - set(full_model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Champs inconnus: {', '.join(sorted(unknown))}")
+        # The pagination key is always returned
+        return {"_id": 0, "id": 1, "created_at": 1, **{f: 1 for f in requested}}, None
+    model = summary_model if view == "summary" else full_model
+    if model is full_model:
+        return {"_id": 0}, model
+    return {"_id": 0, **{f: 1 for f in model.model_fields}}, model
+
+def list_responses(full_model: Type[BaseModel], summary_model: Type[BaseModel]) -> dict:
+    """OpenAPI of a list route answering through list_response (response_model=None)"""
+    return {200: {
+        "model": Union[List[full_model], List[summary_model]],
+        "description": (f"Default: full documents ({full_model.__name__}). view=summary: the list "
+                        f"columns only ({summary_model.__name__}). fields=a,b: objects with only those "
+                        f"fields of {full_model.__name__}, plus id and created_at."),
+    }}
+
+def list_response(docs: List[dict], model: Optional[Type[BaseModel]], response: Response) -> Response:
+    if model is None:
+        body = json.dumps(docs, ensure_ascii=False, default=str).encode('utf-8')
+    else:
+        adapter = _list_adapters.get(model)
+        if adapter is None:
+            adapter = _list_adapters[model] = TypeAdapter(List[model])
+        body = adapter.dump_json(adapter.validate_python(docs))
+    headers = {NEXT_CURSOR_HEADER: response.headers[NEXT_CURSOR_HEADER]} if NEXT_CURSOR_HEADER in response.headers else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # ============ CLIENTS ROUTES ============
 
 @api_router.post("/clients", response_model=ClientResponse)
@@ -351,14 +555,22 @@ async def create_client(client: ClientCreate, user: dict = Depends(get_current_u
         "address": client.address,
         "email": client.email,
         "phone": client.phone,
+        "search_terms": client_search_terms(client.name, client.email),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.clients.insert_one(client_doc)
+    await user_stats.apply(user['id'], clients=1)
     return ClientResponse(**{k: v for k, v in client_doc.items() if k != '_id'})
 
 @api_router.get("/clients", response_model=List[ClientResponse])
-async def get_clients(user: dict = Depends(get_current_user)):
-    clients = await db.clients.find({"user_id": user['id']}, {"_id": 0}).to_list(1000)
+async def get_clients(
+    response: Response,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    all_items: bool = Query(False, alias="all"),
+    user: dict = Depends(get_current_user),
+):
+    clients = await paginate(db.clients, {"user_id": user['id']}, response, limit, after, all_items)
     return [ClientResponse(**c) for c in clients]
 
 @api_router.get("/clients/{client_id}", response_model=ClientResponse)
@@ -372,7 +584,7 @@ async def get_client(client_id: str, user: dict = Depends(get_current_user)):
 async def update_client(client_id: str, client: ClientCreate, user: dict = Depends(get_current_user)):
     result = await db.clients.update_one(
         {"id": client_id, "user_id": user['id']},
-        {"$set": client.model_dump()}
+        {"$set": {**client.model_dump(), "search_terms": client_search_terms(client.name, client.email)}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Client non trouvé")
@@ -384,6 +596,7 @@ async def delete_client(client_id: str, user: dict = Depends(get_current_user)):
     result = await db.clients.delete_one({"id": client_id, "user_id": user['id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Client non trouvé")
+    await user_stats.apply(user['id'], clients=-1)
     return {"message": "Client supprimé"}
 
 # ============ SERVICES ROUTES ============
@@ -397,11 +610,18 @@ async def create_service(service: ServiceCreate, user: dict = Depends(get_curren
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.services.insert_one(service_doc)
+    await user_stats.apply(user['id'], services=1)
     return ServiceResponse(**{k: v for k, v in service_doc.items() if k != '_id'})
 
 @api_router.get("/services", response_model=List[ServiceResponse])
-async def get_services(user: dict = Depends(get_current_user)):
-    services = await db.services.find({"user_id": user['id']}, {"_id": 0}).to_list(1000)
+async def get_services(
+    response: Response,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    all_items: bool = Query(False, alias="all"),
+    user: dict = Depends(get_current_user),
+):
+    services = await paginate(db.services, {"user_id": user['id']}, response, limit, after, all_items)
     return [ServiceResponse(**s) for s in services]
 
 @api_router.get("/services/{service_id}", response_model=ServiceResponse)
@@ -427,17 +647,16 @@ async def delete_service(service_id: str, user: dict = Depends(get_current_user)
     result = await db.services.delete_one({"id": service_id, "user_id": user['id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Prestation non trouvée")
+    await user_stats.apply(user['id'], services=-1)
     return {"message": "Prestation supprimée"}
 
 # ============ QUOTES ROUTES ============
 
 async def get_next_quote_number(user_id: str) -> str:
-    year = datetime.now().year
-    count = await db.quotes.count_documents({"user_id": user_id})
-    return f"D-{year}-{count + 1:03d}"
+    return await counters.next_value(user_id, QUOTE)
 
 @api_router.post("/quotes", response_model=QuoteResponse)
-async def create_quote(quote: QuoteCreate, user: dict = Depends(get_current_user)):
+async def create_quote(quote: QuoteCreate, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
     client = await db.clients.find_one({"id": quote.client_id, "user_id": user['id']}, {"_id": 0})
     if not client:
         raise HTTPException(status_code=404, detail="Client non trouvé")
@@ -472,12 +691,35 @@ async def create_quote(quote: QuoteCreate, user: dict = Depends(get_current_user
         "sent_at": None
     }
     await db.quotes.insert_one(quote_doc)
+    await user_stats.quote_status(user['id'], None, quote_doc['status'])
+    background_tasks.add_task(schedule_pdf_prerender, "quote", quote_doc['id'], user['id'])
     return QuoteResponse(**{k: v for k, v in quote_doc.items() if k != '_id'})
 
-@api_router.get("/quotes", response_model=List[QuoteResponse])
-async def get_quotes(user: dict = Depends(get_current_user)):
-    quotes = await db.quotes.find({"user_id": user['id']}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return [QuoteResponse(**q) for q in quotes]
+@api_router.get("/quotes", response_model=None, responses=list_responses(QuoteResponse, QuoteSummary))
+async def get_quotes(
+    response: Response,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    status: Optional[str] = None,
+    client_id: Optional[str] = None,
+    all_items: bool = Query(False, alias="all"),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
+    user: dict = Depends(get_current_user),
+):
+    query = {"user_id": user['id']}
+    if status:
+        query["status"] = status
+    if client_id:
+        query["client_id"] = client_id
+    projection, model = list_projection(QuoteResponse, QuoteSummary, view, fields)
+    quotes = await paginate(db.quotes, query, response, limit, after, all_items, projection)
+    return list_response(quotes, model, response)
+
+@api_router.get("/quotes/export.zip")
+async def export_quotes_zip(date_from: Optional[str] = Query(None, alias="from"), date_to: Optional[str] = Query(None, alias="to"), status: Optional[str] = None, user: dict = Depends(get_current_user)):
+    """ZIP of all quote PDFs emitted in a date range"""
+    return await export_pdf_zip("quote", user, date_from, date_to, status)
 
 @api_router.get("/quotes/{quote_id}", response_model=QuoteResponse)
 async def get_quote(quote_id: str, user: dict = Depends(get_current_user)):
@@ -487,7 +729,7 @@ async def get_quote(quote_id: str, user: dict = Depends(get_current_user)):
     return QuoteResponse(**quote)
 
 @api_router.put("/quotes/{quote_id}", response_model=QuoteResponse)
-async def update_quote(quote_id: str, update: QuoteUpdate, user: dict = Depends(get_current_user)):
+async def update_quote(quote_id: str, update: QuoteUpdate, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
     quote = await db.quotes.find_one({"id": quote_id, "user_id": user['id']}, {"_id": 0})
     if not quote:
         raise HTTPException(status_code=404, detail="Devis non trouvé")
@@ -515,478 +757,115 @@ async def update_quote(quote_id: str, update: QuoteUpdate, user: dict = Depends(
         update_data['total_ttc'] = total_ht + total_tva
     
     if update_data:
-        await db.quotes.update_one({"id": quote_id}, {"$set": update_data})
+        # Status before this very write, for the dashboard counters
+        before = await db.quotes.find_one_and_update(
+            {"id": quote_id}, {"$set": update_data}, projection={"_id": 0, "status": 1}
+        )
+        if before and 'status' in update_data:
+            await user_stats.quote_status(user['id'], before.get('status'), update_data['status'])
+        background_tasks.add_task(schedule_pdf_prerender, "quote", quote_id, user['id'])
     
     updated = await db.quotes.find_one({"id": quote_id}, {"_id": 0})
     return QuoteResponse(**updated)
 
 @api_router.delete("/quotes/{quote_id}")
 async def delete_quote(quote_id: str, user: dict = Depends(get_current_user)):
-    result = await db.quotes.delete_one({"id": quote_id, "user_id": user['id']})
-    if result.deleted_count == 0:
+    deleted = await db.quotes.find_one_and_delete({"id": quote_id, "user_id": user['id']}, projection={"_id": 0, "status": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Devis non trouvé")
+    await user_stats.quote_status(user['id'], deleted.get('status'), None)
     return {"message": "Devis supprimé"}
 
 # ============ PDF GENERATION ============
 
-def generate_quote_pdf(quote: dict, company: dict) -> bytes:
-    """Generate PDF matching the original CREATIVINDUSTRY format"""
-    import urllib.request
-    from reportlab.platypus import Image, HRFlowable
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=15*mm, leftMargin=15*mm, topMargin=15*mm, bottomMargin=15*mm)
-    
-    # Colors - Blue/Navy theme like original
-    NAVY = colors.HexColor('#1e3a5f')
-    LIGHT_GRAY = colors.HexColor('#f5f5f5')
-    BORDER_GRAY = colors.HexColor('#cccccc')
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=14, textColor=NAVY, spaceAfter=8, fontName='Helvetica-Bold')
-    header_style = ParagraphStyle('Header', parent=styles['Normal'], fontSize=9, textColor=colors.black)
-    section_title = ParagraphStyle('Section', parent=styles['Heading2'], fontSize=10, textColor=NAVY, spaceBefore=10, spaceAfter=5, fontName='Helvetica-Bold')
-    normal_style = ParagraphStyle('Normal', parent=styles['Normal'], fontSize=9, textColor=colors.black)
-    small_style = ParagraphStyle('Small', parent=styles['Normal'], fontSize=7, textColor=colors.HexColor('#666666'))
-    label_style = ParagraphStyle('Label', parent=styles['Normal'], fontSize=8, textColor=colors.HexColor('#888888'))
-    
-    elements = []
-    
-    # Format numbers
-    def fmt_price(val):
-        return f"{val:,.2f} €".replace(",", " ").replace(".", ",").replace(" ", " ")
-    
-    def fmt_date(date_str):
-        if not date_str:
-            return ""
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-            months = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre"]
-            return f"{d.day} {months[d.month-1]} {d.year}"
-        except:
-            return date_str
-    
-    # Try to load logo - Clean CREATIVINDUSTRY France logo
-    logo_url = "https://customer-assets.emergentagent.com/job_df4bb327-88bd-4623-9022-ebd45334706b/artifacts/ml5zhjie_Nvo%20logo%20Creativindustry%20France.png"
-    logo_img = None
+def pdf_key(kind: str, doc: dict, company: dict, compact: bool = False) -> Tuple[str, Optional[bytes]]:
+    """Content hash of a document as it would be rendered, with the logo it would use.
+    `compact` selects the downsampled logo used for email attachments."""
+    logo = logo_cache.get_entry(company_logo_url(company))
+    if logo is None:
+        return pdf_cache_key(kind, doc, company, None), None
+    if compact:
+        return pdf_cache_key(kind, doc, company, logo.compact_digest), logo.compact
+    return pdf_cache_key(kind, doc, company, logo.digest), logo.data
+
+# cache key -> render task, so concurrent requests for the same PDF share one render
+pdf_renders_in_flight: Dict[str, asyncio.Task] = {}
+
+@app.exception_handler(RenderQueueFull)
+async def render_queue_full(request: Request, exc: RenderQueueFull):
+    return JSONResponse(status_code=503, content={"detail": "Trop de PDF en cours de génération, veuillez réessayer"})
+
+async def _render_to_cache(kind: str, doc: dict, company: dict, key: str, logo: Optional[bytes], wait: bool) -> bytes:
+    # RenderQueueFull propagates: routes answer 503 through render_queue_full
+    pdf_bytes = await render_pool.render(kind, doc, company, logo, wait=wait)
+    pdf_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
+async def render_pdf(kind: str, doc: dict, company: dict, wait: bool = False, compact: bool = False) -> Tuple[bytes, str]:
+    """Return (pdf_bytes, cache_key), rendering in the pool only when no cached copy matches"""
+    key, logo = pdf_key(kind, doc, company, compact)
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is None:
+        task = pdf_renders_in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_render_to_cache(kind, doc, company, key, logo, wait))
+            pdf_renders_in_flight[key] = task
+            task.add_done_callback(lambda _: pdf_renders_in_flight.pop(key, None))
+        # shield: a cancelled waiter must not cancel a render others are waiting for
+        pdf_bytes = await asyncio.shield(task)
+    return pdf_bytes, key
+
+# (kind, document id) -> pending pre-render task
+pdf_prerender_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+async def prerender_pdf(kind: str, doc_id: str, user_id: str):
+    """Warm the PDF cache with the latest version of a document"""
+    # Debounce: back-to-back edits cancel this task before anything is rendered
+    await asyncio.sleep(PDF_PRERENDER_DELAY)
+    collection = db.quotes if kind == "quote" else db.invoices
+    doc = await collection.find_one({"id": doc_id, "user_id": user_id}, {"_id": 0})
+    if not doc:
+        return
+    company = await get_company_doc(user_id)
     try:
-        logo_data = urllib.request.urlopen(logo_url, timeout=5).read()
-        logo_buffer = BytesIO(logo_data)
-        # Keep aspect ratio - width 40mm, height auto-calculated
-        logo_img = Image(logo_buffer, width=40*mm, height=25*mm, kind='proportional')
-    except:
-        pass
-    
-    # ===== HEADER: Logo + Company Info Box =====
-    company_name = company.get('name', 'CREATIVINDUSTRY')
-    company_box = f"""<font size="7" color="#888888">Émetteur ou Émettrice</font><br/>
-<b>{company_name}</b><br/>
-{company.get('address', '')}<br/>
-{company.get('email', '')}<br/>
-{company.get('phone', '')}"""
-    
-    if logo_img:
-        header_data = [[logo_img, '', Paragraph(company_box, normal_style)]]
-        header_table = Table(header_data, colWidths=[50*mm, 40*mm, 90*mm])
-    else:
-        header_data = [['', Paragraph(company_box, normal_style)]]
-        header_table = Table(header_data, colWidths=[90*mm, 90*mm])
-    
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOX', (-1, 0), (-1, 0), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (-1, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (-1, 0), (-1, 0), 8),
-        ('LEFTPADDING', (-1, 0), (-1, 0), 8),
-        ('RIGHTPADDING', (-1, 0), (-1, 0), 8),
-    ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 8*mm))
-    
-    # ===== DEVIS INFO + CLIENT BOX =====
-    devis_info = f"""<b><font size="12">Devis</font></b><br/><br/>
-<b>Numéro</b>          {quote['quote_number']}<br/>
-<b>Date d'émission</b>    {fmt_date(quote['emission_date'])}<br/>
-<b>Date d'expiration</b>  {fmt_date(quote['expiration_date'])}<br/>
-<b>Type de vente</b>      Prestations de services"""
-    
-    if quote.get('event_date'):
-        devis_info += f"<br/><b>Date événement</b>    {fmt_date(quote['event_date'])}"
-    
-    client_box = f"""<font size="7" color="#888888">Client ou Cliente</font><br/>
-<b>{quote['client_name']}</b><br/>
-{quote['client_address']}<br/>
-{quote['client_email']}<br/>
-{quote['client_phone']}"""
-    
-    info_data = [[Paragraph(devis_info, normal_style), Paragraph(client_box, normal_style)]]
-    info_table = Table(info_data, colWidths=[90*mm, 90*mm])
-    info_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOX', (1, 0), (1, 0), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (1, 0), (1, 0), 8),
-        ('BOTTOMPADDING', (1, 0), (1, 0), 8),
-        ('LEFTPADDING', (1, 0), (1, 0), 8),
-        ('RIGHTPADDING', (1, 0), (1, 0), 8),
-    ]))
-    elements.append(info_table)
-    elements.append(Spacer(1, 6*mm))
-    
-    # ===== ITEMS TABLE =====
-    items_data = [['Produits', 'Qté', 'Prix u. HT', 'TVA (%)', 'Total HT']]
-    for item in quote['items']:
-        total_ht = item['quantity'] * item['price_ht']
-        tva_text = f"{item['tva_rate']}%" if item['tva_rate'] > 0 else "Aucune"
-        items_data.append([
-            Paragraph(f"<b>{item['service_name']}</b>", normal_style),
-            f"{item['quantity']} {item['unit']}",
-            fmt_price(item['price_ht']),
-            tva_text,
-            fmt_price(total_ht)
-        ])
-    
-    items_table = Table(items_data, colWidths=[60*mm, 25*mm, 35*mm, 25*mm, 35*mm])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), NAVY),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
-        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),
-        ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(items_table)
-    elements.append(Spacer(1, 6*mm))
-    
-    # ===== TVA DETAILS + RÉCAPITULATIF (side by side) =====
-    # TVA Details
-    tva_details = {}
-    for item in quote['items']:
-        rate = item['tva_rate']
-        base = item['quantity'] * item['price_ht']
-        tva_amount = base * (rate / 100)
-        if rate not in tva_details:
-            tva_details[rate] = {"base": 0, "amount": 0}
-        tva_details[rate]["base"] += base
-        tva_details[rate]["amount"] += tva_amount
-    
-    tva_data = [['Taux', 'Montant TVA', 'Base HT']]
-    for rate, vals in tva_details.items():
-        tva_text = f"{rate}%" if rate > 0 else "Aucune"
-        tva_data.append([tva_text, fmt_price(vals['amount']), fmt_price(vals['base'])])
-    
-    tva_table = Table(tva_data, colWidths=[25*mm, 30*mm, 30*mm])
-    tva_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-        ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('BACKGROUND', (0, 0), (-1, 0), LIGHT_GRAY),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
-    
-    # Récapitulatif
-    recap_data = [
-        ['Total HT avant remise', fmt_price(quote['total_ht_before_discount'])],
-        ['Remise', fmt_price(quote['discount'])],
-        ['Total HT', fmt_price(quote['total_ht'])],
-        ['Total TVA', fmt_price(quote['total_tva'])],
-        ['Total TTC', fmt_price(quote['total_ttc'])],
-    ]
-    
-    recap_table = Table(recap_data, colWidths=[45*mm, 35*mm])
-    recap_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('BACKGROUND', (0, 4), (-1, 4), NAVY),
-        ('TEXTCOLOR', (0, 4), (-1, 4), colors.white),
-        ('FONTNAME', (0, 4), (-1, 4), 'Helvetica-Bold'),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
-    
-    # Combine TVA + Recap side by side
-    combined_data = [
-        [Paragraph("<b>Détails TVA</b>", section_title), Paragraph("<b>Récapitulatif</b>", section_title)],
-        [tva_table, recap_table]
-    ]
-    combined_table = Table(combined_data, colWidths=[90*mm, 90*mm])
-    combined_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    elements.append(combined_table)
-    elements.append(Spacer(1, 8*mm))
-    
-    # ===== PAIEMENT BOX =====
-    payment_info = f"""<b>Paiement</b><br/><br/>
-<b>Établissement</b>     {company.get('bank_name', 'QONTO')}<br/>
-<b>IBAN</b>              {company.get('iban', '')}<br/>
-<b>BIC</b>               {company.get('bic', '')}"""
-    
-    payment_data = [[Paragraph(payment_info, normal_style)]]
-    payment_table = Table(payment_data, colWidths=[180*mm])
-    payment_table.setStyle(TableStyle([
-        ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    elements.append(payment_table)
-    elements.append(Spacer(1, 6*mm))
-    
-    # ===== CONDITIONS =====
-    conditions = """Pénalités de retard : trois fois le taux annuel d'intérêt légal en vigueur calculé depuis la date d'échéance jusqu'à complet paiement du prix.<br/>
-Indemnité forfaitaire pour frais de recouvrement en cas de retard de paiement : 40 €"""
-    elements.append(Paragraph(conditions, small_style))
-    elements.append(Spacer(1, 6*mm))
-    
-    # ===== SIGNATURE =====
-    signature = """Date et signature précédées de la mention<br/>
-« Bon pour accord »"""
-    elements.append(Paragraph(signature, normal_style))
-    
-    doc.build(elements)
-    return buffer.getvalue()
-
-def generate_invoice_pdf(invoice: dict, company: dict) -> bytes:
-    """Generate PDF for invoice with acompte/payment details"""
-    import urllib.request
-    from reportlab.platypus import Image, HRFlowable
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=15*mm, leftMargin=15*mm, topMargin=15*mm, bottomMargin=15*mm)
-    
-    # Colors
-    NAVY = colors.HexColor('#1e3a5f')
-    GREEN = colors.HexColor('#059669')
-    ORANGE = colors.HexColor('#d97706')
-    LIGHT_GRAY = colors.HexColor('#f5f5f5')
-    BORDER_GRAY = colors.HexColor('#cccccc')
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=14, textColor=NAVY, spaceAfter=8, fontName='Helvetica-Bold')
-    normal_style = ParagraphStyle('Normal', parent=styles['Normal'], fontSize=9, textColor=colors.black)
-    small_style = ParagraphStyle('Small', parent=styles['Normal'], fontSize=7, textColor=colors.HexColor('#666666'))
-    section_title = ParagraphStyle('Section', parent=styles['Heading2'], fontSize=10, textColor=NAVY, spaceBefore=10, spaceAfter=5, fontName='Helvetica-Bold')
-    
-    elements = []
-    
-    def fmt_price(val):
-        return f"{val:,.2f} €".replace(",", " ").replace(".", ",").replace(" ", " ")
-    
-    def fmt_date(date_str):
-        if not date_str:
-            return ""
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-            months = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre"]
-            return f"{d.day} {months[d.month-1]} {d.year}"
-        except:
-            return date_str
-    
-    # Load logo
-    logo_url = "https://customer-assets.emergentagent.com/job_df4bb327-88bd-4623-9022-ebd45334706b/artifacts/ml5zhjie_Nvo%20logo%20Creativindustry%20France.png"
-    logo_img = None
-    try:
-        logo_data = urllib.request.urlopen(logo_url, timeout=5).read()
-        logo_buffer = BytesIO(logo_data)
-        logo_img = Image(logo_buffer, width=40*mm, height=25*mm, kind='proportional')
-    except:
-        pass
-    
-    # ===== HEADER =====
-    company_name = company.get('name', 'CREATIVINDUSTRY')
-    company_box = f"""<font size="7" color="#888888">Émetteur ou Émettrice</font><br/>
-<b>{company_name}</b><br/>
-{company.get('address', '')}<br/>
-{company.get('email', '')}<br/>
-{company.get('phone', '')}"""
-    
-    if logo_img:
-        header_data = [[logo_img, '', Paragraph(company_box, normal_style)]]
-        header_table = Table(header_data, colWidths=[50*mm, 40*mm, 90*mm])
-    else:
-        header_data = [['', Paragraph(company_box, normal_style)]]
-        header_table = Table(header_data, colWidths=[90*mm, 90*mm])
-    
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOX', (-1, 0), (-1, 0), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (-1, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (-1, 0), (-1, 0), 8),
-        ('LEFTPADDING', (-1, 0), (-1, 0), 8),
-    ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 8*mm))
-    
-    # ===== FACTURE INFO + CLIENT =====
-    invoice_info = f"""<b><font size="14" color="#1e3a5f">FACTURE</font></b><br/><br/>
-<b>Numéro</b>          {invoice['invoice_number']}<br/>
-<b>Date d'émission</b>    {fmt_date(invoice['emission_date'])}<br/>
-<b>Date d'échéance</b>    {fmt_date(invoice['due_date'])}<br/>
-<b>Devis d'origine</b>    {invoice.get('quote_id', '-')[:8]}..."""
-    
-    client_box = f"""<font size="7" color="#888888">Client ou Cliente</font><br/>
-<b>{invoice['client_name']}</b><br/>
-{invoice['client_address']}<br/>
-{invoice['client_email']}<br/>
-{invoice['client_phone']}"""
-    
-    info_data = [[Paragraph(invoice_info, normal_style), Paragraph(client_box, normal_style)]]
-    info_table = Table(info_data, colWidths=[90*mm, 90*mm])
-    info_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOX', (1, 0), (1, 0), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (1, 0), (1, 0), 8),
-        ('BOTTOMPADDING', (1, 0), (1, 0), 8),
-        ('LEFTPADDING', (1, 0), (1, 0), 8),
-    ]))
-    elements.append(info_table)
-    elements.append(Spacer(1, 6*mm))
-    
-    # ===== ITEMS TABLE =====
-    items_data = [['Désignation', 'Qté', 'Prix u. HT', 'TVA', 'Total HT']]
-    for item in invoice['items']:
-        total_ht = item['quantity'] * item['price_ht']
-        tva_text = f"{item['tva_rate']}%" if item['tva_rate'] > 0 else "Exonéré"
-        items_data.append([
-            Paragraph(f"<b>{item['service_name']}</b>", normal_style),
-            f"{item['quantity']} {item['unit']}",
-            fmt_price(item['price_ht']),
-            tva_text,
-            fmt_price(total_ht)
-        ])
-    
-    items_table = Table(items_data, colWidths=[60*mm, 25*mm, 35*mm, 25*mm, 35*mm])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), NAVY),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
-        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),
-        ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(items_table)
-    elements.append(Spacer(1, 6*mm))
-    
-    # ===== TOTALS =====
-    totals_data = [
-        ['Total HT', fmt_price(invoice['total_ht'])],
-        ['Total TVA', fmt_price(invoice['total_tva'])],
-        ['Total TTC', fmt_price(invoice['total_ttc'])],
-    ]
-    
-    totals_table = Table(totals_data, colWidths=[100*mm, 80*mm])
-    totals_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('LINEBELOW', (0, 0), (-1, 1), 0.5, BORDER_GRAY),
-        ('BACKGROUND', (0, 2), (-1, 2), NAVY),
-        ('TEXTCOLOR', (0, 2), (-1, 2), colors.white),
-        ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(totals_table)
-    elements.append(Spacer(1, 8*mm))
-    
-    # ===== ACOMPTES / PAIEMENTS =====
-    payments = invoice.get('payments', [])
-    acompte = invoice.get('acompte', 0)
-    reste = invoice.get('reste_a_payer', invoice['total_ttc'])
-    
-    if payments or acompte > 0:
-        elements.append(Paragraph("<b>RÈGLEMENTS</b>", section_title))
-        
-        payment_rows = [['Date', 'Mode', 'Montant', 'Notes']]
-        for p in payments:
-            payment_rows.append([
-                fmt_date(p.get('payment_date', '')),
-                p.get('payment_method', 'Virement').capitalize(),
-                fmt_price(p.get('amount', 0)),
-                p.get('notes', '-') or '-'
-            ])
-        
-        payment_table = Table(payment_rows, colWidths=[40*mm, 40*mm, 40*mm, 60*mm])
-        payment_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#059669')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
-            ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-            ('INNERGRID', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-            ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ]))
-        elements.append(payment_table)
-        elements.append(Spacer(1, 4*mm))
-    
-    # ===== SOLDE BOX =====
-    solde_data = [
-        ['Total facture:', fmt_price(invoice['total_ttc'])],
-        ['Acompte(s) reçu(s):', fmt_price(acompte)],
-        ['RESTE À PAYER:', fmt_price(reste)],
-    ]
-    
-    solde_table = Table(solde_data, colWidths=[100*mm, 80*mm])
-    solde_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('LINEBELOW', (0, 0), (-1, 1), 0.5, BORDER_GRAY),
-        ('TEXTCOLOR', (0, 1), (-1, 1), GREEN),
-        ('BACKGROUND', (0, 2), (-1, 2), ORANGE),
-        ('TEXTCOLOR', (0, 2), (-1, 2), colors.white),
-        ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 2), (-1, 2), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(solde_table)
-    elements.append(Spacer(1, 8*mm))
-    
-    # ===== BANK INFO =====
-    elements.append(Paragraph("<b>COORDONNÉES BANCAIRES</b>", section_title))
-    bank_info = f"""<b>Établissement</b>     {company.get('bank_name', 'QONTO')}<br/>
-<b>IBAN</b>              {company.get('iban', '')}<br/>
-<b>BIC</b>               {company.get('bic', '')}"""
-    
-    bank_data = [[Paragraph(bank_info, normal_style)]]
-    bank_table = Table(bank_data, colWidths=[180*mm])
-    bank_table.setStyle(TableStyle([
-        ('BOX', (0, 0), (-1, -1), 0.5, BORDER_GRAY),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    elements.append(bank_table)
-    elements.append(Spacer(1, 6*mm))
-    
-    # ===== CONDITIONS =====
-    conditions = """Pénalités de retard : trois fois le taux annuel d'intérêt légal. Indemnité forfaitaire pour frais de recouvrement : 40 €"""
-    elements.append(Paragraph(conditions, small_style))
-    
-    doc.build(elements)
-    return buffer.getvalue()
+        await render_pdf(kind, doc, company)
+        if kind == "quote":
+            # The email attachment is the compact variant: warm it too for the next /send
+            await render_pdf(kind, doc, company, compact=True)
+    except RenderQueueFull:
+        # Interactive downloads go first, the PDF will be rendered on demand
+        logger.info(f"PDF pre-render skipped for {kind} {doc_id}: render queue full")
+    except Exception as e:
+        logger.error(f"PDF pre-render failed for {kind} {doc_id}: {e}")
+
+async def schedule_pdf_prerender(kind: str, doc_id: str, user_id: str):
+    """Background task run after writes: replaces any pending pre-render of the same document"""
+    task_key = (kind, doc_id)
+    previous = pdf_prerender_tasks.get(task_key)
+    if previous is not None:
+        previous.cancel()
+    task = asyncio.create_task(prerender_pdf(kind, doc_id, user_id))
+    pdf_prerender_tasks[task_key] = task
+    
+    def forget(done: asyncio.Task):
+        if pdf_prerender_tasks.get(task_key) is done:
+            del pdf_prerender_tasks[task_key]
+    task.add_done_callback(forget)
+
+async def pdf_response(kind: str, doc: dict, company: dict, filename: str, if_none_match: Optional[str]) -> Response:
+    """PDF download response with an ETag; answers 304 when the client already has this version"""
+    key, _ = pdf_key(kind, doc, company)
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    pdf_bytes, _ = await render_pdf(kind, doc, company)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 @api_router.get("/quotes/{quote_id}/pdf")
-async def get_quote_pdf(quote_id: str, user: dict = Depends(get_current_user)):
+async def get_quote_pdf(quote_id: str, if_none_match: Optional[str] = Header(None), user: dict = Depends(get_current_user)):
     quote = await db.quotes.find_one({"id": quote_id, "user_id": user['id']}, {"_id": 0})
     if not quote:
         raise HTTPException(status_code=404, detail="Devis non trouvé")
@@ -995,23 +874,90 @@ async def get_quote_pdf(quote_id: str, user: dict = Depends(get_current_user)):
     if not company:
         company = CompanySettings(user_id=user['id']).model_dump()
     
-    pdf_bytes = generate_quote_pdf(quote, company)
-    
     filename = f"Devis-{quote['client_name']}-{quote['quote_number']}.pdf"
-    
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
+    return await pdf_response("quote", quote, company, filename, if_none_match)
+
+# ============ BULK PDF EXPORT ============
+
+EXPORT_BATCH_SIZE = 50
+
+def parse_export_date(value: Optional[str], param: str) -> Optional[str]:
+    if value:
+        try:
+            datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Date invalide pour '{param}' (format attendu: AAAA-MM-JJ)")
+    return value
+
+async def export_pdf_zip(kind: str, user: dict, date_from: Optional[str], date_to: Optional[str], status: Optional[str]) -> StreamingResponse:
+    """Stream every quote or invoice PDF emitted in [date_from, date_to] as one ZIP archive"""
+    collection, number_field, label, archive_label = {
+        "quote": (db.quotes, "quote_number", "Devis", "Devis"),
+        "invoice": (db.invoices, "invoice_number", "Facture", "Factures"),
+    }[kind]
+    
+    query = {"user_id": user['id']}
+    date_filter = {}
+    if parse_export_date(date_from, "from"):
+        date_filter["$gte"] = date_from
+    if parse_export_date(date_to, "to"):
+        date_filter["$lte"] = date_to
+    if date_filter:
+        query["emission_date"] = date_filter
+    if status:
+        query["status"] = status
+    
+    # One company/logo lookup for the whole export
+    company = await get_company_doc(user['id'])
+    
+    async def pdf_bytes(doc: dict) -> bytes:
+        pdf, _ = await render_pdf(kind, doc, company, wait=True)
+        return pdf
+    
+    async def entries():
+        cursor = collection.find(query, {"_id": 0}).sort("emission_date", 1).batch_size(EXPORT_BATCH_SIZE)
+        async for doc in cursor:
+            yield f"{label}-{doc['client_name']}-{doc[number_field]}.pdf", pdf_bytes(doc)
+    
+    archive_name = f"{archive_label}-{date_from or 'debut'}-{date_to or 'fin'}.zip"
+    return StreamingResponse(
+        zip_stream(entries(), concurrency=max(2, render_pool.workers * 2)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{archive_name}"'}
+    )
+
+# ============ DATA EXPORT (NDJSON / CSV) ============
+
+@api_router.get("/export/{name}.{fmt}")
+async def export_data(name: str, fmt: str, date_from: Optional[str] = Query(None, alias="from"), date_to: Optional[str] = Query(None, alias="to"), status: Optional[str] = None, user: dict = Depends(get_current_user)):
+    """Stream quotes, invoices or payments (one row per payment) as NDJSON or CSV"""
+    if name not in EXPORTS or fmt not in FORMATS:
+        raise HTTPException(status_code=404, detail="Export inconnu (quotes, invoices ou payments, en .ndjson ou .csv)")
+    date_filter = {}
+    if parse_export_date(date_from, "from"):
+        date_filter["$gte"] = date_from
+    if parse_export_date(date_to, "to"):
+        date_filter["$lte"] = date_to
+    
+    filename = f"{name}-{date_from or 'debut'}-{date_to or 'fin'}.{fmt}"
+    return StreamingResponse(
+        export_stream(db, name, fmt, user['id'], date_filter, status),
+        media_type=FORMATS[fmt],
         headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 # ============ EMAIL SENDING (IONOS SMTP) ============
 
+def smtp_send(recipient: str, message: str):
+    """Blocking SMTP delivery over a pooled, already authenticated session; run in a thread"""
+    smtp_pool.send(SMTP_EMAIL, recipient, message)
+
 async def send_quote_email(quote: dict, company: dict, pdf_bytes: bytes, tracking_url: str, custom_message: str = None) -> dict:
-    """Send quote via email with PDF attachment using IONOS SMTP"""
+    """Send quote via email with PDF attachment using IONOS SMTP.
+    On failure `retry` tells whether sending again later may succeed."""
     if not SMTP_EMAIL or not SMTP_PASSWORD:
         logger.error("SMTP not configured")
-        return {"success": False, "error": "Configuration SMTP manquante"}
+        return {"success": False, "error": "Configuration SMTP manquante", "retry": False}
     
     try:
         # Create message
@@ -1052,65 +998,81 @@ async def send_quote_email(quote: dict, company: dict, pdf_bytes: bytes, trackin
         msg.attach(pdf_attachment)
         
         # Send via SMTP SSL
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context, timeout=30) as server:
-            server.login(SMTP_EMAIL, SMTP_PASSWORD)
-            server.sendmail(SMTP_EMAIL, quote['client_email'], msg.as_string())
+        await asyncio.to_thread(smtp_send, quote['client_email'], msg.as_string())
         
         logger.info(f"Email sent successfully to {quote['client_email']}")
         return {"success": True}
     except smtplib.SMTPRecipientsRefused as e:
         error_msg = f"L'adresse email '{quote['client_email']}' est invalide ou n'existe pas"
         logger.error(f"Recipients refused: {e}")
-        return {"success": False, "error": error_msg}
+        return {"success": False, "error": error_msg, "retry": False}
     except smtplib.SMTPAuthenticationError as e:
         logger.error(f"SMTP Auth error: {e}")
-        return {"success": False, "error": "Erreur d'authentification SMTP"}
+        return {"success": False, "error": "Erreur d'authentification SMTP", "retry": True}
     except smtplib.SMTPException as e:
         logger.error(f"SMTP error: {e}")
-        return {"success": False, "error": f"Erreur SMTP: {str(e)}"}
+        return {"success": False, "error": f"Erreur SMTP: {str(e)}", "retry": True}
     except Exception as e:
         logger.error(f"Failed to send email: {e}")
-        return {"success": False, "error": str(e)}
+        return {"success": False, "error": str(e), "retry": True}
 
 # Model for email request
 class SendEmailRequest(BaseModel):
     message: Optional[str] = None
 
-@api_router.post("/quotes/{quote_id}/send")
-async def send_quote(quote_id: str, request: SendEmailRequest = None, user: dict = Depends(get_current_user)):
-    quote = await db.quotes.find_one({"id": quote_id, "user_id": user['id']}, {"_id": 0})
+async def deliver_quote_email(job: dict):
+    """Outbox handler: render the quote, send it, then mark the quote as sent"""
+    payload = job['payload']
+    quote = await db.quotes.find_one({"id": payload['quote_id'], "user_id": job['user_id']}, {"_id": 0})
     if not quote:
-        raise HTTPException(status_code=404, detail="Devis non trouvé")
-    
-    company = await db.company_settings.find_one({"user_id": user['id']}, {"_id": 0})
-    if not company:
-        company = CompanySettings(user_id=user['id']).model_dump()
-    
-    # Generate PDF
-    pdf_bytes = generate_quote_pdf(quote, company)
+        raise PermanentError("Devis non trouvé")
+    company = await get_company_doc(job['user_id'])
     
-    # Generate tracking URL
-    tracking_url = f"https://biz-estimator-2.preview.emergentagent.com/api/track/{quote_id}/open.png"
+    # Compact PDF (downsampled logo) for the attachment, served from the PDF cache when already rendered
+    pdf_bytes, _ = await render_pdf("quote", quote, company, wait=True, compact=True)
     
-    # Get custom message if provided
-    custom_message = request.message if request else None
+    result = await send_quote_email(quote, company, pdf_bytes, payload['tracking_url'], payload.get('message'))
+    if not result["success"]:
+        error_msg = result.get("error", "Erreur lors de l'envoi de l'email")
+        raise RuntimeError(error_msg) if result.get("retry") else PermanentError(error_msg)
     
-    # Send email with tracking and custom message
-    result = await send_quote_email(quote, company, pdf_bytes, tracking_url, custom_message)
+    before = await db.quotes.find_one_and_update(
+        {"id": quote['id']},
+        {
+            "$set": {"status": "envoyé", "sent_at": datetime.now(timezone.utc).isoformat()},
+            "$inc": {"send_count": 1}
+        },
+        projection={"_id": 0, "status": 1}
+    )
+    if before:
+        await user_stats.quote_status(job['user_id'], before.get('status'), "envoyé")
+
+outbox.register("quote_email", deliver_quote_email)
+
+@api_router.post("/quotes/{quote_id}/send", status_code=202)
+async def send_quote(quote_id: str, request: SendEmailRequest = None, user: dict = Depends(get_current_user)):
+    quote = await db.quotes.find_one({"id": quote_id, "user_id": user['id']}, {"_id": 0, "id": 1})
+    if not quote:
+        raise HTTPException(status_code=404, detail="Devis non trouvé")
+    if not SMTP_EMAIL or not SMTP_PASSWORD:
+        raise HTTPException(status_code=400, detail="Configuration SMTP manquante")
     
-    if result["success"]:
-        await db.quotes.update_one(
-            {"id": quote_id},
-            {
-                "$set": {"status": "envoyé", "sent_at": datetime.now(timezone.utc).isoformat()},
-                "$inc": {"send_count": 1}
-            }
-        )
-        return {"message": "Devis envoyé avec succès", "status": "success"}
-    else:
-        error_msg = result.get("error", "Erreur lors de l'envoi de l'email")
-        raise HTTPException(status_code=400, detail=error_msg)
+    # Rendering and SMTP delivery happen in the outbox worker; the quote is
+    # marked as sent only once the email has actually been delivered
+    job = await outbox.enqueue("quote_email", user['id'], {
+        "quote_id": quote_id,
+        "tracking_url": f"https://biz-estimator-2.preview.emergentagent.com/api/track/{quote_id}/open.png",
+        "message": request.message if request else None,
+    })
+    return {"message": "Envoi du devis programmé", "job_id": job['id'], "status": job['status']}
+
+@api_router.get("/outbox/{job_id}")
+async def get_outbox_job(job_id: str, user: dict = Depends(get_current_user)):
+    """Delivery status of a queued email: pending, sending, sent or failed"""
+    job = await db.outbox.find_one({"id": job_id, "user_id": user['id']}, {"_id": 0, "user_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Envoi non trouvé")
+    return job
 
 @api_router.get("/quotes/{quote_id}/email-preview")
 async def get_email_preview(quote_id: str, user: dict = Depends(get_current_user)):
@@ -1145,41 +1107,99 @@ TRACKING_PIXEL = bytes([
     0x45, 0x4E, 0x44, 0xAE, 0x42, 0x60, 0x82
 ])
 
+# Built once: the route hands out the same response without touching the database
+TRACKING_RESPONSE = Response(
+    content=TRACKING_PIXEL,
+    media_type="image/png",
+    headers={
+        "Cache-Control": "no-cache, no-store, must-revalidate",
+        "Pragma": "no-cache",
+        "Expires": "0"
+    }
+)
+
 @api_router.get("/track/{quote_id}/open.png")
-async def track_email_open(quote_id: str):
-    """Track when a quote email is opened"""
-    # Update the quote with open tracking
-    result = await db.quotes.update_one(
-        {"id": quote_id},
-        {
-            "$set": {"opened_at": datetime.now(timezone.utc).isoformat()},
-            "$inc": {"open_count": 1}
-        }
+async def track_email_open(quote_id: str, user_agent: Optional[str] = Header(None)):
+    """Track when a quote email is opened (buffered, written in batches)"""
+    open_tracker.record(quote_id, user_agent)
+    return TRACKING_RESPONSE
+
+# Hourly buckets returned by the opens endpoint
+OPENS_HOURLY_WINDOW_HOURS = int(os.environ.get('OPENS_HOURLY_WINDOW_HOURS', 48))
+OPENS_DAILY_WINDOW_DAYS = int(os.environ.get('OPENS_DAILY_WINDOW_DAYS', 365))
+
+def rollup_bucket(doc: dict) -> dict:
+    # Dates come back naive from MongoDB; they are stored in UTC
+    def iso(value: datetime) -> str:
+        return value.replace(tzinfo=timezone.utc).isoformat()
+    return {
+        "bucket": iso(doc["bucket"]),
+        "count": doc["count"],
+        "by_user_agent": doc.get("by_user_agent", {}),
+        "first_at": iso(doc["first_at"]),
+        "last_at": iso(doc["last_at"]),
+    }
+
+@api_router.get("/quotes/{quote_id}/opens")
+async def get_quote_opens(quote_id: str, user: dict = Depends(get_current_user)):
+    """Open history of a quote, read from the hourly/daily rollups (bounded
+    number of documents whatever the number of opens)"""
+    quote = await db.quotes.find_one(
+        {"id": quote_id, "user_id": user['id']}, {"_id": 0, "id": 1, "open_count": 1, "opened_at": 1}
     )
-    
-    if result.modified_count > 0:
-        logger.info(f"Email opened for quote {quote_id}")
-    
-    # Return a 1x1 transparent pixel
-    return Response(
-        content=TRACKING_PIXEL,
-        media_type="image/png",
-        headers={
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0"
-        }
+    if not quote:
+        raise HTTPException(status_code=404, detail="Devis non trouvé")
+
+    now = datetime.now(timezone.utc)
+    hourly, daily = await asyncio.gather(
+        db.quote_open_rollups.find(
+            {"quote_id": quote_id, "granularity": HOUR, "bucket": {"$gte": now - timedelta(hours=OPENS_HOURLY_WINDOW_HOURS)}},
+            {"_id": 0}
+        ).sort("bucket", 1).to_list(OPENS_HOURLY_WINDOW_HOURS + 1),
+        db.quote_open_rollups.find(
+            {"quote_id": quote_id, "granularity": DAY, "bucket": {"$gte": now - timedelta(days=OPENS_DAILY_WINDOW_DAYS)}},
+            {"_id": 0}
+        ).sort("bucket", 1).to_list(OPENS_DAILY_WINDOW_DAYS + 1),
     )
 
+    daily = [rollup_bucket(doc) for doc in daily]
+    by_user_agent: Dict[str, int] = {}
+    for doc in daily:
+        for ua, count in doc.get("by_user_agent", {}).items():
+            by_user_agent[ua] = by_user_agent.get(ua, 0) + count
+    return {
+        "quote_id": quote_id,
+        "open_count": quote.get("open_count", 0),
+        "first_opened_at": daily[0]["first_at"] if daily else None,
+        "last_opened_at": quote.get("opened_at"),
+        "by_user_agent": by_user_agent,
+        "hourly": [rollup_bucket(doc) for doc in hourly],
+        "daily": daily,
+    }
+
 # ============ INVOICES ROUTES ============
 
-async def get_next_invoice_number(user_id: str) -> str:
-    year = datetime.now().year
-    count = await db.invoices.count_documents({"user_id": user_id})
-    return f"F-{year}-{count + 1:03d}"
+async def get_next_invoice_number(user_id: str, session=None) -> str:
+    return await counters.next_value(user_id, INVOICE, session=session)
+
+async def insert_invoice(invoice_doc: dict):
+    """Number and insert an invoice; in one transaction when MongoDB supports
+    it, so an insert that fails does not burn a number (no gaps)"""
+    if not counters.transactions:
+        invoice_doc['invoice_number'] = await get_next_invoice_number(invoice_doc['user_id'])
+        await db.invoices.insert_one(invoice_doc)
+        return
+
+    async def numbered_insert(session):
+        invoice_doc.pop('_id', None)
+        invoice_doc['invoice_number'] = await get_next_invoice_number(invoice_doc['user_id'], session=session)
+        await db.invoices.insert_one(invoice_doc, session=session)
+
+    async with await client.start_session() as session:
+        await session.with_transaction(numbered_insert)
 
 @api_router.post("/quotes/{quote_id}/convert-to-invoice", response_model=InvoiceResponse)
-async def convert_quote_to_invoice(quote_id: str, user: dict = Depends(get_current_user)):
+async def convert_quote_to_invoice(quote_id: str, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
     quote = await db.quotes.find_one({"id": quote_id, "user_id": user['id']}, {"_id": 0})
     if not quote:
         raise HTTPException(status_code=404, detail="Devis non trouvé")
@@ -1192,7 +1212,7 @@ async def convert_quote_to_invoice(quote_id: str, user: dict = Depends(get_curre
     invoice_doc = {
         "id": str(uuid.uuid4()),
         "user_id": user['id'],
-        "invoice_number": await get_next_invoice_number(user['id']),
+        "invoice_number": None,
         "quote_id": quote_id,
         "client_id": quote['client_id'],
         "client_name": quote['client_name'],
@@ -1214,15 +1234,44 @@ async def convert_quote_to_invoice(quote_id: str, user: dict = Depends(get_curre
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.invoices.insert_one(invoice_doc)
-    await db.quotes.update_one({"id": quote_id}, {"$set": {"status": "accepté"}})
+    try:
+        await insert_invoice(invoice_doc)
+    except DuplicateKeyError:
+        # Converted concurrently (unique index on invoices.quote_id)
+        raise HTTPException(status_code=400, detail="Ce devis a déjà été converti en facture")
+    await user_stats.invoice_status(user['id'], None, invoice_doc['status'], invoice_doc['total_ttc'])
+    before = await db.quotes.find_one_and_update({"id": quote_id}, {"$set": {"status": "accepté"}}, projection={"_id": 0, "status": 1})
+    if before:
+        await user_stats.quote_status(user['id'], before.get('status'), "accepté")
+    background_tasks.add_task(schedule_pdf_prerender, "invoice", invoice_doc['id'], user['id'])
     
     return InvoiceResponse(**{k: v for k, v in invoice_doc.items() if k != '_id'})
 
-@api_router.get("/invoices", response_model=List[InvoiceResponse])
-async def get_invoices(user: dict = Depends(get_current_user)):
-    invoices = await db.invoices.find({"user_id": user['id']}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return [InvoiceResponse(**i) for i in invoices]
+@api_router.get("/invoices", response_model=None, responses=list_responses(InvoiceResponse, InvoiceSummary))
+async def get_invoices(
+    response: Response,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    status: Optional[str] = None,
+    client_id: Optional[str] = None,
+    all_items: bool = Query(False, alias="all"),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
+    user: dict = Depends(get_current_user),
+):
+    query = {"user_id": user['id']}
+    if status:
+        query["status"] = status
+    if client_id:
+        query["client_id"] = client_id
+    projection, model = list_projection(InvoiceResponse, InvoiceSummary, view, fields)
+    invoices = await paginate(db.invoices, query, response, limit, after, all_items, projection)
+    return list_response(invoices, model, response)
+
+@api_router.get("/invoices/export.zip")
+async def export_invoices_zip(date_from: Optional[str] = Query(None, alias="from"), date_to: Optional[str] = Query(None, alias="to"), status: Optional[str] = None, user: dict = Depends(get_current_user)):
+    """ZIP of all invoice PDFs emitted in a date range"""
+    return await export_pdf_zip("invoice", user, date_from, date_to, status)
 
 @api_router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
 async def get_invoice(invoice_id: str, user: dict = Depends(get_current_user)):
@@ -1232,7 +1281,7 @@ async def get_invoice(invoice_id: str, user: dict = Depends(get_current_user)):
     return InvoiceResponse(**invoice)
 
 @api_router.get("/invoices/{invoice_id}/pdf")
-async def get_invoice_pdf(invoice_id: str, user: dict = Depends(get_current_user)):
+async def get_invoice_pdf(invoice_id: str, if_none_match: Optional[str] = Header(None), user: dict = Depends(get_current_user)):
     """Generate PDF for invoice with acompte details"""
     invoice = await db.invoices.find_one({"id": invoice_id, "user_id": user['id']}, {"_id": 0})
     if not invoice:
@@ -1242,15 +1291,11 @@ async def get_invoice_pdf(invoice_id: str, user: dict = Depends(get_current_user
     if not company:
         company = CompanySettings(user_id=user['id']).model_dump()
     
-    pdf_bytes = generate_invoice_pdf(invoice, company)
-    
     filename = f"Facture-{invoice['client_name']}-{invoice['invoice_number']}.pdf"
-    
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+    return await pdf_response("invoice", invoice, company, filename, if_none_match)
+
+# Previous status of an invoice write, for the dashboard counters
+INVOICE_STATUS_FIELDS = {"_id": 0, "status": 1, "total_ttc": 1}
 
 @api_router.put("/invoices/{invoice_id}/status")
 async def update_invoice_status(invoice_id: str, status: str, user: dict = Depends(get_current_user)):
@@ -1258,16 +1303,18 @@ async def update_invoice_status(invoice_id: str, status: str, user: dict = Depen
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Statut invalide. Valeurs acceptées: {valid_statuses}")
     
-    result = await db.invoices.update_one(
+    before = await db.invoices.find_one_and_update(
         {"id": invoice_id, "user_id": user['id']},
-        {"$set": {"status": status}}
+        {"$set": {"status": status}},
+        projection=INVOICE_STATUS_FIELDS
     )
-    if result.matched_count == 0:
+    if before is None:
         raise HTTPException(status_code=404, detail="Facture non trouvée")
+    await user_stats.invoice_status(user['id'], before.get('status'), status, before.get('total_ttc'))
     return {"message": "Statut mis à jour"}
 
 @api_router.post("/invoices/{invoice_id}/payment")
-async def add_payment_to_invoice(invoice_id: str, payment: PaymentCreate, user: dict = Depends(get_current_user)):
+async def add_payment_to_invoice(invoice_id: str, payment: PaymentCreate, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
     """Ajouter un acompte/paiement à une facture"""
     invoice = await db.invoices.find_one({"id": invoice_id, "user_id": user['id']}, {"_id": 0})
     if not invoice:
@@ -1301,21 +1348,26 @@ async def add_payment_to_invoice(invoice_id: str, payment: PaymentCreate, user:
         new_status = invoice.get('status', 'en attente')
     
     # Update invoice
-    await db.invoices.update_one(
+    before = await db.invoices.find_one_and_update(
         {"id": invoice_id},
         {"$set": {
             "payments": payments,
             "acompte": total_paid,
             "reste_a_payer": reste_a_payer,
             "status": new_status
-        }}
+        }},
+        projection=INVOICE_STATUS_FIELDS
     )
+    if before:
+        await user_stats.invoice_status(user['id'], before.get('status'), new_status, before.get('total_ttc'))
+    
+    background_tasks.add_task(schedule_pdf_prerender, "invoice", invoice_id, user['id'])
     
     updated = await db.invoices.find_one({"id": invoice_id}, {"_id": 0})
     return InvoiceResponse(**updated)
 
 @api_router.delete("/invoices/{invoice_id}/payment/{payment_id}")
-async def delete_payment(invoice_id: str, payment_id: str, user: dict = Depends(get_current_user)):
+async def delete_payment(invoice_id: str, payment_id: str, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
     """Supprimer un paiement d'une facture"""
     invoice = await db.invoices.find_one({"id": invoice_id, "user_id": user['id']}, {"_id": 0})
     if not invoice:
@@ -1334,55 +1386,272 @@ async def delete_payment(invoice_id: str, payment_id: str, user: dict = Depends(
     else:
         new_status = "en attente"
     
-    await db.invoices.update_one(
+    before = await db.invoices.find_one_and_update(
         {"id": invoice_id},
         {"$set": {
             "payments": payments,
             "acompte": total_paid,
             "reste_a_payer": reste_a_payer,
             "status": new_status
-        }}
+        }},
+        projection=INVOICE_STATUS_FIELDS
     )
+    if before:
+        await user_stats.invoice_status(user['id'], before.get('status'), new_status, before.get('total_ttc'))
+    background_tasks.add_task(schedule_pdf_prerender, "invoice", invoice_id, user['id'])
     
     return {"message": "Paiement supprimé"}
 
+# ============ PAYMENT REMINDERS (RELANCES) ============
+
+def overdue_invoices_query(user_id: str, today: str) -> dict:
+    """Unpaid invoices past their due date; matches the partial `overdue_invoices` index"""
+    return {
+        "user_id": user_id,
+        "due_date": {"$lt": today},
+        "reste_a_payer": {"$gt": 0},
+        "status": {"$nin": ["payée", "annulée"]},
+    }
+
+def build_reminder_email(client_invoices: List[dict], company: dict, pdfs: List[bytes]) -> str:
+    first = client_invoices[0]
+    total_due = sum(inv['reste_a_payer'] for inv in client_invoices)
+    rows = "".join(
+        f"<li>Facture <strong>{inv['invoice_number']}</strong> échue le {inv['due_date']} : "
+        f"<strong>{inv['reste_a_payer']:,.2f} €</strong> restant à régler</li>"
+        for inv in client_invoices
+    )
+    msg = MIMEMultipart()
+    msg['From'] = SMTP_EMAIL
+    msg['To'] = first['client_email']
+    numbers = ", ".join(inv['invoice_number'] for inv in client_invoices)
+    msg['Subject'] = f"Relance - Facture(s) {numbers} - {company.get('name', 'CREATIVINDUSTRY')}"
+    html_body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <h2 style="color: #d97706;">Bonjour {first['client_name']},</h2>
+        <p>Sauf erreur de notre part, le règlement des factures suivantes ne nous est pas encore parvenu :</p>
+        <ul>{rows}</ul>
+        <p>Montant total restant dû : <strong>{total_due:,.2f} € TTC</strong>.</p>
+        <p>Vous trouverez les factures en pièce jointe. Si votre paiement est déjà en cours, merci de ne pas tenir compte de ce message.</p>
+        <br>
+        <p>Cordialement,</p>
+        <p><strong>{company.get('name', 'CREATIVINDUSTRY')}</strong><br>
+        {company.get('phone', '')}<br>
+        {company.get('email', '')}</p>
+    </body>
+    </html>
+    """
+    msg.attach(MIMEText(html_body, 'html'))
+    for inv, pdf_bytes in zip(client_invoices, pdfs):
+        attachment = MIMEApplication(pdf_bytes, _subtype='pdf')
+        attachment.add_header('Content-Disposition', 'attachment', filename=f"Facture-{inv['invoice_number']}.pdf")
+        msg.attach(attachment)
+    return msg.as_string()
+
+CAMPAIGN_RUNNING = "en cours"
+
+# user_id -> running campaign task, one campaign per user at a time (None:
+# slot claimed, campaign being recorded)
+reminder_campaigns_running: Dict[str, Optional[asyncio.Task]] = {}
+
+async def run_reminder_campaign(user_id: str, campaign_id: str):
+    """Remind every client with overdue invoices (one email per client, invoices attached).
+
+    Clients reminded less than REMINDER_COOLDOWN_DAYS ago are skipped. PDFs are
+    rendered in parallel through the render pool, emails go out over the pooled
+    SMTP sessions, and the reminded invoices are updated with one bulk write.
+    """
+    now = datetime.now(timezone.utc)
+    company = await get_company_doc(user_id)
+    cooldown_start = (now - timedelta(days=REMINDER_COOLDOWN_DAYS)).isoformat()
+    
+    by_client: Dict[str, List[dict]] = {}
+    async for inv in db.invoices.find(overdue_invoices_query(user_id, now.strftime("%Y-%m-%d")), {"_id": 0}):
+        by_client.setdefault(inv['client_id'], []).append(inv)
+    
+    due = {}
+    skipped = 0
+    for client_id, client_invoices in by_client.items():
+        last = max((inv.get('last_reminder_at') or "" for inv in client_invoices), default="")
+        if last > cooldown_start:
+            skipped += 1
+        else:
+            due[client_id] = sorted(client_invoices, key=lambda inv: inv['due_date'])
+    
+    slots = asyncio.Semaphore(REMINDER_CONCURRENCY)
+    reminded: List[str] = []
+    failures: List[dict] = []
+    
+    async def remind(client_invoices: List[dict]):
+        async with slots:
+            try:
+                pdfs = await asyncio.gather(*[
+                    render_pdf("invoice", inv, company, wait=True, compact=True) for inv in client_invoices
+                ])
+                message = build_reminder_email(client_invoices, company, [pdf for pdf, _ in pdfs])
+                await asyncio.to_thread(smtp_send, client_invoices[0]['client_email'], message)
+            except Exception as e:
+                logger.error(f"Reminder to {client_invoices[0]['client_email']} failed: {e}")
+                failures.append({"client_email": client_invoices[0]['client_email'], "error": str(e)})
+                return
+            reminded.extend(inv['id'] for inv in client_invoices)
+    
+    await asyncio.gather(*[remind(client_invoices) for client_invoices in due.values()])
+    
+    sent_at = datetime.now(timezone.utc).isoformat()
+    if reminded:
+        await db.invoices.bulk_write([
+            UpdateOne({"id": invoice_id}, {"$set": {"last_reminder_at": sent_at}, "$inc": {"reminder_count": 1}})
+            for invoice_id in reminded
+        ], ordered=False)
+    
+    result = {
+        "status": "terminée",
+        "clients_reminded": len(due) - len(failures),
+        "clients_skipped": skipped,
+        "invoices_reminded": len(reminded),
+        "failures": failures,
+        "finished_at": sent_at,
+        "duration_seconds": round((datetime.now(timezone.utc) - now).total_seconds(), 1),
+    }
+    await db.reminder_campaigns.update_one({"id": campaign_id}, {"$set": result})
+    logger.info(f"Reminder campaign {campaign_id}: {result['clients_reminded']} client(s), "
+                f"{len(reminded)} invoice(s), {skipped} in cooldown, {len(failures)} failure(s)")
+    return result
+
+async def start_reminder_campaign(user_id: str, trigger: str) -> Optional[dict]:
+    """Start a campaign in the background; None when one is already running
+    for the user. The in-process slot is claimed before the first await, so
+    two requests arriving together cannot both pass the check; across API
+    processes the unique index on running campaigns per user does the same."""
+    if user_id in reminder_campaigns_running:
+        return None
+    reminder_campaigns_running[user_id] = None
+    now = datetime.now(timezone.utc)
+    campaign = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "trigger": trigger,
+        "status": CAMPAIGN_RUNNING,
+        "started_at": now.isoformat(),
+    }
+    try:
+        # A campaign left running by a crashed process must not block the user forever
+        await db.reminder_campaigns.update_many(
+            {"user_id": user_id, "status": CAMPAIGN_RUNNING,
+             "started_at": {"$lt": (now - timedelta(seconds=REMINDER_CAMPAIGN_TIMEOUT_SECONDS)).isoformat()}},
+            {"$set": {"status": "interrompue"}}
+        )
+        await db.reminder_campaigns.insert_one(campaign)
+    except DuplicateKeyError:
+        reminder_campaigns_running.pop(user_id, None)
+        return None
+    except BaseException:
+        reminder_campaigns_running.pop(user_id, None)
+        raise
+    campaign.pop('_id', None)
+    
+    async def run():
+        try:
+            await run_reminder_campaign(user_id, campaign['id'])
+        except Exception as e:
+            logger.error(f"Reminder campaign {campaign['id']} failed: {e}")
+            await db.reminder_campaigns.update_one({"id": campaign['id']}, {"$set": {"status": "échouée", "error": str(e)}})
+        finally:
+            reminder_campaigns_running.pop(user_id, None)
+    
+    reminder_campaigns_running[user_id] = asyncio.create_task(run())
+    return campaign
+
+@api_router.post("/invoices/reminders", status_code=202)
+async def send_payment_reminders(user: dict = Depends(get_current_user)):
+    """Start a reminder campaign for the user's overdue invoices in the background"""
+    if not SMTP_EMAIL or not SMTP_PASSWORD:
+        raise HTTPException(status_code=400, detail="Configuration SMTP manquante")
+    campaign = await start_reminder_campaign(user['id'], "manual")
+    if campaign is None:
+        raise HTTPException(status_code=409, detail="Une campagne de relance est déjà en cours")
+    return {"message": "Relances en cours d'envoi", "campaign_id": campaign['id'], "status": campaign['status']}
+
+@api_router.get("/invoices/reminders/{campaign_id}")
+async def get_reminder_campaign(campaign_id: str, user: dict = Depends(get_current_user)):
+    campaign = await db.reminder_campaigns.find_one({"id": campaign_id, "user_id": user['id']}, {"_id": 0, "user_id": 0})
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campagne non trouvée")
+    return campaign
+
+# Identifies this process as the holder of the scheduler lease
+SCHEDULER_INSTANCE = uuid.uuid4().hex
+
+def reminder_lease_until() -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=REMINDER_SCHEDULE_SECONDS / 2)).isoformat()
+
+async def renew_reminder_lease() -> bool:
+    """Extend the scheduler lease; False when another process has taken it"""
+    result = await db.scheduler_locks.update_one(
+        {"_id": "reminders", "owner": SCHEDULER_INSTANCE}, {"$set": {"until": reminder_lease_until()}}
+    )
+    return result.matched_count == 1
+
+async def reminder_scheduler():
+    """Run a campaign for every user with overdue invoices every REMINDER_SCHEDULE_SECONDS"""
+    while True:
+        await asyncio.sleep(REMINDER_SCHEDULE_SECONDS)
+        if not SMTP_EMAIL or not SMTP_PASSWORD:
+            # Every email would fail: no campaign full of failures
+            logger.warning("Scheduled reminders skipped: SMTP not configured")
+            continue
+        now = datetime.now(timezone.utc)
+        # Lease in Mongo so only one API process runs the scheduled campaigns
+        try:
+            await db.scheduler_locks.find_one_and_update(
+                {"_id": "reminders", "until": {"$lt": now.isoformat()}},
+                {"$set": {"until": reminder_lease_until(), "owner": SCHEDULER_INSTANCE}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            continue
+        try:
+            user_ids = await db.invoices.distinct("user_id", {
+                "due_date": {"$lt": now.strftime("%Y-%m-%d")}, "reste_a_payer": {"$gt": 0},
+            })
+            # The lease is held until the whole list is done: renewed before
+            # each user and while its campaign runs
+            for user_id in user_ids:
+                if not await renew_reminder_lease():
+                    logger.warning("Reminder scheduler lease taken over by another process; stopping this pass")
+                    break
+                if await start_reminder_campaign(user_id, "scheduled") is None:
+                    continue
+                task = reminder_campaigns_running.get(user_id)
+                while task is not None and not task.done():
+                    await asyncio.wait({task}, timeout=REMINDER_SCHEDULE_SECONDS / 6)
+                    if not task.done():
+                        await renew_reminder_lease()
+        except Exception as e:
+            logger.error(f"Scheduled reminders failed: {e}")
+
+# ============ SEARCH ============
+
+SEARCH_LIMIT_DEFAULT = 10
+SEARCH_LIMIT_MAX = 50
+
+@api_router.get("/search", response_model=List[SearchHit])
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(SEARCH_LIMIT_DEFAULT, ge=1, le=SEARCH_LIMIT_MAX),
+    user: dict = Depends(get_current_user),
+):
+    """Clients (name/email prefix), quotes and invoices (number, line items), best hits first"""
+    return [SearchHit(**hit) for hit in await search(db, user['id'], q, limit)]
+
 # ============ DASHBOARD STATS ============
 
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats(user: dict = Depends(get_current_user)):
-    total_quotes = await db.quotes.count_documents({"user_id": user['id']})
-    quotes_sent = await db.quotes.count_documents({"user_id": user['id'], "status": "envoyé"})
-    quotes_accepted = await db.quotes.count_documents({"user_id": user['id'], "status": "accepté"})
-    quotes_refused = await db.quotes.count_documents({"user_id": user['id'], "status": "refusé"})
-    quotes_draft = await db.quotes.count_documents({"user_id": user['id'], "status": "brouillon"})
-    
-    total_invoices = await db.invoices.count_documents({"user_id": user['id']})
-    
-    # Calculate total revenue from paid invoices
-    paid_invoices = await db.invoices.find(
-        {"user_id": user['id'], "status": "payée"},
-        {"_id": 0, "total_ttc": 1}
-    ).to_list(1000)
-    total_revenue = sum(inv.get('total_ttc', 0) for inv in paid_invoices)
-    
-    # Conversion rate
-    conversion_rate = (quotes_accepted / total_quotes * 100) if total_quotes > 0 else 0
-    
-    total_clients = await db.clients.count_documents({"user_id": user['id']})
-    total_services = await db.services.count_documents({"user_id": user['id']})
-    
-    return DashboardStats(
-        total_quotes=total_quotes,
-        quotes_sent=quotes_sent,
-        quotes_accepted=quotes_accepted,
-        quotes_refused=quotes_refused,
-        quotes_draft=quotes_draft,
-        total_invoices=total_invoices,
-        total_revenue=total_revenue,
-        conversion_rate=round(conversion_rate, 1),
-        total_clients=total_clients,
-        total_services=total_services
-    )
+    """One read of the counters kept up to date by the routes (see user_stats.py)"""
+    return DashboardStats(**stats_summary(await user_stats.get(user['id'])))
 
 # ============ HEALTH CHECK ============
 
@@ -1390,6 +1659,20 @@ async def get_dashboard_stats(user: dict = Depends(get_current_user)):
 async def health_check():
     return {"status": "healthy", "service": "devispro-api"}
 
+# /metrics exposes process internals: operators only, with this token in
+# the X-Metrics-Token header (the endpoint is disabled when it is unset)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    if not METRICS_TOKEN or not x_metrics_token or not hmac.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Accès refusé")
+
+@api_router.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """Internal counters used to size the worker pools"""
+    return {"pdf_render": render_pool.stats(), "pdf_cache": pdf_cache.stats(), "outbox": outbox.stats(), "smtp": smtp_pool.stats(),
+            "tracking": open_tracker.stats(), "auth": auth_cache.stats()}
+
 # Include router
 app.include_router(api_router)
 
@@ -1399,8 +1682,58 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+@app.on_event("startup")
+async def start_pdf_services():
+    logo_cache.load_from_disk()
+    pdf_cache.load_index()
+    render_pool.start()
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def index_clients_for_search():
+    await backfill_client_terms(db)
+
+@app.on_event("startup")
+async def start_user_stats():
+    await user_stats.start(db)
+
+@app.on_event("startup")
+async def start_counters():
+    await counters.start(db)
+
+@app.on_event("startup")
+async def start_outbox():
+    await outbox.start(db.outbox)
+
+@app.on_event("startup")
+async def start_open_tracking():
+    await open_tracker.start(db)
+
+@app.on_event("startup")
+async def start_reminders():
+    if REMINDER_SCHEDULE_SECONDS > 0:
+        app.state.reminder_scheduler = asyncio.create_task(reminder_scheduler())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await outbox.stop()
+    await open_tracker.stop()
+    scheduler = getattr(app.state, "reminder_scheduler", None)
+    if scheduler is not None:
+        scheduler.cancel()
+    for task in list(reminder_campaigns_running.values()):
+        if task is not None:
+            task.cancel()
+    smtp_pool.close()
     client.close()
+    for task in list(pdf_prerender_tasks.values()):
+        task.cancel()
+    logo_cache.close()
+    render_pool.shutdown()
+    password_pool.shutdown(wait=False)
@@ -0,0 +1,180 @@
+"""Pool of authenticated SMTP sessions shared by every outgoing email.
+
+Opening an SMTP_SSL connection costs a TCP + TLS handshake, EHLO and AUTH
+before the first byte of the message. The pool keeps a few logged-in
+sessions open and hands them out to senders: a session idle for a while is
+checked with NOOP before reuse, sessions the server dropped are replaced
+transparently, and each session is recycled after a number of messages to
+stay under provider limits. Sending is blocking (smtplib), callers run it
+in a thread.
+"""
+import logging
+import os
+import smtplib
+import socket
+import ssl
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 2))
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', 30))
+# Idle sessions older than this are closed instead of reused (servers drop them anyway)
+SMTP_IDLE_SECONDS = float(os.environ.get('SMTP_IDLE_SECONDS', 60))
+# Sessions idle for longer than this are checked with NOOP before reuse
+SMTP_NOOP_AFTER_SECONDS = float(os.environ.get('SMTP_NOOP_AFTER_SECONDS', 5))
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.environ.get('SMTP_MAX_MESSAGES_PER_SESSION', 100))
+
+# Errors meaning the session is unusable, not that the message was rejected
+_SESSION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, ssl.SSLError)
+
+
+class _Session:
+    __slots__ = ('smtp', 'last_used', 'messages')
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.messages = 0
+
+
+class SmtpPool:
+    def __init__(self, host: str, port: int, username: str, password: str, size: int = SMTP_POOL_SIZE,
+                 context: Optional[ssl.SSLContext] = None, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        # Built once: create_default_context loads the system CA store every call
+        self.context = context or ssl.create_default_context()
+        self._idle: List[_Session] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+        self._connects = 0
+        self._reuses = 0
+        self._noops = 0
+        self._reconnects = 0
+        self._sent = 0
+
+    # ----- sessions -----
+
+    def _connect(self) -> _Session:
+        smtp = smtplib.SMTP_SSL(self.host, self.port, context=self.context, timeout=self.timeout)
+        # smtplib writes each command separately and waits for the reply: with
+        # Nagle on, the end of DATA waits for the server's delayed ACK (~40 ms)
+        smtp.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            smtp.login(self.username, self.password)
+        except Exception:
+            _close(smtp)
+            raise
+        self._connects += 1
+        return _Session(smtp)
+
+    def _checkout(self) -> Tuple[_Session, bool]:
+        """(session, reused): an idle session still alive (NOOP-checked if idle
+        for a while), or a new one"""
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                return self._connect(), False
+            idle_for = time.monotonic() - session.last_used
+            if idle_for > SMTP_IDLE_SECONDS:
+                _close(session.smtp)
+                continue
+            if idle_for > SMTP_NOOP_AFTER_SECONDS:
+                self._noops += 1
+                try:
+                    code, _ = session.smtp.noop()
+                except (smtplib.SMTPException, OSError):
+                    code = None
+                if code != 250:
+                    _close(session.smtp)
+                    continue
+            self._reuses += 1
+            return session, True
+
+    def _checkin(self, session: _Session):
+        session.last_used = time.monotonic()
+        if self._closed or session.messages >= SMTP_MAX_MESSAGES_PER_SESSION:
+            _close(session.smtp)
+            return
+        with self._lock:
+            self._idle.append(session)
+
+    # ----- public API -----
+
+    def send(self, sender: str, recipient: str, message: str):
+        """Send one message over a pooled session (blocking).
+
+        A session that turns out to be dead is replaced and the message is sent
+        again on a fresh one; SMTP errors about the message itself (refused
+        recipient, rejected data) are raised as-is and the session is kept.
+        """
+        with self._slots:
+            session, reused = self._checkout()
+            try:
+                session.smtp.sendmail(sender, recipient, message)
+            except _SESSION_ERRORS as e:
+                _close(session.smtp)
+                if not reused:
+                    raise
+                # Stale session (server timeout, provider restart): one retry on a new connection
+                self._reconnects += 1
+                logger.info(f"SMTP session dropped ({e.__class__.__name__}), reconnecting")
+                session = self._connect()
+                try:
+                    session.smtp.sendmail(sender, recipient, message)
+                except _SESSION_ERRORS:
+                    _close(session.smtp)
+                    raise
+                except smtplib.SMTPException:
+                    self._checkin(session)
+                    raise
+            except smtplib.SMTPResponseException as e:
+                # 421: the server is closing the session; otherwise sendmail already sent RSET
+                if e.smtp_code == 421:
+                    _close(session.smtp)
+                else:
+                    self._checkin(session)
+                raise
+            except smtplib.SMTPException:
+                self._checkin(session)
+                raise
+            session.messages += 1
+            self._sent += 1
+            self._checkin(session)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            sessions, self._idle = self._idle, []
+        for session in sessions:
+            _close(session.smtp)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "connects": self._connects,
+            "reuses": self._reuses,
+            "noop_checks": self._noops,
+            "reconnects": self._reconnects,
+            "sent": self._sent,
+        }
+
+
+def _close(smtp: smtplib.SMTP):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        try:
+            smtp.close()
+        except OSError:
+            pass
@@ -0,0 +1,231 @@
+"""Per-user dashboard counters, maintained incrementally.
+
+One `user_stats` document per user holds the number of quotes and invoices
+by status, the revenue (total_ttc of the paid invoices) and the number of
+clients and services. Every route that creates, deletes or changes the
+status of one of them applies the difference with a single $inc, so
+GET /dashboard/stats is one indexed read whatever the size of the account.
+
+The routes take the previous status from the same atomic write that
+changes it (find_one_and_update returning the document before the update),
+so concurrent updates of one document still add up. A crash between that
+write and the $inc leaves the counters off; `repair()` recounts everything
+from the collections, reports the drift and corrects it. It runs once at
+startup to seed the counters, and from the command line:
+
+    MONGO_URL=... DB_NAME=... python user_stats.py [--dry-run]
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+PAID = "payée"
+MIGRATION_ID = "user_stats_seeded_v1"
+# Float sums of total_ttc: differences below a cent are rounding, not drift
+REVENUE_TOLERANCE = 0.005
+
+
+def _status_key(status: Optional[str]) -> str:
+    """Status as a field name ('.' and a leading '$' are not allowed in one)"""
+    return (status or "inconnu").replace(".", "_").lstrip("$") or "inconnu"
+
+
+def transition(old: Optional[str], new: Optional[str]) -> Dict[str, int]:
+    """Per-status deltas of a status change (None: document added/removed)"""
+    if old == new:
+        return {}
+    deltas = {}
+    if old is not None:
+        deltas[_status_key(old)] = -1
+    if new is not None:
+        deltas[_status_key(new)] = deltas.get(_status_key(new), 0) + 1
+    return {k: v for k, v in deltas.items() if v}
+
+
+def revenue_delta(old: Optional[str], new: Optional[str], total_ttc: float) -> float:
+    return (total_ttc if new == PAID else 0.0) - (total_ttc if old == PAID else 0.0)
+
+
+def summary(stats: Optional[dict]) -> dict:
+    """DashboardStats fields of a stats document (None: empty account)"""
+    stats = stats or {}
+    quotes, invoices = stats.get("quotes", {}), stats.get("invoices", {})
+    total_quotes = sum(quotes.values())
+    accepted = quotes.get(_status_key("accepté"), 0)
+    return {
+        "total_quotes": total_quotes,
+        "quotes_sent": quotes.get(_status_key("envoyé"), 0),
+        "quotes_accepted": accepted,
+        "quotes_refused": quotes.get(_status_key("refusé"), 0),
+        "quotes_draft": quotes.get(_status_key("brouillon"), 0),
+        "total_invoices": sum(invoices.values()),
+        "total_revenue": round(stats.get("revenue", 0.0), 2),
+        "conversion_rate": round(accepted / total_quotes * 100, 1) if total_quotes > 0 else 0,
+        "total_clients": stats.get("clients", 0),
+        "total_services": stats.get("services", 0),
+    }
+
+
+def _flatten(stats: dict) -> Dict[str, float]:
+    fields = {f"quotes.{k}": v for k, v in stats.get("quotes", {}).items()}
+    fields.update({f"invoices.{k}": v for k, v in stats.get("invoices", {}).items()})
+    for name in ("revenue", "clients", "services"):
+        fields[name] = stats.get(name, 0)
+    return fields
+
+
+def _differs(field: str, stored: float, actual: float) -> bool:
+    if field == "revenue":
+        return abs(stored - actual) >= REVENUE_TOLERANCE
+    return stored != actual
+
+
+class UserStats:
+    def __init__(self):
+        self.db = None
+        self.collection = None
+
+    async def start(self, db):
+        self.db = db
+        self.collection = db.user_stats
+        await self.collection.create_index([("user_id", ASCENDING)], unique=True)
+        if not await db.migrations.find_one({"_id": MIGRATION_ID}):
+            drift = await self.repair(report=False)
+            await db.migrations.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {"applied_at": datetime.now(timezone.utc).isoformat(), "users": len(drift)}},
+                upsert=True,
+            )
+            logger.info(f"Seeded dashboard counters of {len(drift)} user(s)")
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"user_id": user_id}, {"_id": 0})
+
+    async def apply(self, user_id: str, quotes: Optional[Dict[str, int]] = None,
+                    invoices: Optional[Dict[str, int]] = None, revenue: float = 0.0,
+                    clients: int = 0, services: int = 0):
+        """Add deltas to a user's counters (one upserting $inc)"""
+        inc = {f"quotes.{k}": v for k, v in (quotes or {}).items()}
+        inc.update({f"invoices.{k}": v for k, v in (invoices or {}).items()})
+        inc.update({k: v for k, v in (("revenue", revenue), ("clients", clients), ("services", services)) if v})
+        if not inc:
+            return
+        await self.collection.update_one(
+            {"user_id": user_id},
+            {"$inc": inc, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True,
+        )
+
+    async def quote_status(self, user_id: str, old: Optional[str], new: Optional[str]):
+        await self.apply(user_id, quotes=transition(old, new))
+
+    async def invoice_status(self, user_id: str, old: Optional[str], new: Optional[str], total_ttc: float):
+        await self.apply(user_id, invoices=transition(old, new), revenue=revenue_delta(old, new, total_ttc or 0.0))
+
+    async def actual(self, user_ids: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+        """Counters recounted from the collections, for `user_ids` or everyone"""
+        match = {"user_id": {"$in": list(user_ids)}} if user_ids is not None else {}
+        by_status = {"_id": {"user_id": "$user_id", "status": "$status"}, "count": {"$sum": 1}}
+        by_user = [{"$match": match}, {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}]
+        quotes, invoices, clients, services = await asyncio.gather(
+            self.db.quotes.aggregate([{"$match": match}, {"$group": by_status}]).to_list(None),
+            self.db.invoices.aggregate([
+                {"$match": match}, {"$group": {**by_status, "total_ttc": {"$sum": "$total_ttc"}}},
+            ]).to_list(None),
+            self.db.clients.aggregate(by_user).to_list(None),
+            self.db.services.aggregate(by_user).to_list(None),
+        )
+        stats: Dict[str, dict] = {}
+
+        def of(user_id):
+            return stats.setdefault(user_id, {"quotes": {}, "invoices": {}, "revenue": 0.0, "clients": 0, "services": 0})
+
+        for group in quotes:
+            counts = of(group["_id"]["user_id"])["quotes"]
+            key = _status_key(group["_id"].get("status"))
+            counts[key] = counts.get(key, 0) + group["count"]
+        for group in invoices:
+            user = of(group["_id"]["user_id"])
+            key = _status_key(group["_id"].get("status"))
+            user["invoices"][key] = user["invoices"].get(key, 0) + group["count"]
+            if group["_id"].get("status") == PAID:
+                user["revenue"] += group["total_ttc"]
+        for name, groups in (("clients", clients), ("services", services)):
+            for group in groups:
+                of(group["_id"])[name] = group["count"]
+        return stats
+
+    async def drift(self, user_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, tuple]]:
+        """{user_id: {field: (stored, actual)}} of the counters that are off"""
+        user_ids = list(user_ids) if user_ids is not None else None
+        query = {"user_id": {"$in": user_ids}} if user_ids is not None else {}
+        stored = {doc["user_id"]: _flatten(doc) async for doc in self.collection.find(query, {"_id": 0})}
+        actual = {user_id: _flatten(stats) for user_id, stats in (await self.actual(user_ids)).items()}
+        drift = {}
+        for user_id in set(stored) | set(actual):
+            have, want = stored.get(user_id, {}), actual.get(user_id, {})
+            fields = {
+                field: (have.get(field, 0), want.get(field, 0))
+                for field in set(have) | set(want)
+                if _differs(field, have.get(field, 0), want.get(field, 0))
+            }
+            if fields:
+                drift[user_id] = fields
+        return drift
+
+    async def repair(self, fix: bool = True, report: bool = True) -> Dict[str, Dict[str, tuple]]:
+        """Recount every user's counters; returns the drift found (logged
+        with `report`) and, with `fix`, corrects it"""
+        drift = await self.drift()
+        for user_id, fields in drift.items() if report else ():
+            logger.warning(f"Dashboard counters of user {user_id} off: " + ", ".join(
+                f"{field} {stored} != {actual}" for field, (stored, actual) in sorted(fields.items())))
+        if not fix or not drift:
+            return drift
+        # Routes keep writing meanwhile: only correct drift a second count
+        # confirms, and with $inc so increments made since are kept
+        confirmed = await self.drift(drift.keys())
+        requests = [
+            UpdateOne({"user_id": user_id}, {
+                "$inc": {field: actual - stored for field, (stored, actual) in fields.items()},
+                "$set": {"updated_at": datetime.now(timezone.utc).isoformat()},
+            }, upsert=True)
+            for user_id, fields in confirmed.items() if drift.get(user_id) == fields
+        ]
+        if requests:
+            await self.collection.bulk_write(requests, ordered=False)
+        if len(requests) < len(drift):
+            logger.warning(f"{len(drift) - len(requests)} user(s) changed during the recount; run the repair again")
+        return drift
+
+
+user_stats = UserStats()
+
+
+async def _main(fix: bool) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    user_stats.db = client[os.environ['DB_NAME']]
+    user_stats.collection = user_stats.db.user_stats
+    try:
+        drift = await user_stats.repair(fix=fix)
+        print(f"{len(drift)} user(s) with drifting counters{' (corrected)' if fix and drift else ''}")
+        return 1 if drift and not fix else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    sys.exit(asyncio.run(_main("--dry-run" not in sys.argv[1:])))
@@ -15,21 +15,21 @@ export const getCompanySettings = () => axios.get(`${API}/company`, getAuthHeade
 export const updateCompanySettings = (data) => axios.put(`${API}/company`, data, getAuthHeader());
 
 // Clients
-export const getClients = () => axios.get(`${API}/clients`, getAuthHeader());
+export const getClients = (params = {}) => axios.get(`${API}/clients`, { ...getAuthHeader(), params });
 export const getClient = (id) => axios.get(`${API}/clients/${id}`, getAuthHeader());
 export const createClient = (data) => axios.post(`${API}/clients`, data, getAuthHeader());
 export const updateClient = (id, data) => axios.put(`${API}/clients/${id}`, data, getAuthHeader());
 export const deleteClient = (id) => axios.delete(`${API}/clients/${id}`, getAuthHeader());
 
 // Services
-export const getServices = () => axios.get(`${API}/services`, getAuthHeader());
+export const getServices = (params = {}) => axios.get(`${API}/services`, { ...getAuthHeader(), params });
 export const getService = (id) => axios.get(`${API}/services/${id}`, getAuthHeader());
 export const createService = (data) => axios.post(`${API}/services`, data, getAuthHeader());
 export const updateService = (id, data) => axios.put(`${API}/services/${id}`, data, getAuthHeader());
 export const deleteService = (id) => axios.delete(`${API}/services/${id}`, getAuthHeader());
 
 // Quotes
-export const getQuotes = () => axios.get(`${API}/quotes`, getAuthHeader());
+export const getQuotes = (params = {}) => axios.get(`${API}/quotes`, { ...getAuthHeader(), params });
 export const getQuote = (id) => axios.get(`${API}/quotes/${id}`, getAuthHeader());
 export const createQuote = (data) => axios.post(`${API}/quotes`, data, getAuthHeader());
 export const updateQuote = (id, data) => axios.put(`${API}/quotes/${id}`, data, getAuthHeader());
@@ -38,11 +38,21 @@ export const sendQuote = (id, message = null) => axios.post(`${API}/quotes/${id}
 export const getQuotePdf = (id) => axios.get(`${API}/quotes/${id}/pdf`, { ...getAuthHeader(), responseType: 'blob' });
 export const convertQuoteToInvoice = (id) => axios.post(`${API}/quotes/${id}/convert-to-invoice`, {}, getAuthHeader());
 export const getEmailPreview = (id) => axios.get(`${API}/quotes/${id}/email-preview`, getAuthHeader());
+export const getOutboxJob = (jobId) => axios.get(`${API}/outbox/${jobId}`, getAuthHeader());
+export const getQuoteOpens = (id) => axios.get(`${API}/quotes/${id}/opens`, getAuthHeader());
 
 // Invoices
-export const getInvoices = () => axios.get(`${API}/invoices`, getAuthHeader());
+export const getInvoices = (params = {}) => axios.get(`${API}/invoices`, { ...getAuthHeader(), params });
 export const getInvoice = (id) => axios.get(`${API}/invoices/${id}`, getAuthHeader());
 export const getInvoicePdf = (id) => axios.get(`${API}/invoices/${id}/pdf`, { ...getAuthHeader(), responseType: 'blob' });
 export const updateInvoiceStatus = (id, status) => axios.put(`${API}/invoices/${id}/status?status=${status}`, {}, getAuthHeader());
 export const addPaymentToInvoice = (id, data) => axios.post(`${API}/invoices/${id}/payment`, data, getAuthHeader());
 export const deletePayment = (invoiceId, paymentId) => axios.delete(`${API}/invoices/${invoiceId}/payment/${paymentId}`, getAuthHeader());
+export const sendPaymentReminders = () => axios.post(`${API}/invoices/reminders`, {}, getAuthHeader());
+export const getReminderCampaign = (id) => axios.get(`${API}/invoices/reminders/${id}`, getAuthHeader());
+
+// Search across clients, quotes and invoices
+export const search = (q, params = {}) => axios.get(`${API}/search`, { ...getAuthHeader(), params: { q, ...params } });
+
+// Data export: name is quotes, invoices or payments; format ndjson or csv
+export const exportData = (name, format, params = {}) => axios.get(`${API}/export/${name}.${format}`, { ...getAuthHeader(), params, responseType: 'blob' });
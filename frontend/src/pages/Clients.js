@@ -24,6 +24,8 @@ import { Plus, Pencil, Trash2, Users } from "lucide-react";
 
 const Clients = () => {
   const [clients, setClients] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editingClient, setEditingClient] = useState(null);
@@ -38,6 +40,7 @@ const Clients = () => {
     try {
       const response = await getClients();
       setClients(response.data);
+      setNextCursor(response.headers["x-next-cursor"] || null);
     } catch (error) {
       toast.error("Erreur lors du chargement des clients");
     } finally {
@@ -45,6 +48,19 @@ const Clients = () => {
     }
   };
 
+  const loadMoreClients = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await getClients({ after: nextCursor });
+      setClients((current) => [...current, ...response.data]);
+      setNextCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) {
+      toast.error("Erreur lors du chargement des clients");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const openDialog = (client = null) => {
     if (client) {
       setEditingClient(client);
@@ -103,7 +119,7 @@ const Clients = () => {
           <h1 className="text-3xl font-bold text-slate-900" style={{ fontFamily: 'Manrope' }}>
             Clients
           </h1>
-          <p className="text-slate-500 mt-1">{clients.length} clients au total</p>
+          <p className="text-slate-500 mt-1">{clients.length}{nextCursor ? "+" : ""} clients au total</p>
         </div>
         <Button className="gap-2" onClick={() => openDialog()} data-testid="new-client-btn">
           <Plus size={20} />
@@ -168,6 +184,13 @@ const Clients = () => {
               </TableBody>
             </Table>
           )}
+          {nextCursor && (
+            <div className="flex justify-center p-4 border-t border-slate-100">
+              <Button variant="outline" onClick={loadMoreClients} disabled={loadingMore} className="rounded-xl" data-testid="load-more-clients-btn">
+                {loadingMore ? "Chargement..." : "Charger plus"}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
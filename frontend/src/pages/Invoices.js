@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { getInvoices, updateInvoiceStatus, addPaymentToInvoice, deletePayment, getInvoicePdf } from "../lib/api";
+import { getInvoices, updateInvoiceStatus, addPaymentToInvoice, deletePayment, getInvoicePdf, sendPaymentReminders, getReminderCampaign } from "../lib/api";
 import { toast } from "sonner";
 import { Button } from "../components/ui/button";
 import { Input } from "../components/ui/input";
@@ -29,10 +29,12 @@ import {
 } from "../components/ui/dropdown-menu";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "../components/ui/select";
 import { Badge } from "../components/ui/badge";
-import { MoreVertical, Receipt, CheckCircle, XCircle, Clock, Plus, Trash2, CreditCard, Download, Eye } from "lucide-react";
+import { MoreVertical, Receipt, CheckCircle, XCircle, Clock, Plus, Trash2, CreditCard, Download, Eye, BellRing } from "lucide-react";
 
 const Invoices = () => {
   const [invoices, setInvoices] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [paymentDialogOpen, setPaymentDialogOpen] = useState(false);
   const [selectedInvoice, setSelectedInvoice] = useState(null);
@@ -43,6 +45,7 @@ const Invoices = () => {
     notes: ""
   });
   const [saving, setSaving] = useState(false);
+  const [reminding, setReminding] = useState(false);
 
   useEffect(() => {
     loadInvoices();
@@ -52,6 +55,7 @@ const Invoices = () => {
     try {
       const response = await getInvoices();
       setInvoices(response.data);
+      setNextCursor(response.headers["x-next-cursor"] || null);
     } catch (error) {
       toast.error("Erreur lors du chargement des factures");
     } finally {
@@ -59,6 +63,19 @@ const Invoices = () => {
     }
   };
 
+  const loadMoreInvoices = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await getInvoices({ after: nextCursor });
+      setInvoices((current) => [...current, ...response.data]);
+      setNextCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) {
+      toast.error("Erreur lors du chargement des factures");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleStatusChange = async (id, status) => {
     try {
       await updateInvoiceStatus(id, status);
@@ -129,6 +146,31 @@ const Invoices = () => {
     }
   };
 
+  const handleSendReminders = async () => {
+    if (!window.confirm("Envoyer une relance à tous les clients ayant des factures échues ?")) return;
+    setReminding(true);
+    try {
+      const response = await sendPaymentReminders();
+      toast.info("Relances en cours d'envoi");
+      // The campaign runs on the server: poll until it has finished
+      let campaign = response.data;
+      while (campaign.status === "en cours") {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        campaign = (await getReminderCampaign(response.data.campaign_id)).data;
+      }
+      if (campaign.status === "terminée") {
+        toast.success(`${campaign.clients_reminded} client(s) relancé(s), ${campaign.invoices_reminded} facture(s)`);
+      } else {
+        toast.error(campaign.error || "Erreur lors de l'envoi des relances");
+      }
+      loadInvoices();
+    } catch (error) {
+      toast.error(error.response?.data?.detail || "Erreur lors de l'envoi des relances");
+    } finally {
+      setReminding(false);
+    }
+  };
+
   const formatCurrency = (value) => {
     return new Intl.NumberFormat('fr-FR', { style: 'currency', currency: 'EUR' }).format(value || 0);
   };
@@ -164,8 +206,12 @@ const Invoices = () => {
           <h1 className="text-3xl font-bold text-slate-900" style={{ fontFamily: 'Manrope' }}>
             Factures
           </h1>
-          <p className="text-slate-500 mt-1">{invoices.length} factures au total</p>
+          <p className="text-slate-500 mt-1">{invoices.length}{nextCursor ? "+" : ""} factures au total</p>
         </div>
+        <Button variant="outline" onClick={handleSendReminders} disabled={reminding} data-testid="send-reminders-btn">
+          <BellRing size={16} className="mr-2" />
+          {reminding ? "Relances en cours..." : "Relancer les impayés"}
+        </Button>
       </div>
 
       {/* Invoices Table */}
@@ -233,6 +279,13 @@ const Invoices = () => {
               </TableBody>
             </Table>
           )}
+          {nextCursor && (
+            <div className="flex justify-center p-4 border-t border-slate-100">
+              <Button variant="outline" onClick={loadMoreInvoices} disabled={loadingMore} className="rounded-xl" data-testid="load-more-invoices-btn">
+                {loadingMore ? "Chargement..." : "Charger plus"}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
@@ -39,8 +39,8 @@ const QuoteEditor = () => {
   const loadData = async () => {
     try {
       const [clientsRes, servicesRes, companyRes] = await Promise.all([
-        getClients(),
-        getServices(),
+        getClients({ all: true }),
+        getServices({ all: true }),
         getCompanySettings()
       ]);
       setClients(clientsRes.data);
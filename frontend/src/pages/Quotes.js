@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { Link, useNavigate } from "react-router-dom";
-import { getQuotes, deleteQuote, sendQuote, getQuotePdf, updateQuote, convertQuoteToInvoice, getEmailPreview } from "../lib/api";
+import { getQuotes, deleteQuote, sendQuote, getQuotePdf, updateQuote, convertQuoteToInvoice, getEmailPreview, getOutboxJob } from "../lib/api";
 import { toast } from "sonner";
 import { Button } from "../components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card";
@@ -48,6 +48,8 @@ import {
 
 const Quotes = () => {
   const [quotes, setQuotes] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [emailModalOpen, setEmailModalOpen] = useState(false);
   const [emailData, setEmailData] = useState(null);
@@ -61,8 +63,9 @@ const Quotes = () => {
 
   const loadQuotes = async () => {
     try {
-      const response = await getQuotes();
+      const response = await getQuotes({ view: "summary" });
       setQuotes(response.data);
+      setNextCursor(response.headers["x-next-cursor"] || null);
     } catch (error) {
       toast.error("Erreur lors du chargement des devis");
     } finally {
@@ -70,6 +73,19 @@ const Quotes = () => {
     }
   };
 
+  const loadMoreQuotes = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await getQuotes({ view: "summary", after: nextCursor });
+      setQuotes((current) => [...current, ...response.data]);
+      setNextCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) {
+      toast.error("Erreur lors du chargement des devis");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const openEmailModal = async (quoteId) => {
     try {
       const response = await getEmailPreview(quoteId);
@@ -85,8 +101,22 @@ const Quotes = () => {
     if (!emailData) return;
     setSending(true);
     try {
-      await sendQuote(emailData.quoteId, emailMessage);
-      toast.success("Devis envoyé avec succès !");
+      const response = await sendQuote(emailData.quoteId, emailMessage);
+      // The email is sent by the server outbox: poll until it is delivered or fails
+      let job = response.data;
+      for (let i = 0; i < 20 && job.status !== "sent" && job.status !== "failed"; i++) {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        job = (await getOutboxJob(response.data.job_id)).data;
+      }
+      if (job.status === "failed") {
+        toast.error(job.last_error || "Erreur lors de l'envoi");
+        return;
+      }
+      if (job.status === "sent") {
+        toast.success("Devis envoyé avec succès !");
+      } else {
+        toast.info("Envoi en cours, il sera réessayé automatiquement si besoin");
+      }
       setEmailModalOpen(false);
       loadQuotes();
     } catch (error) {
@@ -200,7 +230,7 @@ const Quotes = () => {
           <h1 className="text-3xl font-bold text-white" style={{ fontFamily: 'Manrope' }}>
             Devis
           </h1>
-          <p className="text-slate-400 mt-1">{quotes.length} devis au total</p>
+          <p className="text-slate-400 mt-1">{quotes.length}{nextCursor ? "+" : ""} devis au total</p>
         </div>
         <Link to="/quotes/new">
           <Button className="gap-2 btn-glow rounded-xl" data-testid="new-quote-btn">
@@ -298,6 +328,13 @@ const Quotes = () => {
               </TableBody>
             </Table>
           )}
+          {nextCursor && (
+            <div className="flex justify-center p-4 border-t border-white/5">
+              <Button variant="outline" onClick={loadMoreQuotes} disabled={loadingMore} className="rounded-xl" data-testid="load-more-quotes-btn">
+                {loadingMore ? "Chargement..." : "Charger plus"}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
@@ -25,6 +25,8 @@ import { Plus, Pencil, Trash2, Briefcase } from "lucide-react";
 
 const Services = () => {
   const [services, setServices] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editingService, setEditingService] = useState(null);
@@ -45,6 +47,7 @@ const Services = () => {
     try {
       const response = await getServices();
       setServices(response.data);
+      setNextCursor(response.headers["x-next-cursor"] || null);
     } catch (error) {
       toast.error("Erreur lors du chargement des prestations");
     } finally {
@@ -52,6 +55,19 @@ const Services = () => {
     }
   };
 
+  const loadMoreServices = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await getServices({ after: nextCursor });
+      setServices((current) => [...current, ...response.data]);
+      setNextCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) {
+      toast.error("Erreur lors du chargement des prestations");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const openDialog = (service = null) => {
     if (service) {
       setEditingService(service);
@@ -125,7 +141,7 @@ const Services = () => {
           <h1 className="text-3xl font-bold text-slate-900" style={{ fontFamily: 'Manrope' }}>
             Prestations
           </h1>
-          <p className="text-slate-500 mt-1">{services.length} prestations au total</p>
+          <p className="text-slate-500 mt-1">{services.length}{nextCursor ? "+" : ""} prestations au total</p>
         </div>
         <Button className="gap-2" onClick={() => openDialog()} data-testid="new-service-btn">
           <Plus size={20} />
@@ -192,6 +208,13 @@ const Services = () => {
               </TableBody>
             </Table>
           )}
+          {nextCursor && (
+            <div className="flex justify-center p-4 border-t border-slate-100">
+              <Button variant="outline" onClick={loadMoreServices} disabled={loadingMore} className="rounded-xl" data-testid="load-more-services-btn">
+                {loadingMore ? "Chargement..." : "Charger plus"}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
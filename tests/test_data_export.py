@@ -0,0 +1,53 @@
+"""CSV exports neutralise spreadsheet formulas in user-controlled cells"""
+import asyncio
+import csv
+import io
+
+import pytest
+
+from data_export import PAYMENT_COLUMNS, csv_cell, csv_stream
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+    async def close(self):
+        pass
+
+
+def _export(docs):
+    async def run():
+        return b"".join([chunk async for chunk in csv_stream(_Cursor(docs), PAYMENT_COLUMNS, dict)])
+    return list(csv.DictReader(io.StringIO(asyncio.run(run()).decode("utf-8"))))
+
+
+@pytest.mark.parametrize("value", ["=1+1", "+33 6 00 00 00 00", "-2", "@SUM(A1:A2)", "\tx", "\rx",
+                                   '=HYPERLINK("http://evil.example","clic")'])
+def test_formula_cells_are_prefixed(value):
+    assert csv_cell(value) == "'" + value
+
+
+@pytest.mark.parametrize("value", ["Dupont", "", " =1", "'déjà", 12.5, -3.0, 0, None])
+def test_other_cells_are_unchanged(value):
+    assert csv_cell(value) == value
+
+
+def test_csv_export_escapes_user_fields():
+    rows = _export([{
+        "id": "p1", "invoice_id": "f1", "invoice_number": "F-2026-001", "client_id": "c1",
+        "client_name": "=cmd|' /C calc'!A0", "payment_date": "2026-01-15", "amount": -20.0,
+        "payment_method": "virement", "notes": "@SUM(1+1)", "created_at": "2026-01-15T10:00:00+00:00",
+    }])
+    assert rows[0]["client_name"] == "'=cmd|' /C calc'!A0"
+    assert rows[0]["notes"] == "'@SUM(1+1)"
+    assert rows[0]["amount"] == "-20.0"
+    assert rows[0]["invoice_number"] == "F-2026-001"
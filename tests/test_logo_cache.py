@@ -0,0 +1,100 @@
+"""Logo fetches only ever connect to public addresses"""
+import http.server
+import socket
+import threading
+
+import pytest
+
+import logo_cache
+from logo_cache import LogoCache, is_fetchable_url
+
+PUBLIC = "93.184.216.34"
+
+
+def _answers(*addresses):
+    """getaddrinfo stand-in answering each call with the next address"""
+    calls = []
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        address = addresses[min(len(calls), len(addresses) - 1)]
+        calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+    return getaddrinfo, calls
+
+
+class _RecordingSocket:
+    connected = []
+
+    def __init__(self, *args):
+        pass
+
+    def settimeout(self, timeout):
+        pass
+
+    def connect(self, sockaddr):
+        self.connected.append(sockaddr[0])
+        raise ConnectionRefusedError("test: no network")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LogoCache(cache_dir=tmp_path)
+    yield cache
+    cache.close()
+
+
+def test_only_http_urls_are_fetchable():
+    assert is_fetchable_url("https://example.com/logo.png")
+    assert not is_fetchable_url("file:///etc/passwd")
+    assert not is_fetchable_url("ftp://example.com/logo.png")
+    assert not is_fetchable_url("http:///logo.png")
+    assert not is_fetchable_url(None)
+
+
+def test_connects_to_the_address_that_was_checked(monkeypatch, cache):
+    # DNS rebinding: public for the first lookup, loopback for any later one
+    getaddrinfo, calls = _answers(PUBLIC, "127.0.0.1")
+    monkeypatch.setattr(logo_cache.socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(logo_cache.socket, "socket", _RecordingSocket)
+    _RecordingSocket.connected = []
+    with pytest.raises(OSError):
+        cache._fetch("http://rebind.example/logo.png", None)
+    assert calls == ["rebind.example"]
+    assert _RecordingSocket.connected == [PUBLIC]
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.0.0.5", "169.254.169.254", "::1"])
+def test_refuses_non_public_addresses(monkeypatch, cache, address):
+    getaddrinfo, _ = _answers(address, PUBLIC)
+    monkeypatch.setattr(logo_cache.socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(logo_cache.socket, "socket", _RecordingSocket)
+    _RecordingSocket.connected = []
+    with pytest.raises(Exception, match="non-public"):
+        cache._fetch("https://internal.example/logo.png", None)
+    assert _RecordingSocket.connected == []
+
+
+def test_refuses_a_local_server(cache):
+    hits = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(Exception, match="non-public"):
+            cache._fetch(f"http://localhost:{server.server_port}/logo.png", None)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert hits == []
@@ -0,0 +1,104 @@
+"""Document numbers stay unique and gap-free under concurrency.
+
+Needs a MongoDB (MONGO_URL); the end-to-end invoice test also needs
+transactions (replica set). Each run uses a throwaway database, dropped at
+the end. Skipped when no suitable server is reachable.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from counters import INVOICE, QUOTE, Counters, format_number
+
+MONGO_URL = os.environ.get("MONGO_URL")
+
+pytestmark = pytest.mark.skipif(not MONGO_URL, reason="MONGO_URL not set")
+
+
+async def _mongo():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        client.close()
+        pytest.skip(f"MongoDB unreachable: {e}")
+    return client
+
+
+def test_next_value_is_unique_and_contiguous():
+    async def run():
+        client = await _mongo()
+        db = client[f"devis_test_{uuid.uuid4().hex[:8]}"]
+        try:
+            counters = Counters()
+            await counters.start(db)
+            numbers = await asyncio.gather(*[counters.next_value("u1", INVOICE, 2026) for _ in range(500)])
+            # The first number of a year is an upsert: several requests race on it
+            quotes = await asyncio.gather(*[counters.next_value("u1", QUOTE, 2027) for _ in range(50)])
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+        assert sorted(numbers) == [format_number(INVOICE, 2026, n) for n in range(1, 501)]
+        assert sorted(quotes) == [format_number(QUOTE, 2027, n) for n in range(1, 51)]
+
+    asyncio.run(run())
+
+
+def test_concurrent_quotes_and_invoices_are_numbered_without_gaps():
+    async def run():
+        client = await _mongo()
+        probe = Counters()
+        probe.db = client.get_database("admin")
+        transactions = await probe._supports_transactions()
+        client.close()
+        if not transactions:
+            pytest.skip("MongoDB without transactions (standalone server)")
+
+        import httpx
+        os.environ["DB_NAME"] = f"devis_test_{uuid.uuid4().hex[:8]}"
+        os.environ.setdefault("PDF_PRERENDER_DELAY", "3600")
+        import server
+
+        await server.app.router.startup()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test",
+                                         timeout=120) as http:
+                r = await http.post("/api/auth/register", json={
+                    "email": f"test-{uuid.uuid4().hex[:8]}@example.com", "password": "test", "name": "Test",
+                })
+                r.raise_for_status()
+                headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+                r = await http.post("/api/clients", headers=headers, json={
+                    "name": "Client Test", "address": "1 rue du Test", "email": "client@example.com", "phone": "0600000000",
+                })
+                r.raise_for_status()
+                quote = {"client_id": r.json()["id"], "expiration_date": "2030-01-01",
+                         "items": [{"service_name": "Prestation", "quantity": 1, "unit": "heure", "price_ht": 80.0,
+                                    "tva_rate": 20.0}]}
+
+                async def create():
+                    r = await http.post("/api/quotes", headers=headers, json=quote)
+                    r.raise_for_status()
+                    return r.json()
+
+                async def convert(quote_id):
+                    r = await http.post(f"/api/quotes/{quote_id}/convert-to-invoice", headers=headers)
+                    r.raise_for_status()
+                    return r.json()["invoice_number"]
+
+                quotes = await asyncio.gather(*[create() for _ in range(100)])
+                invoices = await asyncio.gather(*[convert(q["id"]) for q in quotes[:50]])
+        finally:
+            await server.app.router.shutdown()
+            await server.client.drop_database(os.environ["DB_NAME"])
+
+        year = datetime.now(timezone.utc).year
+        assert sorted(q["quote_number"] for q in quotes) == [format_number(QUOTE, year, n) for n in range(1, 101)]
+        assert sorted(invoices) == [format_number(INVOICE, year, n) for n in range(1, 51)]
+
+    asyncio.run(run())